@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+榜单周间变动（事件）模块
+
+对相邻两周的榜单做差，生成带类型的事件：
+    debut     首次上榜
+    re-entry  跌出后重新上榜
+    drop-out  上周在榜、本周跌出
+    climb     排名上升（rank_change 为上升的名次，正数）
+    fall      排名下降（rank_change 为负数）
+排名不变的周不产生事件。数据中的第一周没有可比较的上一周，不产生事件。
+只与日期正好早 7 天的一周比较：上一周缺失（未爬取）时，本周的歌曲都记为 debut / re-entry，
+不产生 climb / fall，上一周的歌曲也不产生 drop-out。整体重建（build_events）与逐周增量（diff_weeks）使用同一规则。
+"""
+import numpy as np
+import pandas as pd
+
+EVENT_TYPES = ['debut', 're-entry', 'drop-out', 'climb', 'fall']
+
+# 事件表结构（song_id 对应 songs 表）
+CREATE_EVENTS_TABLE = """
+    CREATE TABLE IF NOT EXISTS chart_events (
+        event_id INT AUTO_INCREMENT PRIMARY KEY,
+        song_id INT NOT NULL,
+        chart_date DATE NOT NULL,
+        event_type ENUM('debut', 're-entry', 'drop-out', 'climb', 'fall') NOT NULL,
+        `rank` TINYINT UNSIGNED NULL,
+        prev_rank TINYINT UNSIGNED NULL,
+        rank_change SMALLINT NULL,
+        INDEX idx_type_date (event_type, chart_date),
+        INDEX idx_song_date (song_id, chart_date)
+    );
+"""
+
+EVENT_COLUMNS = ['song_id', 'chart_date', 'event_type', 'rank', 'prev_rank', 'rank_change']
+
+
+def build_events(df, song_column='song_idx'):
+    """
+    一次向量化计算全部历史的事件，用于整体重建事件表。
+    df 需要包含 song_column、week_idx、chart_date、rank 列（见 shuju.load_chart_data）。
+    """
+    if df.empty:
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+    data = df[[song_column, 'week_idx', 'chart_date', 'rank']].sort_values([song_column, 'week_idx'], kind='stable')
+    song = data[song_column].to_numpy()
+    week = data['week_idx'].to_numpy().astype(np.int32)
+    rank = data['rank'].to_numpy(dtype='float64', na_value=np.nan)
+    dates = data['chart_date'].to_numpy()
+
+    # 全部榜单周及其日期（用于生成跌出事件的日期）
+    weeks = np.unique(week)
+    week_dates = pd.Series(dates, index=week).groupby(level=0).first()
+    first_week = weeks[0]
+    last_week = weeks[-1]
+
+    same_song_prev = np.r_[False, song[1:] == song[:-1]]
+    prev_week = np.r_[-1, week[:-1]]
+    prev_rank = np.r_[np.nan, rank[:-1]]
+    consecutive = same_song_prev & (prev_week == week - 1)
+
+    # 上榜类事件：第一周之外，没有上一条记录为 debut，有但不连续为 re-entry
+    entry_rows = week != first_week
+    event_type = np.full(len(data), '', dtype=object)
+    event_type[entry_rows & ~same_song_prev] = 'debut'
+    event_type[entry_rows & same_song_prev & ~consecutive] = 're-entry'
+    event_type[consecutive & (rank < prev_rank)] = 'climb'
+    event_type[consecutive & (rank > prev_rank)] = 'fall'
+    has_prev = consecutive
+    rows = event_type != ''
+    entries = pd.DataFrame({
+        'song_id': song[rows],
+        'week_idx': week[rows],
+        'event_type': event_type[rows],
+        'rank': rank[rows],
+        'prev_rank': np.where(has_prev, prev_rank, np.nan)[rows],
+    })
+
+    # 跌出事件：下一条记录不是下一周（或没有下一条），且下一周在数据范围内
+    same_song_next = np.r_[song[1:] == song[:-1], False]
+    next_week = np.r_[week[1:], -1]
+    dropped = ~(same_song_next & (next_week == week + 1)) & (week < last_week)
+    dropped_week = week[dropped] + 1
+    # 下一周缺失（未爬取）时不生成跌出事件
+    known = np.isin(dropped_week, weeks)
+    dropouts = pd.DataFrame({
+        'song_id': song[dropped][known],
+        'week_idx': dropped_week[known],
+        'event_type': 'drop-out',
+        'rank': np.nan,
+        'prev_rank': rank[dropped][known],
+    })
+
+    events = pd.concat([entries, dropouts], ignore_index=True)
+    events['chart_date'] = week_dates.reindex(events['week_idx']).to_numpy()
+    events['rank_change'] = events['prev_rank'] - events['rank']
+    events = events.sort_values(['week_idx', 'event_type', 'song_id'], kind='stable')
+    for column in ('rank', 'prev_rank', 'rank_change'):
+        events[column] = events[column].astype('Int16')
+    return events[EVENT_COLUMNS].reset_index(drop=True)
+
+
+def diff_weeks(prev_ranks, cur_ranks, seen_songs, chart_date, first_week=False):
+    """
+    对新入库的一周与上一周做差，用于增量更新事件表。
+    prev_ranks 为日期正好早 7 天的一周的 {song_id: rank}（该周缺失时为空），cur_ranks 为本周的 {song_id: rank}，
+    seen_songs 为本周之前出现过的全部 song_id。first_week 为 True（本周之前没有任何数据）时不产生事件。
+    """
+    events = []
+    if first_week:
+        return pd.DataFrame(events, columns=EVENT_COLUMNS)
+    for song_id, rank in cur_ranks.items():
+        prev_rank = prev_ranks.get(song_id)
+        if prev_rank is None:
+            event_type = 're-entry' if song_id in seen_songs else 'debut'
+            events.append((song_id, chart_date, event_type, rank, None, None))
+        elif rank != prev_rank:
+            event_type = 'climb' if rank < prev_rank else 'fall'
+            events.append((song_id, chart_date, event_type, rank, prev_rank, prev_rank - rank))
+    for song_id, prev_rank in prev_ranks.items():
+        if song_id not in cur_ranks:
+            events.append((song_id, chart_date, 'drop-out', None, prev_rank, None))
+    return pd.DataFrame(events, columns=EVENT_COLUMNS)
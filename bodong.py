@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+排名波动与动量模块
+
+按周顺序对榜单做一次流式计算，每首歌保存少量状态（上次在榜周、上次排名、动量、最近几周变化的环形缓冲），
+为每条记录（歌曲 × 周）生成：
+    change      与上周相比上升的名次（正数为上升）；首次上榜 / 重新上榜的周为 0，entry 为 True
+    volatility  本段连续在榜最近 WINDOW 周排名变化的标准差（不足 2 周为 NaN）
+    momentum    排名变化的指数加权平均（ALPHA），重新上榜时清零
+    breakout    突破周：上升名次不少于 BREAKOUT_MIN_CLIMB，且不少于此前波动的 BREAKOUT_Z 倍
+结果按周顺序保存在紧凑数组中（与 shuju.load_chart_data 的行顺序一致），新的一周到来时只需处理这一周。
+每首歌的最大上升 / 最大下降随流式计算更新，按日期范围的统计直接在数组上二分截取，不需要重新计算。
+"""
+import numpy as np
+import pandas as pd
+import shuju
+
+# 滚动标准差的窗口（周）、动量的平滑系数
+WINDOW = 8
+ALPHA = 0.3
+
+# 突破周的判定：上升名次不少于 BREAKOUT_MIN_CLIMB，且不少于此前波动的 BREAKOUT_Z 倍
+BREAKOUT_MIN_CLIMB = 20
+BREAKOUT_Z = 3.0
+
+# 每条记录保存的字段及类型
+FIELDS = {
+    'week_idx': np.uint16,
+    'song_idx': np.uint32,
+    'rank': np.uint8,
+    'change': np.int8,
+    'entry': np.bool_,
+    'volatility': np.float32,
+    'momentum': np.float32,
+    'breakout': np.bool_,
+}
+
+# 结果缓存：数据版本 -> 索引（数据追加新的周时在原索引上增量更新）
+_index_cache = {}
+
+
+class VolatilityIndex:
+    """按周追加的波动 / 动量数组，以及每首歌的流式计算状态"""
+
+    def __init__(self):
+        self.size = 0
+        self.arrays = {name: np.empty(0, dtype=dtype) for name, dtype in FIELDS.items()}
+        # 每首歌的状态（按 song_idx 索引，新歌出现时扩容）
+        self.last_week = np.empty(0, dtype=np.int32)
+        self.last_rank = np.empty(0, dtype=np.int16)
+        self.momentum = np.empty(0, dtype=np.float64)
+        self.window = np.empty((0, WINDOW), dtype=np.float64)
+        self.run_changes = np.empty(0, dtype=np.int32)
+        self.max_climb = np.empty(0, dtype=np.int16)
+        self.max_fall = np.empty(0, dtype=np.int16)
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def latest_week(self):
+        """已处理的最后一周（没有数据时为 -1）"""
+        return int(self.arrays['week_idx'][self.size - 1]) if self.size else -1
+
+    def _reserve(self, rows, songs):
+        """保证记录数组和歌曲状态的容量（按倍数扩容，追加一周的摊还代价为常数）"""
+        capacity = len(self.arrays['week_idx'])
+        if self.size + rows > capacity:
+            capacity = max(self.size + rows, capacity * 2, 1024)
+            for name, array in self.arrays.items():
+                grown = np.empty(capacity, dtype=array.dtype)
+                grown[:self.size] = array[:self.size]
+                self.arrays[name] = grown
+        if songs > len(self.last_week):
+            count = max(songs, len(self.last_week) * 2, 1024)
+            extra = count - len(self.last_week)
+            self.last_week = np.r_[self.last_week, np.full(extra, -2, dtype=np.int32)]
+            self.last_rank = np.r_[self.last_rank, np.zeros(extra, dtype=np.int16)]
+            self.momentum = np.r_[self.momentum, np.zeros(extra)]
+            self.window = np.vstack([self.window, np.zeros((extra, WINDOW))])
+            self.run_changes = np.r_[self.run_changes, np.zeros(extra, dtype=np.int32)]
+            self.max_climb = np.r_[self.max_climb, np.zeros(extra, dtype=np.int16)]
+            self.max_fall = np.r_[self.max_fall, np.zeros(extra, dtype=np.int16)]
+
+    def add_week(self, week_idx, song_idx, rank):
+        """处理新的一周（week_idx 需大于已处理的最后一周），song_idx / rank 为本周在榜歌曲"""
+        week_idx = int(week_idx)
+        if week_idx <= self.latest_week:
+            raise ValueError(f"周 {week_idx} 不晚于已处理的最后一周 {self.latest_week}")
+        song = np.asarray(song_idx, dtype=np.int64)
+        rank = np.asarray(rank, dtype=np.int16)
+        n = len(song)
+        self._reserve(n, int(song.max()) + 1 if n else 0)
+
+        continuing = self.last_week[song] == week_idx - 1
+        change = np.where(continuing, self.last_rank[song] - rank, 0)
+
+        # 此前的滚动波动（用于判断突破），只统计本段连续在榜的变化
+        count = np.where(continuing, self.run_changes[song], 0)
+        prev_std = _window_std(self.window[song], count)
+        threshold = np.maximum(BREAKOUT_MIN_CLIMB, BREAKOUT_Z * np.nan_to_num(prev_std))
+        breakout = continuing & (change >= threshold)
+
+        # 更新状态：上榜周清空本段的窗口和动量，连续在榜的周写入环形缓冲
+        window = np.where(continuing[:, None], self.window[song], 0.0)
+        window[np.arange(n), count % WINDOW] = np.where(continuing, change, 0.0)
+        count = np.where(continuing, count + 1, 0)
+        momentum = np.where(continuing, ALPHA * change + (1 - ALPHA) * self.momentum[song], 0.0)
+        self.window[song] = window
+        self.run_changes[song] = count
+        self.momentum[song] = momentum
+        self.last_week[song] = week_idx
+        self.last_rank[song] = rank
+        self.max_climb[song] = np.maximum(self.max_climb[song], change)
+        self.max_fall[song] = np.maximum(self.max_fall[song], -change)
+
+        rows = slice(self.size, self.size + n)
+        self.arrays['week_idx'][rows] = week_idx
+        self.arrays['song_idx'][rows] = song
+        self.arrays['rank'][rows] = rank
+        self.arrays['change'][rows] = change
+        self.arrays['entry'][rows] = ~continuing
+        self.arrays['volatility'][rows] = _window_std(window, count)
+        self.arrays['momentum'][rows] = momentum
+        self.arrays['breakout'][rows] = breakout
+        self.size += n
+
+    def extend(self, df):
+        """
+        按周顺序处理多周数据。
+        df 需要包含 week_idx、song_idx、rank 列，并按 week_idx 排序（shuju.load_chart_data 的行顺序）。
+        """
+        data = df.dropna(subset=['rank'])
+        week = data['week_idx'].to_numpy()
+        song = data['song_idx'].to_numpy()
+        rank = data['rank'].to_numpy(dtype=np.int16)
+        songs = int(song.max()) + 1 if len(song) else 0
+        self._reserve(len(data), songs)
+        bounds = np.r_[0, np.flatnonzero(week[1:] != week[:-1]) + 1, len(week)]
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            self.add_week(week[start], song[start:stop], rank[start:stop])
+
+    def frame(self, start_date=None, end_date=None):
+        """返回日期范围内的记录（DataFrame，列见 FIELDS），按 week_idx 二分截取"""
+        week = self.arrays['week_idx'][:self.size]
+        start, stop = 0, self.size
+        if start_date is not None:
+            start = int(np.searchsorted(week, shuju.date_to_week_idx(start_date, round_up=True), side='left'))
+        if end_date is not None:
+            stop = int(np.searchsorted(week, shuju.date_to_week_idx(end_date), side='right'))
+        return pd.DataFrame({name: array[start:stop] for name, array in self.arrays.items()})
+
+    def song_extremes(self):
+        """每首歌全部历史的最大上升和最大下降名次（按 song_idx 索引）"""
+        songs = int(self.arrays['song_idx'][:self.size].max()) + 1 if self.size else 0
+        return pd.DataFrame({'max_climb': self.max_climb[:songs], 'max_fall': self.max_fall[:songs]})
+
+
+def _window_std(window, count):
+    """环形缓冲中前 min(count, WINDOW) 个值的总体标准差，不足 2 个值时为 NaN"""
+    n = np.minimum(count, WINDOW)
+    valid = np.arange(WINDOW)[None, :] < n[:, None]
+    values = np.where(valid, window, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = values.sum(axis=1) / n
+        variance = (values * values).sum(axis=1) / n - mean * mean
+    return np.where(n >= 2, np.sqrt(np.maximum(variance, 0.0)), np.nan)
+
+
+def build_index(df):
+    """由全部历史构建索引（一次按周顺序的流式计算）"""
+    index = VolatilityIndex()
+    index.extend(df)
+    return index
+
+
+def _is_prefix(index, df):
+    """df 的前 len(index) 行是否正是索引已处理的数据（只追加了新的周）"""
+    n = len(index)
+    if n > len(df) or (len(df) > n and df['week_idx'].iat[n] <= index.latest_week):
+        return False
+    head = df.iloc[:n]
+    return (np.array_equal(head['song_idx'].to_numpy(), index.arrays['song_idx'][:n])
+            and np.array_equal(head['rank'].to_numpy(dtype=np.int16, na_value=0), index.arrays['rank'][:n]))
+
+
+def get_index(df=None, version=None):
+    """
+    返回当前数据的波动索引，按数据版本缓存。
+    数据版本变化时，若只是追加了新的周，只处理新增的周；否则重新构建。
+    df 为已加载的紧凑榜单数据，version 为其数据版本（两者需来自同一快照，省略时按当前快照读取）。
+    """
+    snapshot = None
+    if version is None:
+        snapshot = shuju.pin_snapshot()
+        version = shuju.data_version(snapshot)
+    if _index_cache.get('version') == version:
+        return _index_cache['index']
+    if df is None:
+        df = shuju.load_chart_data(['rank', 'week_idx', 'song_idx'], snapshot=snapshot)
+    df = df.dropna(subset=['rank'])
+    index = _index_cache.get('index')
+    if index is not None and _is_prefix(index, df):
+        index.extend(df.iloc[len(index):])
+    else:
+        index = build_index(df)
+    _index_cache['index'] = index
+    _index_cache['version'] = version
+    return index
+
+
+def song_summary(frame, min_weeks=1):
+    """
+    按歌曲汇总一段时间内的波动：连续在榜的周数、最大上升 / 下降、平均变化幅度、最大变化幅度、
+    净变化、最新动量和突破周数。frame 为 VolatilityIndex.frame 的结果。
+    """
+    moves = frame[~frame['entry']]
+    change = moves['change'].astype(np.int16)
+    summary = pd.DataFrame({
+        'song_idx': moves['song_idx'],
+        'change': change,
+        'abs_change': change.abs(),
+        'breakout': moves['breakout'],
+    }).groupby('song_idx').agg(
+        moves=('change', 'size'),
+        max_climb=('change', 'max'),
+        max_fall=('change', 'min'),
+        net_change=('change', 'sum'),
+        avg_change=('abs_change', 'mean'),
+        max_change=('abs_change', 'max'),
+        breakouts=('breakout', 'sum'),
+    )
+    summary['max_fall'] = -summary['max_fall'].clip(upper=0)
+    summary['max_climb'] = summary['max_climb'].clip(lower=0)
+    latest = frame.drop_duplicates('song_idx', keep='last').set_index('song_idx')
+    summary = summary.join(latest[['week_idx', 'rank', 'momentum', 'volatility']].rename(
+        columns={'week_idx': 'last_week', 'rank': 'last_rank'}))
+    return summary[summary['moves'] >= min_weeks]
+
+
+def hottest_movers(frame, top_n=15):
+    """
+    一段时间内势头最强的歌曲：只取最后一周仍在榜的歌曲，按最新动量排序（相同时按净上升名次）。
+    frame 为 VolatilityIndex.frame 的结果。
+    """
+    if frame.empty:
+        return pd.DataFrame()
+    summary = song_summary(frame)
+    summary = summary[summary['last_week'] == frame['week_idx'].max()]
+    return summary.sort_values(['momentum', 'net_change'], ascending=False, kind='stable').head(top_n)
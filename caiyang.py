@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+趋势折线降采样模块
+
+长时间范围的排名趋势图每首歌每周一个点，导出 SVG/PDF 和交互重绘都很慢。
+本模块用 LTTB（Largest-Triangle-Three-Buckets）算法按形状保留每条折线的点，并且始终保留：
+    每段连续在榜的首尾两周（上榜 / 跌出的边界）
+    每段连续在榜的最高排名（峰值）
+点数预算按每条折线占横轴的比例分配（line_budget），几十年的历史中一首歌只占很窄的一段，只需要很少的点；
+另外根据时间跨度选择坐标轴刻度间隔（adaptive_date_ticks）。
+"""
+import numpy as np
+import matplotlib.dates as mdates
+
+# 整个横轴默认最多保留的点数，约为图表宽度的像素数的一半（None 表示不降采样）
+MAX_POINTS = 600
+
+# 日期坐标轴最多的刻度数
+MAX_TICKS = 16
+
+
+def lttb(x, y, n_out):
+    """
+    LTTB 降采样：返回保留点的下标（升序，含首尾两点）。
+    x 需升序；n_out 不小于点数或小于 3 时返回全部下标。
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    # 除首尾两点外分成 n_out - 2 个桶，每个桶选出与上一个选中点、下一个桶均值构成最大三角形的点
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    selected = np.empty(n_out, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[hi:next_hi].mean()
+        avg_y = y[hi:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def line_budget(line_span, axis_span, max_points=MAX_POINTS):
+    """一条折线可保留的点数：max_points 按折线的横向跨度占整个横轴的比例分配，至少 3 个点"""
+    if max_points is None:
+        return None
+    if axis_span <= 0:
+        return max_points
+    return max(3, int(np.ceil(max_points * line_span / axis_span)))
+
+
+def downsample_runs(x, y, runs, max_points=MAX_POINTS):
+    """
+    对一首歌的折线降采样，返回保留点的下标（升序）。
+    runs 为每个点所属的连续在榜段编号（同一段的点相邻）；点数按段长分配给各段，
+    每段的首尾和最高排名（y 最小）必定保留。
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    runs = np.asarray(runs)
+    n = len(x)
+    if max_points is None or n <= max_points:
+        return np.arange(n)
+    starts = np.flatnonzero(np.r_[True, runs[1:] != runs[:-1]])
+    ends = np.r_[starts[1:], n]
+    keep = [starts, ends - 1]
+    for start, end in zip(starts, ends):
+        length = end - start
+        budget = max(3, int(round(max_points * length / n)))
+        keep.append(start + lttb(x[start:end], y[start:end], budget))
+        keep.append([start + int(np.argmin(y[start:end]))])
+    return np.unique(np.concatenate(keep))
+
+
+def adaptive_date_ticks(ax, max_ticks=MAX_TICKS):
+    """按当前日期范围设置主刻度：刻度数不超过 max_ticks，跨度超过 6 年时只显示年份"""
+    locator = mdates.AutoDateLocator(minticks=3, maxticks=max_ticks)
+    ax.xaxis.set_major_locator(locator)
+    start, end = ax.get_xlim()
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y' if end - start > 6 * 365 else '%Y-%m'))
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+歌名词频索引模块
+
+song_title_terms  每首歌歌名中的词及出现次数，附带歌曲首次上榜的年份
+title_term_years  按首次上榜年份汇总的词频（每首歌只计一次）
+词云直接读取汇总后的词频，绘制开销只与词表大小有关，而与歌名总量无关。
+"""
+import re
+from wordcloud import STOPWORDS
+
+# 中文歌名分词（可选）
+try:
+    import jieba
+except ImportError:
+    jieba = None
+
+# 停用词：WordCloud 自带的英文停用词，加上榜单歌名中常见的无意义词
+TITLE_STOPWORDS = set(STOPWORDS) | {
+    'feat', 'ft', 'featuring', 'remix', 'version', 'edit', 'pt', 'part', 'vol', 'mix', 'live',
+    'oh', 'la', 'na', 'da', 'yeah', 'ya', 'ooh',
+    "taylor's",  # 重录版歌名后缀 (Taylor's Version)
+}
+
+# 歌名中的词：英文单词（可含撇号）、数字或中日韩文字
+TOKEN_PATTERN = re.compile(r"[一-鿿]+|[A-Za-z0-9][A-Za-z0-9']*")
+
+CREATE_TERM_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS song_title_terms (
+        song_id INT NOT NULL,
+        term VARCHAR(100) COLLATE utf8mb3_bin NOT NULL,
+        term_count TINYINT UNSIGNED NOT NULL,
+        debut_year SMALLINT NOT NULL,
+        PRIMARY KEY (song_id, term),
+        INDEX idx_year_term (debut_year, term)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS title_term_years (
+        year SMALLINT NOT NULL,
+        term VARCHAR(100) COLLATE utf8mb3_bin NOT NULL,
+        song_count INT NOT NULL,
+        PRIMARY KEY (year, term)
+    );
+    """,
+]
+
+
+def tokenize(title):
+    """将歌名切分为小写的词，去除停用词、单个字母和纯数字"""
+    terms = []
+    for token in TOKEN_PATTERN.findall(str(title)):
+        if '一' <= token[0] <= '鿿':
+            if jieba is not None:
+                terms.extend(word[:100] for word in jieba.cut(token) if len(word) > 1)
+            else:
+                terms.append(token[:100])
+            continue
+        token = token.strip("'").lower()
+        if len(token) < 2 or token.isdigit() or token in TITLE_STOPWORDS:
+            continue
+        terms.append(token[:100])
+    return terms
+
+
+def build_term_rows(songs):
+    """由 (song_id, 歌名, 首次上榜年份) 生成 song_title_terms 的行"""
+    rows = []
+    for song_id, name, debut_year in songs:
+        counts = {}
+        for term in tokenize(name):
+            counts[term] = counts.get(term, 0) + 1
+        rows.extend((song_id, term, min(count, 255), debut_year) for term, count in counts.items())
+    return rows
+
+
+def create_tables(cursor):
+    """创建词频表（如果不存在）"""
+    for sql in CREATE_TERM_TABLES:
+        cursor.execute(sql)
+
+
+def rebuild_terms(cursor):
+    """整体重建词频索引（全量导入后调用）"""
+    cursor.execute("DELETE FROM title_term_years")
+    cursor.execute("DELETE FROM song_title_terms")
+    cursor.execute("""
+        SELECT s.song_id, s.name, MIN(ce.year)
+        FROM songs s
+        JOIN chart_entries ce ON ce.song_id = s.song_id
+        GROUP BY s.song_id, s.name
+    """)
+    rows = build_term_rows(cursor.fetchall())
+    cursor.executemany("""
+        INSERT INTO song_title_terms (song_id, term, term_count, debut_year) VALUES (%s, %s, %s, %s)
+    """, rows)
+    cursor.execute("""
+        INSERT INTO title_term_years (year, term, song_count)
+        SELECT debut_year, term, COUNT(*)
+        FROM song_title_terms
+        GROUP BY debut_year, term
+    """)
+
+
+def update_terms(cursor, song_ids, year):
+    """
+    增量更新：为本周首次出现的歌曲建立词频，并累加到 title_term_years。
+    已建立索引的歌曲会被跳过，因此重复导入同一周不会重复计数。
+    """
+    if not song_ids:
+        return
+    placeholders = ','.join(['%s'] * len(song_ids))
+    cursor.execute(f"SELECT DISTINCT song_id FROM song_title_terms WHERE song_id IN ({placeholders})",
+                   tuple(song_ids))
+    indexed = {row[0] for row in cursor.fetchall()}
+    new_ids = [song_id for song_id in song_ids if song_id not in indexed]
+    if not new_ids:
+        return
+    placeholders = ','.join(['%s'] * len(new_ids))
+    cursor.execute(f"SELECT song_id, name FROM songs WHERE song_id IN ({placeholders})", tuple(new_ids))
+    rows = build_term_rows((song_id, name, year) for song_id, name in cursor.fetchall())
+    if not rows:
+        return
+    cursor.executemany("""
+        INSERT INTO song_title_terms (song_id, term, term_count, debut_year) VALUES (%s, %s, %s, %s)
+    """, rows)
+    year_counts = {}
+    for _, term, _, _ in rows:
+        year_counts[term] = year_counts.get(term, 0) + 1
+    cursor.executemany("""
+        INSERT INTO title_term_years (year, term, song_count) VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE song_count = song_count + VALUES(song_count)
+    """, [(year, term, count) for term, count in year_counts.items()])
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+榜单数据的列式存储模块
+
+数据按榜单和年份分区保存为 Parquet 文件（archive/chart_id=hot-100/year=2015/part-<编号>.parquet），
+所有榜单使用同一个表结构，chart_id 作为分区维度；歌名和歌手使用字典编码，排名和日期使用定长类型。
+读取时只加载需要的列和榜单、年份分区，日期条件会下推到 Parquet 的行组统计信息。
+
+快照：每个榜单目录下的 _snapshot.json 记录当前版本号及每一年使用的分区文件。
+写入时先写新的分区文件（文件名唯一，不覆盖旧文件），再原子替换 _snapshot.json 一次发布所有改动的年份；
+读取方先取快照（read_snapshot），之后只读快照中列出的文件，整个读取过程看到的是同一个版本，
+不会读到写了一半或只更新了部分年份的数据。不再被引用的旧文件超过 SNAPSHOT_GRACE 秒后删除。
+旧版本只有 Hot 100 的 archive/year=YYYY/ 分区（part-0.parquet，没有 _snapshot.json），首次访问时移动到 chart_id=hot-100 下。
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# 归档目录
+ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'archive')
+
+# 默认榜单（shuju 等分析模块读取的榜单）
+DEFAULT_CHART = 'hot-100'
+
+# 快照清单的文件名；不再被快照引用的分区文件保留的时间（秒），保证正在读取旧快照的读取方不受影响
+SNAPSHOT_FILE = '_snapshot.json'
+SNAPSHOT_GRACE = 600
+
+# 列式存储的表结构（chart_id、year 作为分区列保存在目录名中）
+ARCHIVE_SCHEMA = pa.schema([
+    ('rank', pa.uint8()),
+    ('name', pa.dictionary(pa.int32(), pa.string())),
+    ('singer', pa.dictionary(pa.int32(), pa.string())),
+    ('last_week', pa.uint8()),
+    ('peak_pos', pa.uint8()),
+    ('weeks_on_chart', pa.uint16()),
+    ('chart_date', pa.date32()),
+    ('week', pa.uint8()),
+])
+
+# 读取时保留可空的定长整数类型，避免含空值的列退化为 float64
+ARROW_TO_PANDAS = {
+    pa.uint8(): pd.UInt8Dtype(),
+    pa.uint16(): pd.UInt16Dtype(),
+}
+
+# 排名类字段，爬虫中的 'N/A'、'-' 等非数字值统一视为空值
+NUMERIC_COLUMNS = {
+    'rank': 'UInt8',
+    'last_week': 'UInt8',
+    'peak_pos': 'UInt8',
+    'weeks_on_chart': 'UInt16',
+    'week': 'UInt8',
+}
+
+
+def rows_to_frame(rows):
+    """将爬虫输出的字典列表（或 DataFrame）转换为类型规整的 DataFrame"""
+    df = pd.DataFrame(rows).copy()
+    for column, dtype in NUMERIC_COLUMNS.items():
+        df[column] = pd.to_numeric(df[column], errors='coerce').astype(dtype)
+    df['name'] = df['name'].astype(str)
+    df['singer'] = df['singer'].astype(str)
+    df['chart_date'] = pd.to_datetime(df['chart_date'], errors='coerce')
+    df = df.dropna(subset=['chart_date'])
+    df['year'] = df['chart_date'].dt.year.astype('int16')
+    return df
+
+
+def _chart_dir(chart_id=DEFAULT_CHART):
+    """返回某个榜单的分区目录"""
+    return os.path.join(ARCHIVE_DIR, f'chart_id={chart_id}')
+
+
+def _new_partition_path(year, chart_id=DEFAULT_CHART):
+    """为某个榜单某一年生成新的分区文件路径（文件名唯一，不覆盖正在被读取的旧文件）"""
+    return os.path.join(_chart_dir(chart_id), f'year={year}', f'part-{uuid.uuid4().hex}.parquet')
+
+
+def _migrate_legacy_layout():
+    """将旧版本的 archive/year=YYYY/ 分区移动到 chart_id=hot-100 下（旧版本只抓取 Hot 100）"""
+    if not os.path.isdir(ARCHIVE_DIR):
+        return
+    legacy = [entry for entry in os.listdir(ARCHIVE_DIR) if entry.startswith('year=')]
+    if legacy:
+        os.makedirs(_chart_dir(), exist_ok=True)
+        for entry in legacy:
+            shutil.move(os.path.join(ARCHIVE_DIR, entry), os.path.join(_chart_dir(), entry))
+
+
+def _frame_to_table(df):
+    """按归档表结构将 DataFrame 转换为 Arrow 表"""
+    columns = [field.name for field in ARCHIVE_SCHEMA]
+    table = pa.Table.from_pandas(df[columns], preserve_index=False)
+    return table.cast(ARCHIVE_SCHEMA)
+
+
+def read_snapshot(chart_id=DEFAULT_CHART):
+    """
+    返回某个榜单当前的快照：{'chart_id', 'version', 'partitions': {年份: 分区文件路径}}。
+    读取方应先取快照，再把它传给 read_archive 等函数，保证读到的是同一个版本。
+    """
+    _migrate_legacy_layout()
+    chart_dir = _chart_dir(chart_id)
+    manifest_path = os.path.join(chart_dir, SNAPSHOT_FILE)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        partitions = {int(year): os.path.join(chart_dir, path) for year, path in manifest['partitions'].items()}
+        return {'chart_id': chart_id, 'version': manifest['version'], 'partitions': partitions}
+    # 旧版本的归档没有快照清单，每年只有一个 part-0.parquet
+    partitions = {}
+    if os.path.isdir(chart_dir):
+        for entry in os.listdir(chart_dir):
+            path = os.path.join(chart_dir, entry, 'part-0.parquet')
+            if entry.startswith('year=') and os.path.exists(path):
+                partitions[int(entry[len('year='):])] = path
+    return {'chart_id': chart_id, 'version': 0, 'partitions': partitions}
+
+
+def _publish_snapshot(chart_id, version, partitions):
+    """原子替换快照清单，发布新版本（分区文件需已写完）"""
+    chart_dir = _chart_dir(chart_id)
+    manifest = {
+        'version': version,
+        'partitions': {str(year): os.path.relpath(path, chart_dir) for year, path in sorted(partitions.items())},
+    }
+    tmp_path = os.path.join(chart_dir, f'{SNAPSHOT_FILE}.{uuid.uuid4().hex}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, os.path.join(chart_dir, SNAPSHOT_FILE))
+
+
+def _collect_garbage(snapshot):
+    """删除不再被当前快照引用、且超过 SNAPSHOT_GRACE 秒的分区文件和临时文件"""
+    chart_dir = _chart_dir(snapshot['chart_id'])
+    current = {os.path.abspath(path) for path in snapshot['partitions'].values()}
+    deadline = time.time() - SNAPSHOT_GRACE
+    for root, _, files in os.walk(chart_dir):
+        for name in files:
+            path = os.path.abspath(os.path.join(root, name))
+            if (name.endswith('.parquet') or name.endswith('.tmp')) and path not in current:
+                try:
+                    if os.path.getmtime(path) < deadline:
+                        os.remove(path)
+                except OSError:
+                    pass  # 文件正被其他进程读取（Windows）或已被删除，下次再清理
+
+
+def list_charts():
+    """列出归档中已有数据的榜单"""
+    _migrate_legacy_layout()
+    if not os.path.isdir(ARCHIVE_DIR):
+        return []
+    return sorted(entry[len('chart_id='):] for entry in os.listdir(ARCHIVE_DIR)
+                  if entry.startswith('chart_id=') and list_years(entry[len('chart_id='):]))
+
+
+def list_years(chart_id=DEFAULT_CHART, snapshot=None):
+    """列出某个榜单（或指定快照）中已有的年份分区"""
+    snapshot = snapshot or read_snapshot(chart_id)
+    return sorted(snapshot['partitions'])
+
+
+def list_partition_files(chart_id=DEFAULT_CHART, snapshot=None):
+    """列出某个榜单（或指定快照）所有分区文件的路径"""
+    snapshot = snapshot or read_snapshot(chart_id)
+    return [snapshot['partitions'][year] for year in sorted(snapshot['partitions'])]
+
+
+def latest_chart_date(chart_id=DEFAULT_CHART):
+    """某个榜单在归档中最新一期的日期（没有数据时为 None），只读取最后一个年份分区的日期列"""
+    snapshot = read_snapshot(chart_id)
+    if not snapshot['partitions']:
+        return None
+    path = snapshot['partitions'][max(snapshot['partitions'])]
+    dates = pq.read_table(path, columns=['chart_date']).column('chart_date')
+    return pd.Timestamp(dates.to_pandas().max())
+
+
+def append_rows(rows, chart_id=DEFAULT_CHART):
+    """
+    将新爬取的数据追加到归档中。
+    记录中带 chart_id 字段时按其分别写入各榜单的分区，否则全部写入 chart_id 榜单；
+    只重写涉及到的榜单、年份分区；同一榜单日期、同一排名的旧记录会被新记录覆盖。
+    每个榜单涉及的所有年份写完后通过一次快照替换同时发布。
+    """
+    df = rows_to_frame(rows)
+    if df.empty:
+        return 0
+    _migrate_legacy_layout()
+    if 'chart_id' in df.columns:
+        df['chart_id'] = df['chart_id'].fillna(chart_id).astype(str)
+    else:
+        df['chart_id'] = chart_id
+    for chart, chart_df in df.groupby('chart_id'):
+        snapshot = read_snapshot(chart)
+        partitions = dict(snapshot['partitions'])
+        for year, year_df in chart_df.groupby('year'):
+            old_path = partitions.get(year)
+            if old_path is not None:
+                old_df = pq.read_table(old_path).to_pandas()
+                old_df['chart_date'] = pd.to_datetime(old_df['chart_date'])
+                old_df['year'] = year
+                # 分类列合并前先还原成字符串，避免类别不一致
+                for column in ('name', 'singer'):
+                    old_df[column] = old_df[column].astype(str)
+                year_df = pd.concat([old_df, year_df], ignore_index=True)
+            year_df = (year_df.drop_duplicates(subset=['chart_date', 'rank'], keep='last')
+                       .sort_values(['chart_date', 'rank']))
+            # 写入新文件，旧文件保持不变，正在读取旧快照的读取方不受影响
+            path = _new_partition_path(year, chart)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            pq.write_table(_frame_to_table(year_df), path, compression='zstd', row_group_size=100 * 53)
+            partitions[year] = path
+        _publish_snapshot(chart, snapshot['version'] + 1, partitions)
+        _collect_garbage(read_snapshot(chart))
+    print(f"已追加 {len(df)} 条数据到归档 {ARCHIVE_DIR}")
+    return len(df)
+
+
+def read_archive(columns=None, start_date=None, end_date=None, chart_id=DEFAULT_CHART, snapshot=None):
+    """
+    读取某个榜单的归档数据（chart_id 为 None 时读取所有榜单，结果带 chart_id 列）。
+    columns 指定需要的列（year、chart_id 分区列可直接使用）；
+    start_date/end_date 会先裁剪年份分区，再作为 chart_date 条件下推到 Parquet。
+    snapshot 为事先取得的快照（见 read_snapshot），省略时使用当前快照。
+    """
+    if chart_id is None:
+        snapshots = [read_snapshot(chart) for chart in list_charts()]
+        root = ARCHIVE_DIR
+    else:
+        snapshots = [snapshot or read_snapshot(chart_id)]
+        root = _chart_dir(chart_id)
+    first_year = pd.Timestamp(start_date).year if start_date is not None else None
+    last_year = pd.Timestamp(end_date).year if end_date is not None else None
+    files = [path for snap in snapshots for year, path in sorted(snap['partitions'].items())
+             if (first_year is None or year >= first_year) and (last_year is None or year <= last_year)]
+    if not files:
+        extra = ['year'] if chart_id is not None else ['chart_id', 'year']
+        return pd.DataFrame(columns=columns or [field.name for field in ARCHIVE_SCHEMA] + extra)
+    dataset = ds.dataset(files, format='parquet', partitioning='hive', partition_base_dir=root)
+    condition = None
+    if start_date is not None:
+        start = pd.Timestamp(start_date)
+        condition = (ds.field('year') >= start.year) & (ds.field('chart_date') >= start.date())
+    if end_date is not None:
+        end = pd.Timestamp(end_date)
+        end_condition = (ds.field('year') <= end.year) & (ds.field('chart_date') <= end.date())
+        condition = end_condition if condition is None else condition & end_condition
+    table = dataset.to_table(columns=columns, filter=condition)
+    df = table.to_pandas(types_mapper=ARROW_TO_PANDAS.get)
+    if 'chart_date' in df.columns:
+        df['chart_date'] = pd.to_datetime(df['chart_date'])
+    if 'chart_id' in df.columns:
+        df['chart_id'] = df['chart_id'].astype('category')
+    return df
+
+
+def import_csv(csv_path, chart_id=DEFAULT_CHART):
+    """将已有的 CSV 数据（如 dataall.csv）一次性导入某个榜单的归档"""
+    df = pd.read_csv(csv_path, dtype=str)
+    return append_rows(df, chart_id)
+
+
+if __name__ == "__main__":
+    # 用法：python cunchu.py dataall.csv [chart_id]
+    if len(sys.argv) >= 3:
+        import_csv(sys.argv[1], sys.argv[2])
+    elif len(sys.argv) >= 2:
+        import_csv(sys.argv[1])
+    else:
+        for chart in list_charts():
+            print(f"{chart} 的年份分区: {list_years(chart)}")
@@ -1,125 +1,467 @@
+import os
+import uuid
+import datetime
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import pymysql
-import re
-import numpy as np
-
-# 连接数据库
-conn = pymysql.connect(
-    host='localhost',
-    user='root',
-    password='123456',
-    database='data',
-    charset='utf8mb3'
-)
-cursor = conn.cursor()
-
-# 创建 Songs 表（如果不存在）
-cursor.execute("""
-    CREATE TABLE IF NOT EXISTS Songs (
-        song_id INT AUTO_INCREMENT PRIMARY KEY,
-        name VARCHAR(255),
-        peak_pos INT
-    );
-""")
+import shuju
+import bianhua
+import huizong
+import cipin
 
-# 创建 Artists 表（如果不存在）
-cursor.execute("""
-    CREATE TABLE IF NOT EXISTS Artists (
-        artist_id INT AUTO_INCREMENT PRIMARY KEY,
-        name VARCHAR(255)
-    );
-""")
-
-# 创建 Charts 表（如果不存在）
-cursor.execute("""
-    CREATE TABLE IF NOT EXISTS Charts (
-        chart_id INT AUTO_INCREMENT PRIMARY KEY,
-        song_id INT,
-        `rank` INT,
-        last_week INT,
-        weeks_on_chart INT,
-        chart_date DATE,
-        year INT,
-        week INT,
-        FOREIGN KEY (song_id) REFERENCES Songs(song_id)
+# 每批写入的行数
+BATCH_SIZE = 5000
+
+# 并行导入的默认连接数（按年份分区并发写入，应与数据库主机的核数相当）
+IMPORT_WORKERS = os.cpu_count() or 4
+
+# 并行导入前删除、导入后一次性重建的二级索引和外键（与 create_tables 中的定义一致）
+SECONDARY_INDEXES = {
+    'chart_entries': {'idx_chart_date': '(chart_date)', 'idx_song_date': '(song_id, chart_date)'},
+    'chart_events': {'idx_type_date': '(event_type, chart_date)', 'idx_song_date': '(song_id, chart_date)'},
+}
+FOREIGN_KEYS = {
+    'chart_entries': 'FOREIGN KEY (song_id) REFERENCES songs(song_id)',
+}
+
+# 整体重建发布的所有表（按清空数据的顺序，先子表后父表）
+TABLES = ['title_term_years', 'song_title_terms', 'artist_year_rollup', 'artist_song_rollup',
+          'chart_events', 'chart_entries', 'song_artists', 'songs', 'artists', 'db_version']
+
+# 数据库版本表：每次写入数据时在同一事务中换成新的版本号，fuwu.py 据此判断数据库中的数据是否变化
+CREATE_VERSION_TABLE = """
+    CREATE TABLE IF NOT EXISTS db_version (
+        id TINYINT PRIMARY KEY,
+        version CHAR(32),
+        updated_at DATETIME
     );
-""")
-
-# 清空表数据（如果需要每次清空）
-cursor.execute("DELETE FROM Charts")
-cursor.execute("DELETE FROM Songs")
-cursor.execute("DELETE FROM Artists")
-cursor.execute("DELETE FROM Song_Artists")
-conn.commit()
-print("已清空表数据")
-
-# 读取 CSV 文件
-csv_path = r"C:\\Users\\Administrator\\Desktop\\tet\\dataall.csv"
-df = pd.read_csv(csv_path)
-
-# 将 NaN 和 '-' 替换为 None
-df['peak_pos'] = df['peak_pos'].replace({np.nan: None, '-': None})
-df['last_week'] = df['last_week'].replace({np.nan: None, '-': None})
-df['weeks_on_chart'] = df['weeks_on_chart'].replace({np.nan: None, '-': None})
-df['chart_date'] = pd.to_datetime(df['chart_date'], errors='coerce')  # 转换日期格式，无法转换的会变成 NaT (Not a Time)
-
-# 插入 Songs 和 Charts 表
-for _, row in df.iterrows():
-    name = row['name']
-    peak_pos = row['peak_pos']
-
-    # 插入 Songs 表
-    cursor.execute("INSERT IGNORE INTO Songs (name, peak_pos) VALUES (%s, %s)", (name, peak_pos))
+"""
+
+# 整体重建时新版本先写入的暂存库、发布后旧版本移入的库（库名为正式库名加后缀）
+STAGING_SUFFIX = '_staging'
+RETIRED_SUFFIX = '_retired'
+
+
+def get_connection(database=None):
+    """连接数据库（默认与 keshihua.py 读取同一个库，database 可指定暂存库）"""
+    return pymysql.connect(
+        host=shuju.DB_CONFIG['host'],
+        port=shuju.DB_CONFIG['port'],
+        user=shuju.DB_CONFIG['user'],
+        password=shuju.DB_CONFIG['password'],
+        database=database or shuju.DB_CONFIG['database'],
+        charset='utf8mb3'
+    )
+
+
+def create_tables(cursor):
+    """创建 keshihua.py 查询所用的表（如果不存在）"""
+    # 歌曲表：同名不同歌手视为不同歌曲，名称按二进制比较以与爬取数据一一对应
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS songs (
+            song_id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) COLLATE utf8mb3_bin,
+            singer VARCHAR(255) COLLATE utf8mb3_bin,
+            peak_pos INT,
+            UNIQUE KEY uk_song (name, singer)
+        );
+    """)
+
+    # 艺术家表
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS artists (
+            artist_id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) COLLATE utf8mb3_bin,
+            UNIQUE KEY uk_name (name)
+        );
+    """)
+
+    # 歌曲-艺术家关联表
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS song_artists (
+            song_id INT,
+            artist_id INT,
+            PRIMARY KEY (song_id, artist_id)
+        );
+    """)
+
+    # 每周排名表
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS chart_entries (
+            entry_id INT AUTO_INCREMENT PRIMARY KEY,
+            song_id INT,
+            `rank` INT,
+            last_week_rank INT,
+            weeks_on_chart INT,
+            chart_date DATE,
+            year INT,
+            week INT,
+            FOREIGN KEY (song_id) REFERENCES songs(song_id),
+            INDEX idx_chart_date (chart_date),  -- 可视化按日期范围筛选时走索引范围扫描
+            INDEX idx_song_date (song_id, chart_date)
+        );
+    """)
+
+    # 周间变动事件表
+    cursor.execute(bianhua.CREATE_EVENTS_TABLE)
+
+    # 年份 × 艺术家汇总表
+    huizong.create_tables(cursor)
+
+    # 歌名词频索引表
+    cipin.create_tables(cursor)
+
+    # 数据库版本表
+    cursor.execute(CREATE_VERSION_TABLE)
+
+
+def clear_tables(cursor):
+    """清空表数据（在暂存库或基准测试库中整体重建时使用）"""
+    for table in TABLES:
+        cursor.execute(f"DELETE FROM {table}")
+
+
+def bump_version(cursor):
+    """写入新的数据库版本号（随本次写入的数据在同一事务中提交）"""
+    cursor.execute("REPLACE INTO db_version (id, version, updated_at) VALUES (1, %s, NOW())", (uuid.uuid4().hex,))
+
+
+def to_db_values(series):
+    """将 pd.NA / NaN 转换为 None，数字转换为 Python 原生类型以便写入数据库"""
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def insert_batches(cursor, sql, rows):
+    """分批执行 executemany"""
+    for start in range(0, len(rows), BATCH_SIZE):
+        cursor.executemany(sql, rows[start:start + BATCH_SIZE])
+
+
+def select_ids(cursor, sql, keys, width=1):
+    """
+    按唯一键分批查询编号：sql 中的 {placeholders} 替换为本批的占位符，keys 为键的列表（width 大于 1 时每个键为元组），
+    只读取这些键对应的行，增量导入一周时不随历史数据量变慢。返回查询结果的所有行。
+    """
+    placeholder = '%s' if width == 1 else '(' + ', '.join(['%s'] * width) + ')'
+    rows = []
+    for start in range(0, len(keys), BATCH_SIZE):
+        batch = keys[start:start + BATCH_SIZE]
+        params = tuple(value for key in batch for value in (key if width > 1 else (key,)))
+        cursor.execute(sql.format(placeholders=', '.join([placeholder] * len(batch))), params)
+        rows.extend(cursor.fetchall())
+    return rows
+
+
+def upsert_songs(cursor, df):
+    """
+    写入歌曲、艺术家及其关联，返回 song_idx -> song_id 的映射（Series）。
+    已存在的歌曲和艺术家保持原有编号；编号只按 df 中出现的歌曲和艺术家查询（走唯一索引）。
+    """
+    songs = (df.groupby('song_idx', observed=True)
+             .agg(name=('name', 'first'), singer=('singer', 'first'), peak_pos=('peak_pos', 'min'))
+             .reset_index())
+    songs['name'] = songs['name'].astype(str)
+    songs['singer'] = songs['singer'].astype(str)
+    insert_batches(cursor, "INSERT IGNORE INTO songs (name, singer, peak_pos) VALUES (%s, %s, %s)",
+                   list(zip(songs['name'], songs['singer'], to_db_values(songs['peak_pos']))))
+    keys = list(zip(songs['name'], songs['singer']))
+    song_ids = {(name, singer): song_id for song_id, name, singer in select_ids(
+        cursor, "SELECT song_id, name, singer FROM songs WHERE (name, singer) IN ({placeholders})", keys, width=2)}
+    songs['song_id'] = [song_ids[(name, singer)] for name, singer in zip(songs['name'], songs['singer'])]
+
+    # 拆分歌手字段，写入艺术家和关联表
+    credits = [(song_id, artist)
+               for song_id, singer in zip(songs['song_id'], songs['singer'])
+               for artist in shuju.split_artists(singer)]
+    artist_names = sorted({artist for _, artist in credits})
+    insert_batches(cursor, "INSERT IGNORE INTO artists (name) VALUES (%s)", [(name,) for name in artist_names])
+    artist_ids = {name: artist_id for artist_id, name in select_ids(
+        cursor, "SELECT artist_id, name FROM artists WHERE name IN ({placeholders})", artist_names)}
+    insert_batches(cursor, "INSERT IGNORE INTO song_artists (song_id, artist_id) VALUES (%s, %s)",
+                   [(song_id, artist_ids[artist]) for song_id, artist in credits])
+    return songs.set_index('song_idx')['song_id']
+
+
+def insert_entries(cursor, df, song_map):
+    """写入每周排名"""
+    rows = list(zip(
+        song_map.reindex(df['song_idx']).tolist(),
+        to_db_values(df['rank']),
+        to_db_values(df['last_week']),
+        to_db_values(df['weeks_on_chart']),
+        df['chart_date'].dt.date.tolist(),
+        to_db_values(df['year']),
+        to_db_values(df['week']),
+    ))
+    insert_batches(cursor, """
+        INSERT INTO chart_entries (song_id, `rank`, last_week_rank, weeks_on_chart, chart_date, year, week)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+    """, rows)
+
+
+def insert_events(cursor, events):
+    """写入周间变动事件（song_id 已是数据库编号）"""
+    rows = list(zip(
+        events['song_id'].astype(int).tolist(),
+        pd.to_datetime(events['chart_date']).dt.date.tolist(),
+        events['event_type'].tolist(),
+        to_db_values(events['rank']),
+        to_db_values(events['prev_rank']),
+        to_db_values(events['rank_change']),
+    ))
+    insert_batches(cursor, """
+        INSERT INTO chart_events (song_id, chart_date, event_type, `rank`, prev_rank, rank_change)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, rows)
+
+
+def import_frame(conn, df):
+    """整体导入榜单数据，并一次性重建事件表、汇总表和词频索引"""
+    cursor = conn.cursor()
+    song_map = upsert_songs(cursor, df)
+    insert_entries(cursor, df, song_map)
+    events = bianhua.build_events(df)
+    events['song_id'] = song_map.reindex(events['song_id']).to_numpy()
+    insert_events(cursor, events)
+    huizong.rebuild_rollups(cursor)
+    cipin.rebuild_terms(cursor)
+    bump_version(cursor)
     conn.commit()
+    cursor.close()
+    print(f"已导入 {len(df)} 条排名，{len(song_map)} 首歌曲，{len(events)} 条变动事件")
 
-    # 获取 song_id
-    cursor.execute("SELECT song_id FROM Songs WHERE name = %s", (name,))
-    song_id = cursor.fetchone()[0]
 
-    # 插入 Charts 表
-    try:
+def drop_foreign_keys(cursor, table):
+    """删除表的所有外键"""
+    cursor.execute("""
+        SELECT CONSTRAINT_NAME FROM information_schema.REFERENTIAL_CONSTRAINTS
+        WHERE CONSTRAINT_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,))
+    foreign_keys = [row[0] for row in cursor.fetchall()]
+    if foreign_keys:
+        cursor.execute(f"ALTER TABLE {table} " + ", ".join(f"DROP FOREIGN KEY `{name}`" for name in foreign_keys))
+
+
+def drop_secondary_indexes(cursor, table):
+    """删除表的外键和二级索引（只删除 SECONDARY_INDEXES 中登记的索引，不存在的跳过）"""
+    drop_foreign_keys(cursor, table)
+    cursor.execute("""
+        SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,))
+    indexes = [row[0] for row in cursor.fetchall() if row[0] in SECONDARY_INDEXES[table]]
+    if indexes:
+        cursor.execute(f"ALTER TABLE {table} " + ", ".join(f"DROP INDEX `{name}`" for name in indexes))
+
+
+def build_secondary_indexes(cursor, table):
+    """
+    一次 ALTER TABLE 建立表中缺少的二级索引和外键（对已导入的数据排序建索引，而不是逐行维护）。
+    外键在 foreign_key_checks = 0 时添加，不再逐行校验已导入的数据（歌曲编号均来自 upsert_songs）。
+    """
+    cursor.execute("""
+        SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,))
+    existing = {row[0] for row in cursor.fetchall()}
+    clauses = [f"ADD INDEX `{name}` {columns}" for name, columns in SECONDARY_INDEXES[table].items()
+               if name not in existing]
+    if table in FOREIGN_KEYS:
         cursor.execute("""
-            INSERT INTO Charts (song_id, `rank`, last_week, weeks_on_chart, chart_date, year, week)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """, (
-            song_id,
-            row['rank'],
-            row['last_week'],
-            row['weeks_on_chart'],
-            row['chart_date'],
-            row['year'],
-            row['week']
-        ))
-        conn.commit()
-    except Exception as e:
-        print(f"插入 Charts 表失败: {e}")
-
-    # 清洗并插入歌手
-    singers_raw = str(row['singer'])
-    if singers_raw.lower() in ['n/a', '-', 'nan']:
-        continue
-
-    cleaned = re.sub(r'\b(Featuring|feat\.?|Ft\.?)\b', '&', singers_raw, flags=re.IGNORECASE)
-    artists = re.split(r'&|,|/| and ', cleaned)
-
-    for artist in artists:
-        artist = artist.strip()
-        if artist == '':
-            continue
-
-        # 插入 Artists 表
-        cursor.execute("INSERT IGNORE INTO Artists (name) VALUES (%s)", (artist,))
-        conn.commit()
-
-        # 获取 artist_id
-        cursor.execute("SELECT artist_id FROM Artists WHERE name = %s", (artist,))
-        artist_id = cursor.fetchone()[0]
-
-        # 插入 Song_Artists 表
-        cursor.execute("INSERT IGNORE INTO Song_Artists (song_id, artist_id) VALUES (%s, %s)", (song_id, artist_id))
-        conn.commit()
-
-# 关闭连接
-cursor.close()
-conn.close()
-print("数据导入完成！")
+            SELECT COUNT(*) FROM information_schema.REFERENTIAL_CONSTRAINTS
+            WHERE CONSTRAINT_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        """, (table,))
+        if cursor.fetchone()[0] == 0:
+            clauses.append("ADD " + FOREIGN_KEYS[table])
+    if clauses:
+        cursor.execute("SET SESSION foreign_key_checks = 0")
+        try:
+            cursor.execute(f"ALTER TABLE {table} " + ", ".join(clauses))
+        finally:
+            cursor.execute("SET SESSION foreign_key_checks = 1")
+
+
+def load_partitions(jobs, workers=IMPORT_WORKERS, database=None):
+    """
+    在连接池（连接到 database 库）上并发执行写入任务，jobs 为 [(名称, 写入函数, 参数)]，写入函数签名为 func(cursor, *参数)。
+    每个线程使用自己的连接，每个任务在一个事务中写入并提交；任务按给定顺序提交（大的分区应排在前面）。
+    """
+    local = threading.local()
+    connections = []
+    lock = threading.Lock()
+
+    def run(job):
+        name, func, args = job
+        if not hasattr(local, 'conn'):
+            local.conn = get_connection(database)
+            with lock:
+                connections.append(local.conn)
+        conn = local.conn
+        cursor = conn.cursor()
+        try:
+            func(cursor, *args)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            print(f"分区 {name} 导入失败")
+            raise
+        finally:
+            cursor.close()
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(run, jobs))
+    finally:
+        for conn in connections:
+            conn.close()
+
+
+def import_frame_parallel(conn, df, workers=IMPORT_WORKERS, database=None):
+    """
+    并行整体导入：先在 conn 上一次性写入歌曲和艺术家并得到编号，再将排名和变动事件按年份分区，
+    在 workers 个连接（连接到 database 库，需与 conn 相同）上并发写入（每个分区一个事务）；
+    写入前删除二级索引和外键，全部写入后一次性重建。最后在 conn 上重建汇总表和词频索引。
+    """
+    cursor = conn.cursor()
+    song_map = upsert_songs(cursor, df)
+    conn.commit()
+    events = bianhua.build_events(df)
+    events['song_id'] = song_map.reindex(events['song_id']).to_numpy()
+
+    jobs = [(f'chart_entries/{year}', insert_entries, (year_df, song_map))
+            for year, year_df in df.groupby('year', observed=True)]
+    event_years = pd.to_datetime(events['chart_date']).dt.year
+    jobs += [(f'chart_events/{year}', insert_events, (year_events,))
+             for year, year_events in events.groupby(event_years)]
+    # 大的分区先开始，避免最后只剩一个长任务
+    jobs.sort(key=lambda job: len(job[2][0]), reverse=True)
+
+    for table in SECONDARY_INDEXES:
+        drop_secondary_indexes(cursor, table)
+    try:
+        load_partitions(jobs, workers, database)
+    finally:
+        for table in SECONDARY_INDEXES:
+            build_secondary_indexes(cursor, table)
+    huizong.rebuild_rollups(cursor)
+    cipin.rebuild_terms(cursor)
+    bump_version(cursor)
+    conn.commit()
+    cursor.close()
+    print(f"已导入 {len(df)} 条排名，{len(song_map)} 首歌曲，{len(events)} 条变动事件"
+          f"（{len(jobs)} 个分区，{workers} 个连接）")
+
+
+def publish_rebuild(df, workers=1):
+    """
+    整体重建并原子发布：新版本在暂存库（正式库名 + STAGING_SUFFIX）中建表、导入并建好索引，
+    再用一条 RENAME TABLE 同时把正式库的所有表换成新表，旧表移入 RETIRED_SUFFIX 库后删除。
+    导入期间正式库不删除、不写入，图表查询照常读取完整的旧版本，也不与导入争抢锁；
+    RENAME TABLE 是原子的，交换前已开始的查询读完旧表，之后的查询读新表，不会看到一半的数据。
+    workers 大于 1 时在暂存库中并行导入（见 import_frame_parallel）。
+    """
+    live = shuju.DB_CONFIG['database']
+    staging, retired = live + STAGING_SUFFIX, live + RETIRED_SUFFIX
+    conn = get_connection()
+    cursor = conn.cursor()
+    create_tables(cursor)  # 交换需要正式库中的表都已存在
+    for database in (staging, retired):
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{database}` CHARACTER SET utf8mb3")
+        cursor.execute("DROP TABLE IF EXISTS " + ", ".join(f"`{database}`.`{table}`" for table in TABLES))
+    conn.commit()
+
+    staging_conn = get_connection(staging)
+    staging_cursor = staging_conn.cursor()
+    create_tables(staging_cursor)
+    staging_conn.commit()
+    if workers > 1:
+        import_frame_parallel(staging_conn, df, workers, staging)
+    else:
+        import_frame(staging_conn, df)
+    # 外键不会随 RENAME TABLE 跨库更新引用，交换前删除两边的外键，交换后在正式库中重新添加
+    for table in FOREIGN_KEYS:
+        drop_foreign_keys(staging_cursor, table)
+    staging_cursor.close()
+    staging_conn.close()
+
+    for table in FOREIGN_KEYS:
+        drop_foreign_keys(cursor, table)
+    cursor.execute("RENAME TABLE " + ", ".join(
+        f"`{live}`.`{table}` TO `{retired}`.`{table}`, `{staging}`.`{table}` TO `{live}`.`{table}`"
+        for table in TABLES))
+    for table in FOREIGN_KEYS:
+        build_secondary_indexes(cursor, table)
+    cursor.execute("DROP TABLE IF EXISTS " + ", ".join(f"`{retired}`.`{table}`" for table in TABLES))
+    conn.commit()
+    cursor.close()
+    conn.close()
+    print(f"新版本已发布到 {live}")
+
+
+def ingest_week(conn, week_df):
+    """
+    增量导入一周的榜单（需按时间顺序逐周导入）。
+    与数据库中的上一周做差，只为这一周生成变动事件。
+    """
+    week_df = shuju.compact_frame(week_df)
+    chart_date = week_df['chart_date'].iloc[0].date()
+    cursor = conn.cursor()
+    cursor.execute(CREATE_VERSION_TABLE)  # 早于版本表建立的库（建表会隐式提交，需在写入之前执行）
+    song_map = upsert_songs(cursor, week_df)
+
+    # 重复导入同一周时先删除旧数据（记下旧数据中的歌曲，它们的汇总同样需要刷新）
+    cursor.execute("SELECT song_id FROM chart_entries WHERE chart_date = %s", (chart_date,))
+    replaced_songs = {row[0] for row in cursor.fetchall()}
+    cursor.execute("DELETE FROM chart_events WHERE chart_date = %s", (chart_date,))
+    cursor.execute("DELETE FROM chart_entries WHERE chart_date = %s", (chart_date,))
+    insert_entries(cursor, week_df, song_map)
+
+    # 上一周（正好早 7 天，与 bianhua.build_events 的规则一致）的排名，该周缺失时为空
+    cursor.execute("SELECT 1 FROM chart_entries WHERE chart_date < %s LIMIT 1", (chart_date,))
+    first_week = cursor.fetchone() is None
+    cursor.execute("SELECT song_id, `rank` FROM chart_entries WHERE chart_date = %s",
+                   (chart_date - datetime.timedelta(days=7),))
+    prev_ranks = dict(cursor.fetchall())
+
+    # 本周歌曲中以前上过榜的（用于区分 debut 和 re-entry），走 idx_song_date 索引
+    cur_ranks = dict(zip(song_map.reindex(week_df['song_idx']).tolist(), to_db_values(week_df['rank'])))
+    seen_songs = set()
+    if cur_ranks:
+        placeholders = ','.join(['%s'] * len(cur_ranks))
+        cursor.execute(f"""
+            SELECT DISTINCT song_id FROM chart_entries
+            WHERE song_id IN ({placeholders}) AND chart_date < %s
+        """, (*cur_ranks.keys(), chart_date))
+        seen_songs = {row[0] for row in cursor.fetchall()}
+
+    events = bianhua.diff_weeks(prev_ranks, cur_ranks, seen_songs, chart_date, first_week)
+    insert_events(cursor, events)
+
+    # 只刷新这一年中本周新旧两份数据里的歌曲相关艺术家的汇总，并为新歌建立词频
+    year = int(week_df['year'].iloc[0])
+    huizong.refresh_rollups(cursor, year, sorted(replaced_songs | set(cur_ranks)))
+    cipin.update_terms(cursor, list(cur_ranks.keys()), year)
+    bump_version(cursor)
+    conn.commit()
+    cursor.close()
+    print(f"{chart_date} 已入库：{len(week_df)} 条排名，{len(events)} 条变动事件")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='将榜单数据整体导入数据库')
+    parser.add_argument('--workers', type=int, default=1,
+                        help=f'并行导入的连接数（大于 1 时按年份分区并发写入，建议 {IMPORT_WORKERS}）')
+    args = parser.parse_args()
+
+    # 通过共享加载模块读取紧凑类型的榜单数据（优先读取列式归档）
+    df = shuju.load_chart_data()
+
+    # 在暂存库中整体重建，完成后一次性替换正式库中的表，导入期间图表照常读取旧版本
+    publish_rebuild(df, max(1, args.workers))
+    print("数据导入完成！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+分布（直方图）计算模块
+
+任意指标的分布都由同一套接口计算：指标 + 分箱（箱数或边界）+ 筛选条件 -> 小表
+(bin_start, bin_end, label, count)，箱为左闭右开的整数区间 [bin_start, bin_end)。
+    内存计算   由紧凑榜单数据（或生命周期表）取出指标值，整数除法 / searchsorted 定位箱号后 np.bincount 计数
+    数据库计算 build_query 生成按箱分组计数的 SQL：等宽箱用 (value - lo) DIV width，
+               自定义边界用 MySQL 的 INTERVAL()，只返回每个箱的计数
+指标见 METRICS：per 为 entry（每周一条记录）、song（每首歌在筛选范围内汇总）或 lifecycle（生命周期表，只能在内存中计算）。
+"""
+import numpy as np
+import pandas as pd
+import shuju
+
+# 指标定义：显示名称、计数单位、取值范围（None 表示按数据的最小 / 最大值）、数据库中计算每个值的 SQL
+METRICS = {
+    'rank': {
+        'label': '每周排名', 'per': 'entry', 'range': (1, 100),
+        'sql': "SELECT ce.rank AS value FROM chart_entries ce{join} WHERE {where}",
+    },
+    'rank_change': {
+        'label': '排名周变化（正数为上升）', 'per': 'entry', 'range': (-99, 99),
+        'sql': "SELECT ce.last_week_rank - ce.rank AS value FROM chart_entries ce{join} "
+               "WHERE {where} AND ce.last_week_rank IS NOT NULL",
+    },
+    'peak_rank': {
+        'label': '最高排名', 'per': 'song', 'range': (1, 100),
+        'sql': "SELECT MIN(ce.rank) AS value FROM chart_entries ce{join} WHERE {where} GROUP BY ce.song_id",
+    },
+    'weeks_on_chart': {
+        'label': '在榜周数', 'per': 'song', 'range': None,
+        'sql': "SELECT COUNT(*) AS value FROM chart_entries ce{join} WHERE {where} GROUP BY ce.song_id",
+    },
+    'time_to_peak': {'label': '到达最高排名所需周数', 'per': 'lifecycle', 'range': None, 'sql': None},
+    'weeks_at_peak': {'label': '处于最高排名的周数', 'per': 'lifecycle', 'range': None, 'sql': None},
+    'chart_runs': {'label': '连续在榜段数', 'per': 'lifecycle', 'range': None, 'sql': None},
+}
+
+# 按艺术家筛选时附加的连接（与 keshihua 中按艺术家查询的写法一致）
+ARTIST_JOIN = (" JOIN song_artists sa ON ce.song_id = sa.song_id "
+               "JOIN artists a ON sa.artist_id = a.artist_id")
+
+
+def get_metric(metric):
+    """返回指标定义，未知指标抛出 ValueError"""
+    if metric not in METRICS:
+        raise ValueError(f"未知指标: {metric}（可选: {', '.join(METRICS)}）")
+    return METRICS[metric]
+
+
+def make_edges(bins, lo=None, hi=None):
+    """
+    生成整数箱边界。
+    bins 为整数时把 [lo, hi]（含两端）等分为最多 bins 个等宽箱，边界依次为 lo, lo + width, ...；
+    bins 为序列时直接作为边界（需为严格递增的整数）。
+    """
+    if np.ndim(bins) == 0:
+        bins = int(bins)
+        if bins < 1:
+            raise ValueError("箱数至少为 1")
+        if lo is None or hi is None:
+            raise ValueError("等宽分箱需要取值范围")
+        width = max(1, -(-(int(hi) - int(lo) + 1) // bins))
+        count = -(-(int(hi) - int(lo) + 1) // width)
+        return int(lo) + width * np.arange(count + 1, dtype=np.int64)
+    edges = np.asarray(bins, dtype=np.float64)
+    if len(edges) < 2 or np.any(np.diff(edges) <= 0) or np.any(edges != np.round(edges)):
+        raise ValueError("箱边界需为至少两个严格递增的整数")
+    return edges.astype(np.int64)
+
+
+def is_uniform(edges):
+    """边界是否等宽（等宽时用整数除法定位箱号）"""
+    return len(edges) < 3 or bool(np.all(np.diff(edges) == edges[1] - edges[0]))
+
+
+def count_bins(values, edges):
+    """统计每个箱 [edges[i], edges[i+1]) 中的值的个数，超出范围的值不计"""
+    values = np.asarray(values, dtype=np.int64)
+    values = values[(values >= edges[0]) & (values < edges[-1])]
+    if is_uniform(edges):
+        index = (values - edges[0]) // (edges[1] - edges[0])
+    else:
+        index = np.searchsorted(edges, values, side='right') - 1
+    return np.bincount(index, minlength=len(edges) - 1)
+
+
+def histogram_frame(edges, counts):
+    """由边界和计数组成结果表；整数区间的标签为 'a-b'（含两端，有负数时为 'a~b'），宽度为 1 时为 'a'"""
+    starts, ends = edges[:-1], edges[1:]
+    sep = '~' if edges[0] < 0 else '-'
+    labels = [str(a) if b - a == 1 else f'{a}{sep}{b - 1}' for a, b in zip(starts.tolist(), ends.tolist())]
+    return pd.DataFrame({
+        'bin_start': starts,
+        'bin_end': ends,
+        'label': labels,
+        'count': np.asarray(counts, dtype=np.int64),
+    })
+
+
+def artist_mask(df, artist_name):
+    """紧凑榜单数据中署名包含该艺术家的行（按署名拆分规则匹配，只检查包含该名字的分类取值）"""
+    singers = df['singer'].cat.categories
+    singers = singers[singers.str.contains(artist_name, regex=False)]
+    matched = [singer for singer in singers if artist_name in shuju.split_artists(singer)]
+    return df['singer'].isin(matched).to_numpy()
+
+
+def metric_values(metric, df=None, lifecycles=None):
+    """
+    取出指标值（整数数组）。
+    entry / song 指标由紧凑榜单数据 df（需含 song_idx、rank、last_week）计算；lifecycle 指标取生命周期表中的同名列。
+    """
+    per = get_metric(metric)['per']
+    if per == 'lifecycle':
+        return lifecycles[metric].to_numpy(dtype=np.int64)
+    rank = df['rank'].to_numpy(dtype=np.int64, na_value=0)
+    if metric == 'rank':
+        return rank
+    if metric == 'rank_change':
+        last_week = df['last_week'].to_numpy(dtype=np.int64, na_value=0)
+        present = last_week > 0
+        return last_week[present] - rank[present]
+    # 按歌曲汇总：song_idx 是全局编号，bincount / minimum.at 后只保留出现过的歌曲
+    song = df['song_idx'].to_numpy()
+    weeks = np.bincount(song)
+    present = weeks > 0
+    if metric == 'weeks_on_chart':
+        return weeks[present]
+    peak = np.full(len(weeks), np.iinfo(np.int64).max)
+    np.minimum.at(peak, song, rank)
+    return peak[present]
+
+
+def histogram(metric, bins=10, df=None, lifecycles=None):
+    """在内存中计算指标的分布，返回结果表（见 histogram_frame）"""
+    values = metric_values(metric, df, lifecycles)
+    value_range = get_metric(metric)['range']
+    if value_range is None:
+        value_range = (values.min(), values.max()) if len(values) else (0, 0)
+    edges = make_edges(bins, *value_range)
+    return histogram_frame(edges, count_bins(values, edges))
+
+
+def build_value_query(metric, date_filter, artist=False):
+    """数据库中计算每个指标值的子查询"""
+    sql = get_metric(metric)['sql']
+    if sql is None:
+        raise ValueError(f"指标 {metric} 只能在内存中计算")
+    where = date_filter + (" AND a.name = :artist_name" if artist else "")
+    return sql.format(join=ARTIST_JOIN if artist else "", where=where)
+
+
+def build_range_query(metric, date_filter, artist=False):
+    """取值范围未知的指标先查询最小 / 最大值，用于生成等宽箱"""
+    return f"SELECT MIN(value) AS lo, MAX(value) AS hi FROM ({build_value_query(metric, date_filter, artist)}) AS sub"
+
+
+def build_query(metric, edges, date_filter, artist=False):
+    """
+    生成在数据库中按箱计数的 SQL 及边界绑定参数（日期 / 艺术家参数由调用方合并）。
+    返回的每行为 (bucket, count)，bucket 为从 0 开始的箱号。
+    """
+    params = {'lo': int(edges[0]), 'hi': int(edges[-1])}
+    if is_uniform(edges):
+        params['width'] = int(edges[1] - edges[0])
+        bucket = "(value - :lo) DIV :width"
+    else:
+        names = [f'e{i}' for i in range(len(edges))]
+        params.update({name: int(edge) for name, edge in zip(names, edges)})
+        bucket = "INTERVAL(value, " + ", ".join(f':{name}' for name in names) + ") - 1"
+    query = f"""
+    SELECT {bucket} AS bucket, COUNT(*) AS count
+    FROM ({build_value_query(metric, date_filter, artist)}) AS sub
+    WHERE value >= :lo AND value < :hi
+    GROUP BY bucket
+    """
+    return query, params
+
+
+def from_bucket_counts(edges, bucket_df):
+    """将数据库返回的 (bucket, count) 补全为每个箱都有一行的结果表"""
+    counts = np.zeros(len(edges) - 1, dtype=np.int64)
+    if bucket_df is not None and not bucket_df.empty:
+        buckets = bucket_df['bucket'].to_numpy(dtype=np.int64)
+        counts[buckets] = bucket_df['count'].to_numpy(dtype=np.int64)
+    return histogram_frame(edges, counts)
@@ -0,0 +1,372 @@
+# -*- coding: utf-8 -*-
+"""
+本地图表 HTTP 服务
+
+在 keshihua 的 plot_* 函数前提供 HTTP 接口，便于在看板中嵌入图表：
+    GET /charts                                   可用图表及其参数（JSON）
+    GET /charts/top_artists?from=2020-01-01&to=2024-12-31&format=png|svg|json
+    GET /charts/search_trend?q=Taylor%20Swift
+    GET /charts/distribution?metric=weeks_on_chart&bins=1,2,5,10,20,53&format=json
+    GET /charts/trend_comparison?terms=Drake,Taylor%20Swift,SZA
+    GET /charts/streak_records?from=2020-01-01&to=2020-12-31&format=json
+    GET /health                                   数据版本、缓存和渲染队列状态
+
+数据快照：所有请求都按 shuju.data_version() 取同一个数据版本，渲染进程的内存缓存（紧凑数据、生命周期表、
+合作网络）随版本自动刷新；查询数据库的图表另按 shuju.db_version()（dada.py 每次写入时更新）区分版本，
+归档已更新而数据库尚未写入、或只重建了数据库时都不会返回旧结果。两个版本号每 VERSION_TTL 秒最多读取一次，
+数据库版本由后台线程读取，数据库不可用时不阻塞请求，沿用最后一次读到的版本。
+缓存：响应按 (数据版本, 图表, 参数, 格式) 缓存在内存中（LRU），ETag 由同一组键生成，
+If-None-Match 命中时直接返回 304，看板轮询不触发任何渲染。
+并发：pyplot 不是线程安全的，渲染在有界的进程池中执行（RENDER_WORKERS 个进程），
+HTTP 线程只等待结果，冷渲染不会阻塞命中缓存的请求；相同请求同时到达时只渲染一次；
+排队的渲染超过 MAX_PENDING 时返回 503。
+
+用法：python fuwu.py --port 8800 --workers 2
+"""
+import os
+import json
+import time
+import hashlib
+import inspect
+import tempfile
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import multiprocessing
+import pandas as pd
+import shuju
+
+# 监听地址和端口
+HOST = '127.0.0.1'
+PORT = 8800
+
+# 渲染进程数、最多排队的渲染数、响应缓存条数、数据版本号的缓存时间（秒）
+RENDER_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+MAX_PENDING = 32
+CACHE_SIZE = 256
+VERSION_TTL = 1.0
+
+# 图表分辨率的默认值和上限
+DEFAULT_DPI = 100
+MAX_DPI = 300
+
+# 支持的输出格式
+CONTENT_TYPES = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+    'json': 'application/json; charset=utf-8',
+}
+
+# URL 参数 -> plot_* 函数参数，以及参数类型
+PARAM_ALIASES = {
+    'from': 'start_date',
+    'to': 'end_date',
+    'artist': 'artist_name',
+    'q': 'search_str',
+    'terms': 'search_terms',
+}
+INT_PARAMS = {'decade', 'year', 'top_n', 'max_weeks', 'max_points', 'dpi'}
+
+
+def chart_registry():
+    """keshihua 中可通过服务访问的图表：名称（去掉 plot_ 前缀）-> {'params': 参数列表, 'required': 必填参数}"""
+    import keshihua
+    charts = {}
+    for name, func in inspect.getmembers(keshihua, inspect.isfunction):
+        if name.startswith('plot_') and func.__module__ == keshihua.__name__:
+            parameters = [p for p in inspect.signature(func).parameters.values() if p.name != 'figsize']
+            charts[name[len('plot_'):]] = {
+                'params': [p.name for p in parameters],
+                'required': [p.name for p in parameters if p.default is inspect.Parameter.empty],
+            }
+    return charts
+
+
+# ---------- 渲染进程 ----------
+
+_worker_dir = None
+_db_queries = [0]
+
+
+def _init_worker():
+    """渲染进程初始化：使用无界面的后端，图表写入进程自己的临时目录"""
+    global _worker_dir
+    import matplotlib
+    matplotlib.use('Agg')
+    _worker_dir = tempfile.mkdtemp(prefix='chart-worker-')
+    # 记录渲染期间是否查询了数据库（决定缓存键是否包含数据库版本）
+    import keshihua
+    query = keshihua.get_data_from_query
+
+    def counted_query(*args, **kwargs):
+        _db_queries[0] += 1
+        return query(*args, **kwargs)
+    keshihua.get_data_from_query = counted_query
+
+
+def _to_json(data):
+    """将绘图数据转换为 JSON 文本"""
+    if data is None:
+        return None
+    if hasattr(data, 'to_json'):
+        data = data.reset_index(drop=True) if data.index.name is None else data.reset_index()
+        data.columns = [str(column) for column in data.columns]
+        return data.to_json(orient='records', date_format='iso', force_ascii=False)
+    return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def render_chart(chart, kwargs, fmt):
+    """
+    在渲染进程中调用 plot_* 函数，返回 (输出内容 bytes, 是否查询了数据库)，没有数据时输出内容为 None。
+    """
+    import keshihua
+    keshihua.OUTPUT_DIR = _worker_dir
+    keshihua.CHART_FORMAT = None if fmt == 'json' else fmt
+    for entry in os.listdir(_worker_dir):
+        os.remove(os.path.join(_worker_dir, entry))
+    _db_queries[0] = 0
+    data = getattr(keshihua, f'plot_{chart}')(**kwargs)
+    used_db = _db_queries[0] > 0
+    if fmt == 'json':
+        text = _to_json(data)
+        return (text.encode('utf-8') if text is not None else None), used_db
+    files = [os.path.join(_worker_dir, entry) for entry in os.listdir(_worker_dir) if entry.endswith('.' + fmt)]
+    if not files:
+        return None, used_db
+    with open(max(files, key=os.path.getmtime), 'rb') as f:
+        return f.read(), used_db
+
+
+# ---------- 服务进程 ----------
+
+class ChartService:
+    """响应缓存、ETag、相同请求合并以及渲染进程池"""
+
+    def __init__(self, workers=RENDER_WORKERS):
+        self.charts = chart_registry()
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                        mp_context=multiprocessing.get_context('spawn'))
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.cache = OrderedDict()   # 键 -> (etag, body)
+        self.inflight = {}           # 键 -> Future
+        self.version = (None, 0.0)      # (归档版本, 读取时间)
+        self.db_version = (None, 0.0)   # (数据库版本, 读取时间)
+        self.db_refresh = None          # 正在读取数据库版本的后台线程
+        self.uses_db = {}            # 图表 -> 渲染时是否查询过数据库（未渲染过的图表按查询数据库处理）
+        self.stats = {'hits': 0, 'not_modified': 0, 'renders': 0, 'coalesced': 0, 'rejected': 0}
+        self._refresh_db_version()
+
+    def data_version(self):
+        """
+        当前的 (归档版本, 数据库版本)（VERSION_TTL 秒内复用），同一时刻的请求看到同一个快照。
+        版本号都在锁外读取：归档版本在请求线程中读取（只需读取文件信息），数据库版本由后台线程刷新，
+        数据库不可用或很慢时请求不会等待连接超时，继续使用最后一次读到的数据库版本。
+        """
+        with self.lock:
+            archive_version, checked = self.version
+            if (time.monotonic() - self.db_version[1] > VERSION_TTL
+                    and (self.db_refresh is None or not self.db_refresh.is_alive())):
+                self.db_refresh = threading.Thread(target=self._refresh_db_version, daemon=True)
+                self.db_refresh.start()
+        if archive_version is None or time.monotonic() - checked > VERSION_TTL:
+            archive_version = shuju.data_version()
+            with self.lock:
+                self.version = (archive_version, time.monotonic())
+        with self.lock:
+            return archive_version, self.db_version[0]
+
+    def _refresh_db_version(self):
+        """读取数据库版本（可能等待连接超时，不持有锁），读取失败时保留原来的版本"""
+        version = None
+        try:
+            version = shuju.db_version()
+        finally:
+            with self.lock:
+                self.db_version = (version or self.db_version[0], time.monotonic())
+
+    def cache_key(self, chart, kwargs, fmt):
+        """缓存键：查询数据库的图表包含数据库版本，只读取归档的图表不受数据库写入影响"""
+        archive_version, db_version = self.data_version()
+        with self.lock:
+            uses_db = self.uses_db.get(chart, True)
+        version = (archive_version, db_version) if uses_db else archive_version
+        return (version, chart, tuple(sorted(kwargs.items())), fmt)
+
+    def parse_request(self, chart, query):
+        """校验图表名和参数，返回 (plot_* 参数, 输出格式)，不合法时抛出 ValueError"""
+        if chart not in self.charts:
+            raise ValueError(f'未知图表: {chart}')
+        allowed = self.charts[chart]['params']
+        fmt = query.pop('format', ['png'])[-1]
+        if fmt not in CONTENT_TYPES:
+            raise ValueError(f'不支持的格式: {fmt}')
+        kwargs = {}
+        for key, values in query.items():
+            name = PARAM_ALIASES.get(key, key)
+            if name not in allowed:
+                raise ValueError(f'图表 {chart} 不支持参数: {key}')
+            value = values[-1]
+            if name == 'bins':
+                try:
+                    value = [int(edge) for edge in value.split(',')] if ',' in value else int(value)
+                except ValueError:
+                    raise ValueError(f'参数 {key} 需要箱数或逗号分隔的整数边界') from None
+            elif name == 'search_terms':
+                value = [term.strip() for term in value.split(',') if term.strip()]
+            elif name in INT_PARAMS:
+                try:
+                    value = int(value)
+                except ValueError:
+                    raise ValueError(f'参数 {key} 需要整数') from None
+            elif name in ('start_date', 'end_date'):
+                try:
+                    value = pd.Timestamp(value).date().isoformat()
+                except ValueError:
+                    raise ValueError(f'参数 {key} 不是有效日期') from None
+            kwargs[name] = value
+        # 列表参数转为元组，便于作为缓存键
+        kwargs = {name: tuple(value) if isinstance(value, list) else value for name, value in kwargs.items()}
+        kwargs['dpi'] = max(30, min(MAX_DPI, kwargs.get('dpi', DEFAULT_DPI)))
+        for name in self.charts[chart]['required']:
+            if name not in kwargs:
+                raise ValueError(f'图表 {chart} 需要参数: {name}')
+        return kwargs, fmt
+
+    @staticmethod
+    def make_etag(key):
+        return '"' + hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:20] + '"'
+
+    def get(self, chart, kwargs, fmt, if_none_match=None):
+        """
+        返回 (状态码, etag, body)。
+        命中 ETag 时返回 304；命中缓存时直接返回；否则提交渲染并等待（相同请求共用一次渲染）。
+        """
+        key = self.cache_key(chart, kwargs, fmt)
+        etag = self.make_etag(key)
+        with self.lock:
+            if if_none_match and etag in [tag.strip() for tag in if_none_match.split(',')]:
+                self.stats['not_modified'] += 1
+                return 304, etag, b''
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.stats['hits'] += 1
+                return 200, etag, self.cache[key][1]
+            future = self.inflight.get(key)
+            if future is not None:
+                self.stats['coalesced'] += 1
+            else:
+                if len(self.inflight) >= MAX_PENDING:
+                    self.stats['rejected'] += 1
+                    return 503, None, '渲染队列已满，请稍后重试'.encode('utf-8')
+                future = self.pool.submit(render_chart, chart, kwargs, fmt)
+                self.inflight[key] = future
+                self.stats['renders'] += 1
+        try:
+            body, used_db = future.result()
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+        with self.lock:
+            # 同一图表的不同参数可能走不同的数据源（如 distribution 的 source），查询过数据库后一直按数据库处理
+            uses_db = self.uses_db.get(chart, False) or used_db
+            learned = self.uses_db.get(chart) != uses_db
+            self.uses_db[chart] = uses_db
+        if body is None:
+            return 404, None, '没有可绘制的数据'.encode('utf-8')
+        if learned:
+            # 首次渲染或首次查询数据库：按新的判断重新生成缓存键
+            key = self.cache_key(chart, kwargs, fmt)
+            etag = self.make_etag(key)
+        with self.lock:
+            self.cache[key] = (etag, body)
+            self.cache.move_to_end(key)
+            while len(self.cache) > CACHE_SIZE:
+                self.cache.popitem(last=False)
+        return 200, etag, body
+
+    def health(self):
+        with self.lock:
+            return {'data_version': self.version[0], 'db_version': self.db_version[0], 'workers': self.workers, 'cached': len(self.cache),
+                    'rendering': len(self.inflight), **self.stats}
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+class ChartRequestHandler(BaseHTTPRequestHandler):
+    """HTTP 请求处理"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        service = self.server.service
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        try:
+            if parts == ['health']:
+                self._send_json(200, service.health())
+            elif parts == ['charts']:
+                self._send_json(200, service.charts)
+            elif len(parts) == 2 and parts[0] == 'charts':
+                kwargs, fmt = service.parse_request(parts[1], parse_qs(url.query))
+                status, etag, body = service.get(parts[1], kwargs, fmt, self.headers.get('If-None-Match'))
+                content_type = CONTENT_TYPES[fmt] if status in (200, 304) else 'text/plain; charset=utf-8'
+                self._send(status, body, content_type, etag)
+            else:
+                self._send(404, '未找到'.encode('utf-8'), 'text/plain; charset=utf-8')
+        except ValueError as e:
+            self._send(400, str(e).encode('utf-8'), 'text/plain; charset=utf-8')
+        except Exception as e:
+            self._send(500, f'渲染失败: {e}'.encode('utf-8'), 'text/plain; charset=utf-8')
+
+    def _send_json(self, status, data):
+        self._send(status, json.dumps(data, ensure_ascii=False).encode('utf-8'), CONTENT_TYPES['json'])
+
+    def _send(self, status, body, content_type, etag=None):
+        self.send_response(status)
+        if etag is not None:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')  # 浏览器每次带 If-None-Match 验证
+        if status == 503:
+            self.send_header('Retry-After', '1')
+        if status != 304:
+            self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host=HOST, port=PORT, workers=RENDER_WORKERS):
+    """创建图表服务（尚未开始监听循环）"""
+    server = ThreadingHTTPServer((host, port), ChartRequestHandler)
+    server.daemon_threads = True
+    server.service = ChartService(workers)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地图表 HTTP 服务')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--workers', type=int, default=RENDER_WORKERS, help='渲染进程数')
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, max(1, args.workers))
+    print(f"图表服务已启动: http://{args.host}:{args.port}/charts （{server.service.workers} 个渲染进程）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("图表服务已停止")
+    finally:
+        server.service.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
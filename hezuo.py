@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+艺术家合作网络模块
+
+由歌曲 → 艺术家的署名关系构建稀疏的合作矩阵（SciPy CSR）：
+两位艺术家共同署名的每首歌，按该歌曲的在榜周数累加边权。
+在矩阵上向量化计算度数、加权 PageRank 和连通分量，结果按数据版本缓存。
+"""
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+import shuju
+
+# 结果缓存：(数据版本, 起始日期, 结束日期) -> 网络
+_graph_cache = {}
+
+
+def build_graph(df):
+    """
+    由榜单数据构建合作网络。
+    df 需要包含 song_idx 和 singer 列，每行代表一首歌的一周在榜记录。
+    返回 (艺术家名称 Index, 合作矩阵 csr_matrix)。
+    """
+    songs = df.groupby('song_idx', observed=True).agg(singer=('singer', 'first'), weeks=('singer', 'size'))
+    # 展开每首歌的全部署名艺术家
+    credits = songs['singer'].astype(str).map(shuju.split_artists).explode().dropna()
+    song_rows, song_index = pd.factorize(credits.index)
+    artist_cols, artists = pd.factorize(credits.to_numpy())
+    weeks = songs['weeks'].reindex(song_index).to_numpy(dtype=np.float64)
+
+    # 歌曲 × 艺术家的署名矩阵 B，合作矩阵 A = Bᵀ · diag(在榜周数) · B，去掉对角线
+    incidence = sparse.csr_matrix((np.ones(len(song_rows)), (song_rows, artist_cols)),
+                                  shape=(len(song_index), len(artists)))
+    adjacency = (incidence.T @ sparse.diags(weeks) @ incidence).tocsr()
+    adjacency.setdiag(0)
+    adjacency.eliminate_zeros()
+    return pd.Index(artists, name='artist'), adjacency
+
+
+def pagerank(adjacency, damping=0.85, tol=1e-10, max_iter=100):
+    """加权 PageRank（幂迭代，没有合作的艺术家均匀分配其权重）"""
+    n = adjacency.shape[0]
+    if n == 0:
+        return np.array([])
+    out_weight = np.asarray(adjacency.sum(axis=1)).ravel()
+    dangling = out_weight == 0
+    inv_weight = np.divide(1.0, out_weight, out=np.zeros(n), where=~dangling)
+    transition = (sparse.diags(inv_weight) @ adjacency).T.tocsr()
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        new_rank = damping * (transition @ rank + rank[dangling].sum() / n) + (1 - damping) / n
+        if np.abs(new_rank - rank).sum() < tol:
+            rank = new_rank
+            break
+        rank = new_rank
+    return rank / rank.sum()
+
+
+def graph_metrics(artists, adjacency):
+    """计算每位艺术家的合作人数、加权度数、PageRank 和所属连通分量"""
+    n_components, labels = connected_components(adjacency, directed=False)
+    component_sizes = np.bincount(labels, minlength=n_components)
+    metrics = pd.DataFrame({
+        'artist': artists,
+        'degree': np.diff(adjacency.indptr),
+        'weighted_degree': np.asarray(adjacency.sum(axis=1)).ravel(),
+        'pagerank': pagerank(adjacency),
+        'component': labels,
+        'component_size': component_sizes[labels],
+    })
+    return metrics.sort_values('pagerank', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def get_graph(start_date=None, end_date=None):
+    """
+    返回指定日期范围的合作网络及指标：{'artists', 'adjacency', 'metrics'}。
+    结果按数据版本缓存，数据未变化时直接返回（版本号和数据取自同一快照）。
+    """
+    snapshot = shuju.pin_snapshot()
+    key = (shuju.data_version(snapshot), str(start_date), str(end_date))
+    if key not in _graph_cache:
+        df = shuju.load_chart_data(['song_idx', 'singer'], start_date, end_date, snapshot=snapshot)
+        artists, adjacency = build_graph(df)
+        # 数据版本变化后旧结果不再使用
+        for old_key in [k for k in _graph_cache if k[0] != key[0]]:
+            del _graph_cache[old_key]
+        _graph_cache[key] = {
+            'artists': artists,
+            'adjacency': adjacency,
+            'metrics': graph_metrics(artists, adjacency),
+        }
+    return _graph_cache[key]
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+年份 × 艺术家汇总（rollup）模块
+
+artist_song_rollup  每位艺术家每年每首歌的在榜周数、冠军周数和最高排名
+artist_year_rollup  每位艺术家每年的歌曲数、在榜周数、冠军周数和最高排名
+两张表都由 chart_entries 聚合而来，导入时整体重建，逐周入库时只刷新受影响的年份和艺术家。
+按年份范围查询时读取汇总表，避免对 chart_entries 做三表关联和去重计数。
+歌曲表保留每年的全部歌曲（而不是只存前 N 首），这样跨年份范围的去重计数和前 N 首歌曲仍然准确。
+"""
+
+CREATE_ROLLUP_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS artist_song_rollup (
+        year SMALLINT NOT NULL,
+        artist_id INT NOT NULL,
+        song_id INT NOT NULL,
+        chart_weeks SMALLINT NOT NULL,
+        number_one_weeks SMALLINT NOT NULL,
+        best_rank TINYINT UNSIGNED,
+        PRIMARY KEY (year, artist_id, song_id),
+        INDEX idx_artist_year (artist_id, year)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS artist_year_rollup (
+        year SMALLINT NOT NULL,
+        artist_id INT NOT NULL,
+        song_count SMALLINT NOT NULL,
+        chart_weeks INT NOT NULL,
+        number_one_weeks SMALLINT NOT NULL,
+        best_rank TINYINT UNSIGNED,
+        PRIMARY KEY (year, artist_id),
+        INDEX idx_artist_year (artist_id, year)
+    );
+    """,
+]
+
+SONG_ROLLUP_SELECT = """
+    SELECT ce.year, sa.artist_id, ce.song_id,
+           COUNT(*), SUM(ce.`rank` = 1), MIN(ce.`rank`)
+    FROM chart_entries ce
+    JOIN song_artists sa ON sa.song_id = ce.song_id
+    {where}
+    GROUP BY ce.year, sa.artist_id, ce.song_id
+"""
+
+YEAR_ROLLUP_SELECT = """
+    SELECT year, artist_id, COUNT(*), SUM(chart_weeks), SUM(number_one_weeks), MIN(best_rank)
+    FROM artist_song_rollup
+    {where}
+    GROUP BY year, artist_id
+"""
+
+
+def create_tables(cursor):
+    """创建汇总表（如果不存在）"""
+    for sql in CREATE_ROLLUP_TABLES:
+        cursor.execute(sql)
+
+
+def rebuild_rollups(cursor):
+    """整体重建汇总表（全量导入后调用）"""
+    cursor.execute("DELETE FROM artist_year_rollup")
+    cursor.execute("DELETE FROM artist_song_rollup")
+    cursor.execute("INSERT INTO artist_song_rollup (year, artist_id, song_id, chart_weeks, number_one_weeks, best_rank)"
+                   + SONG_ROLLUP_SELECT.format(where=''))
+    cursor.execute("INSERT INTO artist_year_rollup (year, artist_id, song_count, chart_weeks, number_one_weeks, best_rank)"
+                   + YEAR_ROLLUP_SELECT.format(where=''))
+
+
+def refresh_rollups(cursor, year, song_ids):
+    """
+    增量刷新：只重新聚合某一年中与 song_ids 相关的艺术家。
+    逐周入库时调用，读取的数据量与一年的榜单成正比，而不是与全部历史成正比。
+    重复导入同一周时 song_ids 需同时包含被替换的旧数据中的歌曲，否则只在旧数据中出现的歌曲的汇总不会减少。
+    """
+    if not song_ids:
+        return
+    placeholders = ','.join(['%s'] * len(song_ids))
+    cursor.execute(f"SELECT DISTINCT artist_id FROM song_artists WHERE song_id IN ({placeholders})",
+                   tuple(song_ids))
+    artist_ids = [row[0] for row in cursor.fetchall()]
+    if not artist_ids:
+        return
+    artist_placeholders = ','.join(['%s'] * len(artist_ids))
+    params = (year, *artist_ids)
+    cursor.execute(f"DELETE FROM artist_song_rollup WHERE year = %s AND artist_id IN ({artist_placeholders})", params)
+    cursor.execute(f"DELETE FROM artist_year_rollup WHERE year = %s AND artist_id IN ({artist_placeholders})", params)
+    cursor.execute(
+        "INSERT INTO artist_song_rollup (year, artist_id, song_id, chart_weeks, number_one_weeks, best_rank)"
+        + SONG_ROLLUP_SELECT.format(where=f"WHERE ce.year = %s AND sa.artist_id IN ({artist_placeholders})"),
+        params)
+    cursor.execute(
+        "INSERT INTO artist_year_rollup (year, artist_id, song_count, chart_weeks, number_one_weeks, best_rank)"
+        + YEAR_ROLLUP_SELECT.format(where=f"WHERE year = %s AND artist_id IN ({artist_placeholders})"),
+        params)
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+新榜单监视程序
+
+长期运行，每 CHECK_INTERVAL 秒检查一次下一期 Hot 100（归档中最新一期之后的星期六）是否已发布：
+    1. 距榜单日期超过 PUBLISH_LEAD_DAYS 天时还不可能发布，不发任何请求
+    2. 先发 HEAD 请求，带上次记下的 ETag / Last-Modified（If-None-Match / If-Modified-Since）；
+       404、跳转（未发布的日期会跳转到最新一期）或 304（页面未变化）时到此为止
+    3. 页面可用且有变化时才 GET 一次并解析；解析不完整（页面仍在更新）时记下验证信息，页面变化后再抓
+    4. 解析成功后追加到列式归档（数据版本随之变化，keshihua / fuwu 的缓存自动刷新），
+       再用 dada.ingest_week 增量写入数据库；数据库不可用时记为待写入，下次检查时按顺序重试
+一期入库后立即检查再下一周，落后多周时逐周补齐。每个 URL 的验证信息和待写入数据库的周保存在 STATE_PATH。
+
+用法：
+    python jiankong.py                 # 每小时检查一次
+    python jiankong.py --once          # 只检查一次（可由计划任务调用）
+    python jiankong.py http://127.0.0.1:8765/charts/ --interval 60 --no-db
+"""
+import os
+import json
+import time
+import argparse
+import certifi
+import pandas as pd
+import pymysql
+import requests
+import cunchu
+import shuju
+import pachong
+
+# 监视的榜单
+CHART_ID = 'hot-100'
+
+# 检查间隔（秒）
+CHECK_INTERVAL = 3600
+
+# Billboard 在榜单日期（星期六）之前的星期二发布，早于此时不检查
+PUBLISH_LEAD_DAYS = 4
+
+# 检查结果的说明
+STATUS_TEXT = {
+    'unpublished': '尚未发布',
+    'unchanged': '页面未变化',
+    'incomplete': '页面不完整，等待更新',
+    'error': '请求失败',
+}
+
+# 状态文件：每个 URL 的 ETag / Last-Modified，以及已写入归档、尚未写入数据库的周
+STATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'watcher_state.json')
+
+
+def load_state():
+    """读取状态文件，不存在时返回空状态"""
+    state = {'validators': {}, 'db_pending': []}
+    if os.path.exists(STATE_PATH):
+        with open(STATE_PATH, encoding='utf-8') as f:
+            state.update(json.load(f))
+    return state
+
+
+def save_state(state):
+    """先写临时文件再原子替换，中断时不会留下写了一半的状态"""
+    tmp_path = STATE_PATH + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, STATE_PATH)
+
+
+def next_chart_date():
+    """归档中最新一期之后的星期六（归档为空时为 None）"""
+    latest = cunchu.latest_chart_date(CHART_ID)
+    if latest is None:
+        return None
+    return (latest + pd.Timedelta(days=7)).strftime('%Y-%m-%d')
+
+
+def conditional_headers(validators):
+    """由上次的验证信息生成条件请求头"""
+    headers = dict(pachong.HEADERS)
+    if validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+    return headers
+
+
+def fetch_week(session, date_str, url_root, state):
+    """
+    检查并抓取某一周的榜单。
+    返回 (状态, 歌曲列表)：状态为 'unpublished'、'unchanged'、'incomplete'、'error' 或 'ok'，只有 'ok' 时有歌曲列表。
+    """
+    spec = pachong.get_chart(CHART_ID)
+    url = pachong.chart_url(CHART_ID, date_str, url_root)
+    validators = state['validators'].get(url, {})
+    headers = conditional_headers(validators)
+    try:
+        head = session.head(url, headers=headers, allow_redirects=False, verify=certifi.where(), timeout=20)
+        if head.status_code == 404 or head.is_redirect:
+            return 'unpublished', None
+        if head.status_code == 304:
+            return 'unchanged', None
+        head.raise_for_status()
+
+        response = session.get(url, headers=headers, allow_redirects=False, verify=certifi.where(), timeout=20)
+        if response.status_code == 304:
+            return 'unchanged', None
+        if response.status_code == 404 or response.is_redirect:
+            return 'unpublished', None
+        response.raise_for_status()
+    except requests.RequestException as e:
+        print(f"检查 {date_str} 时出错: {e}")
+        return 'error', None
+
+    songs = pachong.parse_chart_page(spec, response.text, date_str)
+    if any(pachong.is_failed(song) for song in songs):
+        # 页面可能仍在更新：记下验证信息，页面没有变化前不再 GET
+        state['validators'][url] = {'etag': response.headers.get('ETag'),
+                                    'last_modified': response.headers.get('Last-Modified')}
+        return 'incomplete', None
+    state['validators'].pop(url, None)
+    return 'ok', songs
+
+
+def ingest_database(state):
+    """将待写入数据库的周按时间顺序增量写入，返回写入的周数（数据库不可用时保留待写入列表）"""
+    import dada
+    if not state['db_pending']:
+        return 0
+    try:
+        conn = dada.get_connection()
+    except pymysql.MySQLError as e:
+        print(f"数据库不可用，{len(state['db_pending'])} 周待下次写入: {e}")
+        return 0
+    count = 0
+    try:
+        for date_str in sorted(state['db_pending']):
+            week_df = cunchu.read_archive(start_date=date_str, end_date=date_str, chart_id=CHART_ID)
+            if not week_df.empty:
+                dada.ingest_week(conn, week_df)
+            state['db_pending'].remove(date_str)
+            count += 1
+    except pymysql.MySQLError as e:
+        print(f"写入数据库失败，{len(state['db_pending'])} 周待下次写入: {e}")
+    finally:
+        conn.close()
+    return count
+
+
+def check_once(url_root=pachong.URL_ROOT, with_db=True, session=None, now=None):
+    """
+    检查一次：逐周抓取已发布的新榜单并入库，直到遇到未发布的一周。返回新入库的周数。
+    now 为当前时间（默认为系统时间），用于判断榜单是否可能已发布。
+    """
+    state = load_state()
+    session = session or pachong.get_ssl_session()
+    now = pd.Timestamp.now() if now is None else pd.Timestamp(now)
+
+    date_str = next_chart_date()
+    if date_str is None and os.path.exists(shuju.CSV_PATH):
+        print(f"归档为空，先导入 {shuju.CSV_PATH}")
+        cunchu.import_csv(shuju.CSV_PATH, CHART_ID)
+        date_str = next_chart_date()
+    if date_str is None:
+        print("归档为空，请先运行 pachong.py 爬取历史榜单")
+        return 0
+
+    ingested = 0
+    try:
+        while now >= pd.Timestamp(date_str) - pd.Timedelta(days=PUBLISH_LEAD_DAYS):
+            status, songs = fetch_week(session, date_str, url_root, state)
+            if status != 'ok':
+                print(f"{date_str}: {STATUS_TEXT[status]}")
+                break
+            cunchu.append_rows(songs, CHART_ID)
+            # 写入归档后立即记下待写入数据库的周：下次检查从归档的最后一周之后开始，这里丢失的周不会再写入数据库
+            state['db_pending'].append(date_str)
+            save_state(state)
+            ingested += 1
+            print(f"{date_str} 已写入归档，数据版本 {shuju.data_version()}")
+            date_str = next_chart_date()
+        else:
+            print(f"{date_str} 的榜单最早在 {pd.Timestamp(date_str) - pd.Timedelta(days=PUBLISH_LEAD_DAYS):%Y-%m-%d} 发布，暂不检查")
+
+        if with_db:
+            ingest_database(state)
+        state['last_check'] = now.isoformat(timespec='seconds')
+    finally:
+        save_state(state)
+    return ingested
+
+
+def main():
+    parser = argparse.ArgumentParser(description='监视并增量导入新一期 Billboard Hot 100')
+    parser.add_argument('url', nargs='?', default=pachong.URL_ROOT, help='榜单页面的根URL')
+    parser.add_argument('--interval', type=float, default=CHECK_INTERVAL, help='检查间隔（秒）')
+    parser.add_argument('--once', action='store_true', help='只检查一次')
+    parser.add_argument('--no-db', action='store_true', help='只写入归档，不写入数据库')
+    args = parser.parse_args()
+
+    url_root = pachong.url_root_from(args.url)
+    session = pachong.get_ssl_session()
+    while True:
+        check_once(url_root, not args.no_db, session)
+        if args.once:
+            break
+        try:
+            time.sleep(args.interval)
+        except KeyboardInterrupt:
+            print("监视已停止")
+            break
+
+
+if __name__ == "__main__":
+    main()
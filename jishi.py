@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+图表性能剖析模块
+
+设置环境变量 BILLBOARD_PROFILE=1 后，keshihua 中被 @profiled 修饰的每次绘图都会记录各阶段耗时：
+    connect    创建数据库引擎
+    query      执行 SQL，或读取内存中的紧凑数据 / 生命周期表 / 合作网络
+    transform  其余耗时：pandas 处理和创建图形元素（总耗时减去其他阶段）
+    layout     tight_layout
+    encode     savefig（绘制并编码为 PNG）
+以及查询返回的行数和写出的字节数。每条记录追加到 JSON-lines 文件
+（默认 profile_trace.jsonl，可用 BILLBOARD_PROFILE_TRACE 指定），并通知已注册的监听函数（如 GUI 的状态框）。
+
+汇总多次运行：python jishi.py [trace 文件] [--folded 输出文件]
+--folded 输出 flamegraph.pl / speedscope 可读取的折叠栈格式（图表;阶段 微秒数）。
+"""
+import os
+import sys
+import json
+import time
+import statistics
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+
+# 开关和输出文件的环境变量
+PROFILE_ENV = 'BILLBOARD_PROFILE'
+TRACE_ENV = 'BILLBOARD_PROFILE_TRACE'
+DEFAULT_TRACE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profile_trace.jsonl')
+
+# 阶段及其显示名称
+STAGES = {
+    'connect': '连接',
+    'query': '查询',
+    'transform': '处理',
+    'layout': '布局',
+    'encode': '编码',
+}
+
+# 当前正在记录的绘图（每个线程 / 上下文独立）
+_current = contextvars.ContextVar('jishi_trace', default=None)
+
+# 记录完成后调用的函数，参数为一行文字摘要
+_listeners = []
+
+_write_lock = threading.Lock()
+
+
+def enabled():
+    """是否开启剖析（每次调用时读取环境变量，运行中也可切换）"""
+    return os.environ.get(PROFILE_ENV, '').strip().lower() not in ('', '0', 'false', 'no', 'off')
+
+
+def trace_path():
+    """JSON-lines 输出文件路径"""
+    return os.environ.get(TRACE_ENV) or DEFAULT_TRACE_PATH
+
+
+def add_listener(func):
+    """注册监听函数，每条记录完成后以文字摘要调用"""
+    _listeners.append(func)
+
+
+def remove_listener(func):
+    """取消注册监听函数"""
+    if func in _listeners:
+        _listeners.remove(func)
+
+
+class _Trace:
+    """一次绘图的耗时和计数"""
+
+    def __init__(self, chart):
+        self.chart = chart
+        self.stages = dict.fromkeys(STAGES, 0.0)
+        self.rows = 0
+        self.bytes = 0
+        self.active = False
+
+
+@contextmanager
+def stage(name):
+    """将代码块的耗时计入当前绘图的某个阶段；未开启剖析或嵌套在其他阶段中时不计时"""
+    trace = _current.get()
+    if trace is None or trace.active:
+        yield
+        return
+    trace.active = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.stages[name] += time.perf_counter() - start
+        trace.active = False
+
+
+def add_rows(count):
+    """累加当前绘图读取的行数"""
+    trace = _current.get()
+    if trace is not None:
+        trace.rows += int(count)
+
+
+def add_output(path):
+    """累加当前绘图写出的字节数"""
+    trace = _current.get()
+    if trace is not None and os.path.exists(path):
+        trace.bytes += os.path.getsize(path)
+
+
+def format_record(record):
+    """将一条记录格式化为一行文字摘要"""
+    stages = ' '.join(f"{label} {record['stages'][key]:.3f}s" for key, label in STAGES.items())
+    return (f"[性能] {record['chart']} 总计 {record['total']:.3f}s | {stages} | "
+            f"{record['rows']} 行 | {record['bytes'] / 1024:.1f} KB")
+
+
+def _describe(value):
+    """参数的简短描述，便于在记录中区分不同的调用"""
+    text = str(value)
+    return text if len(text) <= 60 else text[:57] + '...'
+
+
+def _finish(trace, total, args, kwargs):
+    """补全 transform 阶段，写出记录并通知监听函数"""
+    measured = sum(seconds for key, seconds in trace.stages.items() if key != 'transform')
+    trace.stages['transform'] += max(0.0, total - measured - trace.stages['transform'])
+    record = {
+        'ts': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'pid': os.getpid(),
+        'chart': trace.chart,
+        'args': [_describe(arg) for arg in args],
+        'kwargs': {key: _describe(value) for key, value in kwargs.items()},
+        'total': round(total, 6),
+        'stages': {key: round(seconds, 6) for key, seconds in trace.stages.items()},
+        'rows': trace.rows,
+        'bytes': trace.bytes,
+    }
+    try:
+        with _write_lock, open(trace_path(), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    except OSError as e:
+        print(f"写入性能记录失败: {e}")
+    summary = format_record(record)
+    print(summary)
+    for listener in list(_listeners):
+        listener(summary)
+    return record
+
+
+def profiled(func):
+    """绘图函数的修饰器：开启剖析时记录一次调用的各阶段耗时，嵌套调用只记录最外层"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not enabled() or _current.get() is not None:
+            return func(*args, **kwargs)
+        trace = _Trace(func.__name__)
+        token = _current.set(trace)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            total = time.perf_counter() - start
+            _current.reset(token)
+            _finish(trace, total, args, kwargs)
+    return wrapper
+
+
+def load_trace(path=None):
+    """读取 JSON-lines 记录（跳过无法解析的行）"""
+    records = []
+    with open(path or trace_path(), encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def summarize(records):
+    """按图表汇总多次运行：次数、总耗时中位数和 P95，以及各阶段耗时占比"""
+    by_chart = {}
+    for record in records:
+        by_chart.setdefault(record['chart'], []).append(record)
+    summary = []
+    for chart, items in by_chart.items():
+        totals = sorted(item['total'] for item in items)
+        total_sum = sum(totals) or 1.0
+        summary.append({
+            'chart': chart,
+            'runs': len(items),
+            'median': statistics.median(totals),
+            'p95': totals[min(len(totals) - 1, int(len(totals) * 0.95))],
+            'share': {key: sum(item['stages'].get(key, 0.0) for item in items) / total_sum for key in STAGES},
+            'rows': max(item['rows'] for item in items),
+            'bytes': max(item['bytes'] for item in items),
+        })
+    return sorted(summary, key=lambda item: item['median'], reverse=True)
+
+
+def folded_stacks(records):
+    """转换为折叠栈格式（每行 图表;阶段 微秒数），多次运行累加"""
+    totals = {}
+    for record in records:
+        for key, seconds in record['stages'].items():
+            stack = f"{record['chart']};{key}"
+            totals[stack] = totals.get(stack, 0) + int(seconds * 1_000_000)
+    return [f'{stack} {micros}' for stack, micros in sorted(totals.items()) if micros > 0]
+
+
+def main():
+    args = sys.argv[1:]
+    folded_path = None
+    if '--folded' in args:
+        index = args.index('--folded')
+        folded_path = args[index + 1]
+        del args[index:index + 2]
+    records = load_trace(args[0] if args else None)
+    if not records:
+        print("没有性能记录")
+        return
+    print(f"{'图表':<36s}{'次数':>6s}{'中位数':>10s}{'P95':>10s}  " + '  '.join(STAGES.values()))
+    for item in summarize(records):
+        shares = '  '.join(f"{item['share'][key]:5.0%}" for key in STAGES)
+        print(f"{item['chart']:<36s}{item['runs']:>6d}{item['median']:>9.3f}s{item['p95']:>9.3f}s  {shares}")
+    if folded_path:
+        with open(folded_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(folded_stacks(records)) + '\n')
+        print(f"折叠栈已保存至: {folded_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+"""
+端到端性能基准测试
+
+在 moni.py 生成的 1× / 10× / 100× 模拟数据上依次计时：
+    生成数据、导入列式归档、加载紧凑数据、变动事件、生命周期、波动索引、连续段索引、合作网络、数据库导入、
+    keshihua 中每个 plot_* 图表（查询与渲染分开计时）以及精确查询。
+另外可在本地模拟站点（monizhan.py，注入延迟、429/5xx 和页面变体）上测量爬虫在不同并发数和限速下
+每秒抓取的周数。
+结果保存为 JSON（bench/results/），并与基线比较，任一阶段比基线慢超过阈值时以非零状态退出。
+
+用法：
+    python jizhun.py                     # 规模 1 和 10
+    python jizhun.py 1 10 100            # 指定规模
+    python jizhun.py 1 --save-baseline   # 将本次结果保存为基线
+    python jizhun.py 1 --threshold 0.5   # 慢 50% 以上才算退化
+    python jizhun.py --scraper           # 只测爬虫吞吐量
+数据库不可用时跳过数据库导入，查询数据库的图表记为跳过，不参与基线比较。
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import inspect
+import contextlib
+import io
+import argparse
+import platform
+import pandas as pd
+import matplotlib
+matplotlib.use('Agg')
+import pymysql
+import cunchu
+import shuju
+import moni
+import bianhua
+import shengming
+import hezuo
+import bodong
+import lianxu
+import dada
+import keshihua
+import pachong
+import monizhan
+
+# 基准测试的数据、图表和结果目录
+BENCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench')
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+
+# 基准测试使用单独的数据库，不影响正式数据
+BENCH_DATABASE = 'data_bench'
+
+# 默认退化阈值：比基线慢 25% 以上；耗时差小于 MIN_DELTA 秒的阶段视为测量噪声
+DEFAULT_THRESHOLD = 0.25
+MIN_DELTA = 0.05
+
+# 图表分辨率（只影响渲染耗时，固定以便前后可比）
+PLOT_DPI = 100
+
+# plot_distribution 计时使用的指标
+BENCH_METRIC = 'weeks_on_chart'
+
+# plot_trend_comparison 计时对比的艺术家数（按署名周数取前几位）
+COMPARE_TERMS = 8
+
+# 爬虫吞吐量测试：每组设置抓取的周数、模拟站点的注入配置，以及 (并发数, 请求最小间隔秒数) 组合
+SCRAPER_WEEKS = 20
+STAND_IN_OPTIONS = {'latency': 0.05, 'jitter': 0.05, 'rate_429': 0.02, 'rate_5xx': 0.02, 'variant_rate': 0.05}
+SCRAPER_SETTINGS = [(1, 0.0), (4, 0.0), (8, 0.0), (4, 0.1), (8, 0.25)]
+# 多榜单抓取（共用线程池和限速器）的榜单及 (并发数, 请求最小间隔秒数) 组合
+SCRAPER_CHARTS = ['hot-100', 'billboard-200', 'country-songs']
+SCRAPER_CHART_SETTINGS = [(8, 0.0), (8, 0.1)]
+
+
+class StageTimer:
+    """记录各阶段耗时（秒）"""
+
+    def __init__(self):
+        self.stages = {}
+        self.skipped = []
+
+    def run(self, stage, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.stages[stage] = round(time.perf_counter() - start, 6)
+        print(f"  {stage:<40s} {self.stages[stage]:10.3f}s")
+        return result
+
+
+def use_dataset(data_dir):
+    """将归档、CSV 和图表输出切换到基准测试目录"""
+    cunchu.ARCHIVE_DIR = os.path.join(data_dir, 'archive')
+    shuju.CSV_PATH = os.path.join(data_dir, 'dataall.csv')
+    keshihua.OUTPUT_DIR = os.path.join(BENCH_DIR, 'charts')
+    os.makedirs(keshihua.OUTPUT_DIR, exist_ok=True)
+
+
+def database_available():
+    """检查 MySQL 是否可用，可用时创建基准测试库并切换过去"""
+    try:
+        conn = pymysql.connect(host=shuju.DB_CONFIG['host'], port=shuju.DB_CONFIG['port'],
+                               user=shuju.DB_CONFIG['user'], password=shuju.DB_CONFIG['password'],
+                               connect_timeout=3)
+    except pymysql.MySQLError as e:
+        print(f"数据库不可用，跳过数据库相关阶段: {e}")
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {BENCH_DATABASE} CHARACTER SET utf8mb3")
+    conn.close()
+    # keshihua.DB_CONFIG 与 shuju.DB_CONFIG 是同一个字典
+    shuju.DB_CONFIG['database'] = BENCH_DATABASE
+    return True
+
+
+def import_database(df):
+    """整体重建基准测试库"""
+    conn = dada.get_connection()
+    cursor = conn.cursor()
+    dada.create_tables(cursor)
+    dada.clear_tables(cursor)
+    conn.commit()
+    cursor.close()
+    dada.import_frame(conn, df)
+    conn.close()
+
+
+def plot_functions():
+    """keshihua 中全部 plot_* 函数"""
+    return [(name, func) for name, func in inspect.getmembers(keshihua, inspect.isfunction)
+            if name.startswith('plot_') and func.__module__ == keshihua.__name__]
+
+
+def bench_plots(timer, top_artists, with_db):
+    """
+    逐个计时图表：查询（数据库和内存数据）与渲染分开记录。
+    数据库不可用时，查询了数据库的图表记为跳过。
+    """
+    query_time = [0.0]
+    used_db = [False]
+    depth = [0]
+    originals = {name: getattr(keshihua, name)
+                 for name in ('get_data_from_query', 'get_chart_frame', 'get_song_lifecycles',
+                              'get_collaboration_graph', 'get_volatility_index', 'get_streak_index')}
+    # 需要必填参数的图表
+    top_artist = top_artists[0]
+    first_args = {'artist_name': top_artist, 'search_str': top_artist, 'metric': BENCH_METRIC,
+                  'search_terms': ','.join(top_artists[:COMPARE_TERMS])}
+
+    def timed_query(name, func):
+        def wrapper(*args, **kwargs):
+            if name == 'get_data_from_query':
+                used_db[0] = True
+            # 嵌套调用（如波动索引读取紧凑数据）只计最外层
+            depth[0] += 1
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                depth[0] -= 1
+                if depth[0] == 0:
+                    query_time[0] += time.perf_counter() - start
+        return wrapper
+
+    for name, func in originals.items():
+        setattr(keshihua, name, timed_query(name, func))
+    try:
+        for name, func in plot_functions():
+            first_parameter = next(iter(inspect.signature(func).parameters))
+            args = [first_args[first_parameter]] if first_parameter in first_args else []
+            query_time[0] = 0.0
+            used_db[0] = False
+            timer.run(name, func, *args, dpi=PLOT_DPI)
+            timer.stages[f'{name}.query'] = round(query_time[0], 6)
+            timer.stages[f'{name}.render'] = round(max(0.0, timer.stages[name] - query_time[0]), 6)
+            if used_db[0] and not with_db:
+                timer.skipped.append(name)
+    finally:
+        for name, func in originals.items():
+            setattr(keshihua, name, func)
+
+
+def bench_scale(scale, seed=0, with_db=False):
+    """在一个规模的模拟数据上运行全部阶段"""
+    print(f"\n===== 规模 {scale}× =====")
+    data_dir = os.path.join(BENCH_DIR, 'data', f'scale-{scale}')
+    os.makedirs(data_dir, exist_ok=True)
+    use_dataset(data_dir)
+    timer = StageTimer()
+
+    raw = timer.run('generate', moni.generate_chart_history, scale, seed)
+    raw.to_csv(shuju.CSV_PATH, index=False, encoding='utf-8')
+    shutil.rmtree(cunchu.ARCHIVE_DIR, ignore_errors=True)
+    timer.run('archive_import', cunchu.append_rows, raw)
+    del raw
+
+    df = timer.run('load_compact', shuju.load_chart_data)
+    last_date = df['chart_date'].max()
+    timer.run('load_last_year', shuju.load_chart_data, ['rank', 'chart_date'], last_date - pd.DateOffset(years=1), last_date)
+    timer.run('build_events', bianhua.build_events, df)
+    timer.run('compute_lifecycles', shengming.compute_lifecycles, df)
+    timer.run('build_volatility', bodong.build_index, df)
+    timer.run('build_streaks', lianxu.build_index, df)
+    timer.run('build_graph', lambda: hezuo.graph_metrics(*hezuo.build_graph(df)))
+    if with_db:
+        timer.run('db_import', import_database, df)
+    else:
+        timer.skipped.append('db_import')
+
+    # 预热内存缓存，图表计时只包含查询本身
+    timer.run('cache_chart_frame', keshihua.get_chart_frame)
+    timer.run('cache_lifecycles', shengming.get_lifecycles)
+    timer.run('cache_graph', keshihua.get_collaboration_graph)
+    timer.run('cache_volatility', keshihua.get_volatility_index)
+    timer.run('cache_streaks', keshihua.get_streak_index)
+
+    credits = df['singer'].astype(str).map(shuju.split_artists).explode()
+    top_artists = credits.value_counts().index[:COMPARE_TERMS].tolist()
+    top_artist = top_artists[0]
+    frame = keshihua.get_chart_frame()
+    timer.run('search_match', lambda: frame[(frame['singer'] == top_artist) | (frame['name'] == top_artist)])
+    bench_plots(timer, top_artists, with_db)
+
+    return {'rows': int(len(df)), 'songs': int(df['song_idx'].max()) + 1,
+            'stages': timer.stages, 'skipped': sorted(set(timer.skipped))}
+
+
+def bench_scraper(seed=0):
+    """
+    在本地模拟站点上测量爬虫吞吐量（每秒抓取的周数），覆盖 SCRAPER_SETTINGS 中的并发数和限速组合，
+    以及 SCRAPER_CHART_SETTINGS 中同时抓取 SCRAPER_CHARTS 多个榜单的组合（每秒抓取的页面数）。
+    每组设置使用相同的日期和相同的随机种子，注入的错误和变体序列一致。
+    """
+    print("\n===== 爬虫吞吐量 =====")
+    weeks = monizhan.load_weeks(scale=1, seed=seed)
+    dates = sorted(weeks)[:SCRAPER_WEEKS]
+    timer = StageTimer()
+    throughput = {}
+    settings = [(None, workers, min_interval) for workers, min_interval in SCRAPER_SETTINGS]
+    settings += [(SCRAPER_CHARTS, workers, min_interval) for workers, min_interval in SCRAPER_CHART_SETTINGS]
+    for charts, workers, min_interval in settings:
+        server = monizhan.start_in_background(weeks, seed=seed, **STAND_IN_OPTIONS)
+        if charts is None:
+            stage = f'scrape.w{workers}.i{min_interval:g}'
+            scrape = lambda: [songs for _, songs in pachong.scrape_dates(dates, server.base_url, workers, min_interval)]
+        else:
+            stage = f'scrape.charts{len(charts)}.w{workers}.i{min_interval:g}'
+            scrape = lambda: [songs for _, _, songs in
+                              pachong.scrape_charts(charts, dates, server.root_url, workers, min_interval)]
+        try:
+            # 爬虫逐条打印进度，测试时不输出
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = timer.run(stage, scrape)
+        finally:
+            server.shutdown()
+            server.server_close()
+        failed = sum(1 for songs in results if any('Error' in song['name'] for song in songs))
+        throughput[stage] = {
+            'weeks_per_sec': round(len(dates) / timer.stages[stage], 3),
+            'pages_per_sec': round(len(results) / timer.stages[stage], 3),
+            'failed_pages': failed,
+            'responses': {str(key): value for key, value in server.stats.items()},
+        }
+        print(f"  {stage:<40s} {throughput[stage]['weeks_per_sec']:10.2f} 周/秒 "
+              f"{throughput[stage]['pages_per_sec']:8.2f} 页/秒  失败 {failed} 页")
+    return {'weeks': len(dates), 'stand_in': STAND_IN_OPTIONS, 'stages': timer.stages,
+            'throughput': throughput, 'skipped': []}
+
+
+def compare(results, baseline, threshold):
+    """与基线比较，返回退化的阶段列表 [(测试组, 阶段, 基线耗时, 本次耗时)]"""
+    regressions = []
+    for scale, current in results['runs'].items():
+        base = baseline.get('runs', {}).get(scale)
+        if base is None:
+            continue
+        skipped = set(current.get('skipped', [])) | set(base.get('skipped', []))
+        for stage, seconds in current['stages'].items():
+            base_seconds = base['stages'].get(stage)
+            if base_seconds is None or stage.split('.')[0] in skipped:
+                continue
+            if seconds > base_seconds * (1 + threshold) and seconds - base_seconds > MIN_DELTA:
+                regressions.append((scale, stage, base_seconds, seconds))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Billboard 数据处理与可视化的端到端性能基准测试')
+    parser.add_argument('scales', nargs='*', type=int, help='数据规模（相对 dataall.csv 的倍数），默认 1 和 10')
+    parser.add_argument('--seed', type=int, default=0, help='模拟数据的随机种子')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='基线结果文件')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='退化阈值（相对基线的比例）')
+    parser.add_argument('--save-baseline', action='store_true', help='将本次结果保存为基线')
+    parser.add_argument('--no-db', action='store_true', help='跳过数据库相关阶段')
+    parser.add_argument('--scraper', action='store_true', help='测量爬虫吞吐量（未指定规模时只运行这一项）')
+    args = parser.parse_args()
+    scales = args.scales or ([] if args.scraper else [1, 10])
+
+    original = (cunchu.ARCHIVE_DIR, shuju.CSV_PATH, keshihua.OUTPUT_DIR, shuju.DB_CONFIG['database'])
+    try:
+        with_db = bool(scales) and not args.no_db and database_available()
+        runs = {f'{scale}x': bench_scale(scale, args.seed, with_db) for scale in scales}
+        if args.scraper:
+            runs['scraper'] = bench_scraper(args.seed)
+        results = {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'runs': runs,
+        }
+    finally:
+        cunchu.ARCHIVE_DIR, shuju.CSV_PATH, keshihua.OUTPUT_DIR, shuju.DB_CONFIG['database'] = original
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    result_path = os.path.join(RESULTS_DIR, f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(result_path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存至: {result_path}")
+
+    if args.save_baseline:
+        shutil.copyfile(result_path, args.baseline)
+        print(f"基线已更新: {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print("没有基线结果，使用 --save-baseline 保存本次结果作为基线")
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    for run, stage, base_seconds, seconds in regressions:
+        print(f"性能退化 [{run}] {stage}: {base_seconds:.3f}s -> {seconds:.3f}s "
+              f"(+{(seconds / base_seconds - 1) * 100:.0f}%)")
+    if regressions:
+        return 1
+    print(f"与基线相比没有超过 {args.threshold:.0%} 的退化")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,7 +6,18 @@ import numpy as np
 from datetime import datetime
 import matplotlib.dates as mdates
 import os
+import re
+import math
 import warnings
+import shuju
+import hezuo
+import shengming
+import jishi
+import caiyang
+import fenbu
+import bodong
+import lianxu
+from matplotlib.collections import LineCollection
 
 # 屏蔽 seaborn 关于 palette 参数的 FutureWarning
 warnings.filterwarnings("ignore", message="Passing palette without assigning hue is deprecated")
@@ -18,183 +29,545 @@ plt.rcParams['axes.unicode_minus'] = False  # 正常显示负号
 # 导入 wordcloud 库（用于生成词云）
 from wordcloud import WordCloud
 
-# 数据库连接配置
-DB_CONFIG = {
-    'host': 'localhost',
-    'port': 3306,
-    'user': 'root',
-    'password': '123456',
-    'database': 'test'
-}
+# 数据库连接配置（与 dada.py 共用，见 shuju.py）
+DB_CONFIG = shuju.DB_CONFIG
 
 # 创建输出文件夹
 OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'charts')
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# 图表文件格式：'png'、'svg'（矢量图），None 时只返回绘图数据、不写文件（见 fuwu.py）
+CHART_FORMAT = 'png'
 
-def get_data_from_query(query):
-    """使用 SQLAlchemy 引擎从数据库中获取数据"""
+# 紧凑 SVG：文字保留为 <text> 而不是逐字形路径，固定元素 id 并去掉时间戳，相同图表输出相同文件
+SVG_RC = {'svg.fonttype': 'none', 'svg.hashsalt': 'billboard'}
+
+
+def get_data_from_query(query, params=None):
+    """使用 SQLAlchemy 引擎从数据库中获取数据，params 为命名绑定参数（:name）"""
     try:
-        from sqlalchemy import create_engine
-        engine = create_engine(
-            f"mysql+mysqlconnector://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
-        )
-        df = pd.read_sql_query(query, engine)
+        from sqlalchemy import create_engine, text
+        with jishi.stage('connect'):
+            engine = create_engine(
+                f"mysql+mysqlconnector://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
+            )
+        with jishi.stage('query'):
+            df = pd.read_sql_query(text(query), engine, params=params or {})
+        jishi.add_rows(len(df))
         return df
     except Exception as e:
         print(f"查询执行错误: {e}")
         return None
 
 
-def plot_yearly_songs_count():
+# 内存中的紧凑榜单数据缓存，数据版本变化时重新加载
+_chart_frame_cache = {}
+
+
+def get_chart_frame(start_date=None, end_date=None):
+    """返回内存中的紧凑榜单数据（见 shuju.py），按 week_idx 二分截取日期范围"""
+    with jishi.stage('query'):
+        snapshot = shuju.pin_snapshot()
+        version = shuju.data_version(snapshot)
+        if _chart_frame_cache.get('version') != version:
+            _chart_frame_cache['df'] = shuju.load_chart_data(snapshot=snapshot)
+            _chart_frame_cache['version'] = version
+        df = shuju.slice_weeks(_chart_frame_cache['df'], start_date, end_date)
+    jishi.add_rows(len(df))
+    return df
+
+
+def get_collaboration_graph(start_date=None, end_date=None):
+    """返回艺术家合作网络及指标（度数、加权 PageRank、连通分量），按数据版本缓存，见 hezuo.py"""
+    with jishi.stage('query'):
+        graph = hezuo.get_graph(normalize_date(start_date), normalize_date(end_date))
+    jishi.add_rows(len(graph['metrics']))
+    return graph
+
+
+def get_song_lifecycles(start_date=None, end_date=None):
+    """
+    返回首次上榜日期在指定范围内的歌曲生命周期表（见 shengming.py）。
+    指标始终在全部历史上计算，日期范围只用于选择歌曲，避免截断其在榜周期。
+    """
+    with jishi.stage('query'):
+        lifecycles = shengming.get_lifecycles()
+    if lifecycles.empty:
+        return lifecycles
+    start_date = normalize_date(start_date)
+    end_date = normalize_date(end_date)
+    mask = np.ones(len(lifecycles), dtype=bool)
+    if start_date is not None:
+        mask &= lifecycles['debut_date'].to_numpy() >= np.datetime64(start_date)
+    if end_date is not None:
+        mask &= lifecycles['debut_date'].to_numpy() <= np.datetime64(end_date)
+    lifecycles = lifecycles[mask]
+    jishi.add_rows(len(lifecycles))
+    return lifecycles
+
+
+def get_volatility_index():
+    """返回排名波动 / 动量索引（见 bodong.py），数据追加新的周时只增量处理新增的周"""
+    chart_df = get_chart_frame()
+    with jishi.stage('query'):
+        index = bodong.get_index(chart_df, _chart_frame_cache['version'])
+    return index
+
+
+def get_streak_index():
+    """返回连续在榜纪录索引（见 lianxu.py），数据追加新的周时只增量处理新增的周"""
+    chart_df = get_chart_frame()
+    with jishi.stage('query'):
+        index = lianxu.get_index(chart_df, _chart_frame_cache['version'])
+    return index
+
+
+def get_song_titles(song_idx):
+    """按 song_idx 取歌名和歌手（来自内存中的紧凑榜单数据）"""
+    chart_df = get_chart_frame()
+    songs = chart_df.drop_duplicates('song_idx').set_index('song_idx')
+    return songs.loc[song_idx, ['name', 'singer']].astype(str).rename(columns={'name': 'song_name'})
+
+
+def get_distribution(metric, bins=10, start_date=None, end_date=None, artist_name=None, source='memory'):
+    """
+    返回指标的分布表 (bin_start, bin_end, label, count)，见 fenbu.py。
+    bins 为箱数或整数边界列表；source 为 'memory' 时在紧凑榜单数据上用 np.bincount 计数，
+    为 'db' 时在数据库中按箱分组计数，只取回每个箱一行。
+    lifecycle 指标按首次上榜日期筛选歌曲（见 get_song_lifecycles），不计数据第一周之前就已在榜的歌曲，只能在内存中计算。
+    """
+    definition = fenbu.get_metric(metric)
+    if source == 'db':
+        date_filter, params = build_date_filter('ce.chart_date', start_date, end_date)
+        artist = artist_name is not None
+        if artist:
+            params['artist_name'] = artist_name
+        if np.ndim(bins) == 0 and definition['range'] is None:
+            range_df = get_data_from_query(fenbu.build_range_query(metric, date_filter, artist), params)
+            if range_df is None or range_df.empty or pd.isna(range_df['lo'].iloc[0]):
+                return None
+            edges = fenbu.make_edges(bins, range_df['lo'].iloc[0], range_df['hi'].iloc[0])
+        else:
+            edges = fenbu.make_edges(bins, *(definition['range'] or (None, None)))
+        query, bin_params = fenbu.build_query(metric, edges, date_filter, artist)
+        bucket_df = get_data_from_query(query, {**params, **bin_params})
+        if bucket_df is None:
+            return None
+        return fenbu.from_bucket_counts(edges, bucket_df)
+
+    if definition['per'] == 'lifecycle':
+        lifecycles = get_song_lifecycles(start_date, end_date)
+        lifecycles = lifecycles[~lifecycles['left_censored']]
+        if artist_name is not None:
+            chart_df = get_chart_frame()
+            songs = np.unique(chart_df['song_idx'].to_numpy()[fenbu.artist_mask(chart_df, artist_name)])
+            lifecycles = lifecycles[lifecycles['song_idx'].isin(songs)]
+        return fenbu.histogram(metric, bins, lifecycles=lifecycles)
+    chart_df = get_chart_frame(start_date, end_date)
+    if artist_name is not None:
+        chart_df = chart_df[fenbu.artist_mask(chart_df, artist_name)]
+    return fenbu.histogram(metric, bins, df=chart_df)
+
+
+def normalize_date(value):
+    """将字符串、datetime 或 date 统一转换为 date，None 保持不变"""
+    if value is None or value == '':
+        return None
+    return pd.Timestamp(value).date()
+
+
+def build_date_filter(column='ce.chart_date', start_date=None, end_date=None):
+    """
+    生成日期范围过滤条件及绑定参数。
+    条件直接作用在 chart_date 列上（BETWEEN / >= / <=），可以走 chart_date 索引做范围扫描，
+    未指定日期时返回恒真条件，查询仍覆盖全部历史。
+    """
+    start_date = normalize_date(start_date)
+    end_date = normalize_date(end_date)
+    params = {}
+    if start_date is not None and end_date is not None:
+        condition = f"{column} BETWEEN :start_date AND :end_date"
+        params = {'start_date': start_date, 'end_date': end_date}
+    elif start_date is not None:
+        condition = f"{column} >= :start_date"
+        params = {'start_date': start_date}
+    elif end_date is not None:
+        condition = f"{column} <= :end_date"
+        params = {'end_date': end_date}
+    else:
+        condition = "1 = 1"
+    return condition, params
+
+
+def build_year_filter(column='r.year', start_date=None, end_date=None):
+    """
+    日期范围恰好由整年组成（起始为 1 月 1 日、结束为 12 月 31 日，或不限）时，
+    返回作用在汇总表 year 列上的过滤条件及绑定参数；否则返回 None，调用方改查明细表。
+    """
+    start_date = normalize_date(start_date)
+    end_date = normalize_date(end_date)
+    if start_date is not None and (start_date.month, start_date.day) != (1, 1):
+        return None
+    if end_date is not None and (end_date.month, end_date.day) != (12, 31):
+        return None
+    conditions = []
+    params = {}
+    if start_date is not None:
+        conditions.append(f"{column} >= :start_year")
+        params['start_year'] = start_date.year
+    if end_date is not None:
+        conditions.append(f"{column} <= :end_year")
+        params['end_year'] = end_date.year
+    return ' AND '.join(conditions) or "1 = 1", params
+
+
+def get_top_artists(start_date=None, end_date=None, limit=15):
+    """查询上榜歌曲数最多的艺术家；整年范围读取 artist_song_rollup 汇总表，否则关联明细表"""
+    year_filter = build_year_filter('r.year', start_date, end_date)
+    if year_filter is not None:
+        year_condition, params = year_filter
+        query = f"""
+        SELECT a.name as artist_name, COUNT(DISTINCT r.song_id) as song_count
+        FROM artist_song_rollup r
+        JOIN artists a ON a.artist_id = r.artist_id
+        WHERE {year_condition}
+        GROUP BY a.artist_id
+        ORDER BY song_count DESC
+        LIMIT {int(limit)}
+        """
+    else:
+        date_filter, params = build_date_filter('ce.chart_date', start_date, end_date)
+        query = f"""
+        SELECT a.name as artist_name, COUNT(DISTINCT ce.song_id) as song_count
+        FROM artists a
+        JOIN song_artists sa ON a.artist_id = sa.artist_id
+        JOIN chart_entries ce ON sa.song_id = ce.song_id
+        WHERE {date_filter}
+        GROUP BY a.artist_id
+        ORDER BY song_count DESC
+        LIMIT {int(limit)}
+        """
+    return get_data_from_query(query, params)
+
+
+def save_chart(output_path, dpi, **kwargs):
+    """
+    调整布局并保存当前图表（布局和编码分别计入性能剖析，见 jishi.py）。
+    文件扩展名按 CHART_FORMAT 替换；CHART_FORMAT 为 None 时不写文件，为 'svg' 时输出紧凑 SVG（见 SVG_RC）。
+    """
+    if CHART_FORMAT is None:
+        plt.close()
+        return
+    output_path = os.path.splitext(output_path)[0] + '.' + CHART_FORMAT
+    rc = SVG_RC if CHART_FORMAT == 'svg' else {}
+    if CHART_FORMAT == 'svg':
+        kwargs.setdefault('metadata', {'Date': None})
+    with plt.rc_context(rc):
+        with jishi.stage('layout'):
+            plt.tight_layout()
+        with jishi.stage('encode'):
+            plt.savefig(output_path, dpi=dpi, **kwargs)
+    plt.close()
+    jishi.add_output(output_path)
+    print(f"图表已保存至: {output_path}")
+
+
+def draw_rank_lines(trend_df, songs, split_runs=False, max_points=caiyang.MAX_POINTS):
+    """
+    在当前图表上绘制每首歌的排名折线（trend_df 含 chart_date / unique_song / rank）。
+    连续在榜段按 last_week_rank（有该列时）或相邻两周的日期间隔划分，split_runs 时段与段之间断开；
+    整个横轴约保留 max_points 个点，按每首歌的时间跨度分配，超过时按 LTTB 降采样
+    （保留每段首尾和峰值，见 caiyang.py），降采样的折线不画标记。
+    """
+    dates = pd.to_datetime(trend_df['chart_date'])
+    axis_span = (dates.max() - dates.min()).days if len(dates) else 0
+    colors = sns.color_palette("husl", len(songs))
+    for song, color in zip(songs, colors):
+        song_data = trend_df[trend_df['unique_song'] == song].sort_values('chart_date', kind='stable')
+        if song_data.empty:
+            continue
+        x = mdates.date2num(pd.to_datetime(song_data['chart_date']).to_numpy())
+        y = song_data['rank'].to_numpy(dtype=np.float64)
+        if 'last_week_rank' in song_data:
+            last_week = pd.to_numeric(song_data['last_week_rank'], errors='coerce').to_numpy(dtype=np.float64)
+            continuing = last_week <= 100
+        else:
+            continuing = np.r_[False, np.diff(x) <= 7]
+        continuing[0] = False
+        runs = np.cumsum(~continuing)
+        budget = caiyang.line_budget(x[-1] - x[0], axis_span, max_points)
+        kept = caiyang.downsample_runs(x, y, runs, budget)
+        x, y, runs = x[kept], y[kept], runs[kept]
+        if split_runs:
+            # 段与段之间插入 NaN，整首歌仍只用一条折线
+            breaks = np.flatnonzero(runs[1:] != runs[:-1]) + 1
+            x = np.insert(x, breaks, np.nan)
+            y = np.insert(y, breaks, np.nan)
+        style = 'o-' if len(kept) == len(song_data) else '-'
+        plt.plot(x, y, style, label=song, color=color, linewidth=2, markersize=5)
+    plt.gca().xaxis_date()
+
+
+def format_date_range(start_date=None, end_date=None):
+    """生成图表标题中的日期范围说明"""
+    start_date = normalize_date(start_date)
+    end_date = normalize_date(end_date)
+    if start_date is None and end_date is None:
+        return ''
+    start_text = start_date.isoformat() if start_date else '最早'
+    end_text = end_date.isoformat() if end_date else '最新'
+    return f'（{start_text} 至 {end_text}）'
+
+
+@jishi.profiled
+def plot_yearly_songs_count(start_date=None, end_date=None, figsize=(12, 7), dpi=300):
     """绘制每年歌曲数量统计图"""
-    query = """
+    date_filter, params = build_date_filter('chart_date', start_date, end_date)
+    query = f"""
     SELECT year, COUNT(DISTINCT song_id) AS song_count
     FROM chart_entries
+    WHERE {date_filter}
     GROUP BY year
     ORDER BY year
     """
-    df = get_data_from_query(query)
+    df = get_data_from_query(query, params)
     if df is None or df.empty:
         print("无法获取年度歌曲数据")
         return
-    plt.figure(figsize=(12, 7))
+    plt.figure(figsize=figsize)
     # 将 'year' 同时传入 hue，并关闭 dodge 参数生成单一颜色的条形图
     bar = sns.barplot(x='year', y='song_count', data=df, hue='year', dodge=False, palette='viridis')
     if bar.get_legend() is not None:
         bar.legend_.remove()
     for i, v in enumerate(df['song_count']):
         bar.text(i, v + 10, str(v), ha='center')
-    plt.title('每年Billboard Hot 100上榜歌曲数量', fontsize=16)
+    plt.title('每年Billboard Hot 100上榜歌曲数量' + format_date_range(start_date, end_date), fontsize=16)
     plt.xlabel('年份', fontsize=14)
     plt.ylabel('歌曲数量', fontsize=14)
     plt.xticks(rotation=45)
-    plt.tight_layout()
     output_path = os.path.join(OUTPUT_DIR, 'yearly_songs_count.png')
-    plt.savefig(output_path, dpi=300)
-    plt.close()
-    print(f"图表已保存至: {output_path}")
+    save_chart(output_path, dpi)
+    return df
 
 
-def plot_top_artists():
+@jishi.profiled
+def plot_top_artists(start_date=None, end_date=None, figsize=(14, 8), dpi=300):
     """绘制上榜次数最多的艺术家统计图"""
-    query = """
-    SELECT a.name as artist_name, COUNT(DISTINCT ce.song_id) as song_count
-    FROM artists a
-    JOIN song_artists sa ON a.artist_id = sa.artist_id
-    JOIN chart_entries ce ON sa.song_id = ce.song_id
-    GROUP BY a.artist_id
-    ORDER BY song_count DESC
-    LIMIT 15
-    """
-    df = get_data_from_query(query)
+    df = get_top_artists(start_date, end_date)
     if df is None or df.empty:
         print("无法获取艺术家数据")
         return
-    plt.figure(figsize=(14, 8))
+    plt.figure(figsize=figsize)
     bars = plt.barh(df['artist_name'], df['song_count'], color=sns.color_palette("viridis", len(df)))
     for bar in bars:
         width = bar.get_width()
         plt.text(width + 0.5, bar.get_y() + bar.get_height() / 2,
                  f'{width:.0f}', ha='left', va='center', fontsize=10)
-    plt.title('Billboard Hot 100上榜次数最多的艺术家', fontsize=16)
+    plt.title('Billboard Hot 100上榜次数最多的艺术家' + format_date_range(start_date, end_date), fontsize=16)
     plt.xlabel('上榜歌曲数量', fontsize=14)
     plt.ylabel('艺术家', fontsize=14)
-    plt.tight_layout()
     output_path = os.path.join(OUTPUT_DIR, 'top_artists.png')
-    plt.savefig(output_path, dpi=300)
-    plt.close()
-    print(f"图表已保存至: {output_path}")
+    save_chart(output_path, dpi)
+    return df
 
 
-def plot_songs_longevity():
+@jishi.profiled
+def plot_songs_longevity(start_date=None, end_date=None, figsize=(14, 10), dpi=300):
     """绘制歌曲在榜时长分布图"""
-    query = """
+    date_filter, params = build_date_filter('ce.chart_date', start_date, end_date)
+    query = f"""
     SELECT s.name as song_name, s.singer, COUNT(ce.chart_date) as weeks_on_chart
     FROM songs s
     JOIN chart_entries ce ON s.song_id = ce.song_id
+    WHERE {date_filter}
     GROUP BY s.song_id
     ORDER BY weeks_on_chart DESC
     LIMIT 20
     """
-    df = get_data_from_query(query)
+    df = get_data_from_query(query, params)
     if df is None or df.empty:
         print("无法获取歌曲在榜时长数据")
         return
     df['title'] = df['song_name'] + '\n' + df['singer']
-    plt.figure(figsize=(14, 10))
+    plt.figure(figsize=figsize)
     bars = plt.barh(df['title'], df['weeks_on_chart'], color=sns.color_palette("plasma", len(df)))
     for bar in bars:
         width = bar.get_width()
         plt.text(width + 0.5, bar.get_y() + bar.get_height() / 2,
                  f'{width:.0f}周', ha='left', va='center', fontsize=9)
-    plt.title('Billboard Hot 100在榜周数最长的歌曲', fontsize=16)
+    plt.title('Billboard Hot 100在榜周数最长的歌曲' + format_date_range(start_date, end_date), fontsize=16)
     plt.xlabel('在榜周数', fontsize=14)
     plt.ylabel('歌曲 (歌手)', fontsize=14)
-    plt.tight_layout()
     output_path = os.path.join(OUTPUT_DIR, 'songs_longevity.png')
-    plt.savefig(output_path, dpi=300)
-    plt.close()
-    print(f"图表已保存至: {output_path}")
+    save_chart(output_path, dpi)
+    return df
 
 
-def plot_peak_positions_distribution():
-    """绘制歌曲最高排名分布"""
-    query = """
-    SELECT peak_range, COUNT(song_id) as song_count FROM (
-        SELECT s.song_id,
-           CASE 
-             WHEN MIN(ce.rank) BETWEEN 1 AND 10 THEN '1-10'
-             WHEN MIN(ce.rank) BETWEEN 11 AND 20 THEN '11-20'
-             WHEN MIN(ce.rank) BETWEEN 21 AND 30 THEN '21-30'
-             WHEN MIN(ce.rank) BETWEEN 31 AND 40 THEN '31-40'
-             WHEN MIN(ce.rank) BETWEEN 41 AND 50 THEN '41-50'
-             WHEN MIN(ce.rank) BETWEEN 51 AND 60 THEN '51-60'
-             WHEN MIN(ce.rank) BETWEEN 61 AND 70 THEN '61-70'
-             WHEN MIN(ce.rank) BETWEEN 71 AND 80 THEN '71-80'
-             WHEN MIN(ce.rank) BETWEEN 81 AND 90 THEN '81-90'
-             WHEN MIN(ce.rank) BETWEEN 91 AND 100 THEN '91-100'
-           END AS peak_range
-        FROM songs s
-        JOIN chart_entries ce ON s.song_id = ce.song_id
-        GROUP BY s.song_id
-    ) as sub
-    GROUP BY peak_range
-    ORDER BY peak_range;
-    """
-    df = get_data_from_query(query)
-    if df is None or df.empty:
+@jishi.profiled
+def plot_peak_positions_distribution(start_date=None, end_date=None, figsize=(12, 8), dpi=300):
+    """绘制歌曲最高排名分布（每 10 名一档，见 get_distribution）"""
+    df = get_distribution('peak_rank', 10, start_date, end_date)
+    if df is None or df.empty or df['count'].sum() == 0:
         print("无法获取最高排名分布数据")
         return
-    plt.figure(figsize=(12, 8))
+    df = df.rename(columns={'label': 'peak_range', 'count': 'song_count'})
+    plt.figure(figsize=figsize)
     bars = plt.bar(df['peak_range'], df['song_count'], color=sns.color_palette("coolwarm", len(df)))
     for bar in bars:
         height = bar.get_height()
         plt.text(bar.get_x() + bar.get_width() / 2., height + 5,
                  f'{height:.0f}', ha='center', va='bottom', fontsize=10)
-    plt.title('歌曲最高排名分布', fontsize=16)
+    plt.title('歌曲最高排名分布' + format_date_range(start_date, end_date), fontsize=16)
     plt.xlabel('最高排名范围', fontsize=14)
     plt.ylabel('歌曲数量', fontsize=14)
     plt.xticks(rotation=45)
-    plt.tight_layout()
     output_path = os.path.join(OUTPUT_DIR, 'peak_positions_distribution.png')
-    plt.savefig(output_path, dpi=300)
-    plt.close()
-    print(f"图表已保存至: {output_path}")
+    save_chart(output_path, dpi)
+    return df
 
 
-def plot_artist_rank_trend(artist_name):
-    """绘制指定艺术家的排名趋势图"""
+@jishi.profiled
+def plot_distribution(metric, bins=10, start_date=None, end_date=None, artist_name=None, figsize=(12, 8), dpi=300):
+    """绘制任意指标的分布柱状图，metric 见 fenbu.METRICS，bins 为箱数或整数边界列表"""
+    df = get_distribution(metric, bins, start_date, end_date, artist_name)
+    if df is None or df.empty or df['count'].sum() == 0:
+        print(f"无法获取 {metric} 的分布数据")
+        return
+    definition = fenbu.METRICS[metric]
+    unit = '记录数' if definition['per'] == 'entry' else '歌曲数量'
+    plt.figure(figsize=figsize)
+    bars = plt.bar(df['label'], df['count'], color=sns.color_palette("viridis", len(df)))
+    if len(df) <= 30:
+        for bar in bars:
+            height = bar.get_height()
+            plt.text(bar.get_x() + bar.get_width() / 2., height,
+                     f'{height:.0f}', ha='center', va='bottom', fontsize=9)
+    title = f'{artist_name} 的' if artist_name else ''
+    plt.title(f"{title}{definition['label']}分布" + format_date_range(start_date, end_date), fontsize=16)
+    plt.xlabel(definition['label'], fontsize=14)
+    plt.ylabel(unit, fontsize=14)
+    plt.xticks(rotation=45)
+    output_path = os.path.join(OUTPUT_DIR, f'distribution_{metric}.png')
+    save_chart(output_path, dpi)
+    return df
+
+
+@jishi.profiled
+def plot_song_lifecycle(start_date=None, end_date=None, figsize=(16, 12), dpi=300):
+    """
+    绘制歌曲生命周期概览：到达最高排名所需周数、各最高排名区间的在榜周数和峰值后衰减斜率、在榜段数。
+    日期范围按歌曲首次上榜日期筛选；数据第一周之前就已在榜的歌曲首次上榜时间未知，不参与统计。
+    """
+    df = get_song_lifecycles(start_date, end_date)
+    if df.empty or (~df['left_censored']).sum() == 0:
+        print("无法获取歌曲生命周期数据")
+        return
+    df = df[~df['left_censored']]
+    fig, axes = plt.subplots(2, 2, figsize=figsize)
+
+    # 到达最高排名所需周数（26 周以上合并）
+    max_weeks = 26
+    counts = np.bincount(np.minimum(df['time_to_peak'].to_numpy(), max_weeks), minlength=max_weeks + 1)
+    ax = axes[0, 0]
+    ax.bar(np.arange(max_weeks + 1), counts, color=sns.color_palette("viridis", max_weeks + 1))
+    ax.set_xticks([0, 5, 10, 15, 20, max_weeks])
+    ax.set_xticklabels(['0', '5', '10', '15', '20', f'{max_weeks}+'])
+    ax.set_title(f'到达最高排名所需周数（中位数 {df["time_to_peak"].median():.0f} 周）', fontsize=13)
+    ax.set_xlabel('首次上榜后的周数', fontsize=12)
+    ax.set_ylabel('歌曲数量', fontsize=12)
+
+    # 按最高排名区间汇总
+    tiers = (df['peak_rank'].to_numpy().astype(int) - 1) // 10
+    tier_labels = [f'{i * 10 + 1}-{i * 10 + 10}' for i in range(10)]
+    tier_df = (df.assign(tier=pd.Categorical.from_codes(tiers, tier_labels))
+               .groupby('tier', observed=False)
+               .agg(total_weeks=('total_weeks', 'mean'), weeks_at_peak=('weeks_at_peak', 'mean'),
+                    decay_slope=('decay_slope', 'median')))
+    ax = axes[0, 1]
+    x = np.arange(len(tier_df))
+    ax.bar(x - 0.2, tier_df['total_weeks'], width=0.4, label='平均在榜周数', color='steelblue')
+    ax.bar(x + 0.2, tier_df['weeks_at_peak'], width=0.4, label='平均峰值周数', color='orange')
+    ax.set_xticks(x)
+    ax.set_xticklabels(tier_df.index, rotation=45)
+    ax.set_title('各最高排名区间的在榜周数', fontsize=13)
+    ax.set_xlabel('最高排名', fontsize=12)
+    ax.set_ylabel('周数', fontsize=12)
+    ax.legend(fontsize=10)
+
+    ax = axes[1, 0]
+    ax.bar(x, tier_df['decay_slope'], color=sns.color_palette("rocket", len(tier_df)))
+    ax.set_xticks(x)
+    ax.set_xticklabels(tier_df.index, rotation=45)
+    ax.set_title('峰值后的衰减斜率（中位数，名次/周）', fontsize=13)
+    ax.set_xlabel('最高排名', fontsize=12)
+    ax.set_ylabel('每周下滑名次', fontsize=12)
+
+    # 在榜段数及再次上榜前跌出榜单的周数
+    run_counts = df['chart_runs'].value_counts().sort_index()
+    ax = axes[1, 1]
+    bars = ax.bar(run_counts.index.astype(str), run_counts.to_numpy(), color=sns.color_palette("mako", len(run_counts)))
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width() / 2., height, f'{height:.0f}', ha='center', va='bottom', fontsize=9)
+    gaps = df.loc[df['chart_runs'] > 1, 'mean_gap']
+    gap_text = f'，重新上榜前平均跌出 {gaps.mean():.1f} 周' if not gaps.empty else ''
+    ax.set_title('在榜段数' + gap_text, fontsize=13)
+    ax.set_xlabel('连续在榜段数', fontsize=12)
+    ax.set_ylabel('歌曲数量', fontsize=12)
+    ax.set_yscale('log')
+
+    fig.suptitle(f'歌曲生命周期（{len(df)} 首歌曲）' + format_date_range(start_date, end_date), fontsize=16)
+    output_path = os.path.join(OUTPUT_DIR, 'song_lifecycle.png')
+    save_chart(output_path, dpi)
+    return tier_df.reset_index()
+
+
+@jishi.profiled
+def plot_cohort_survival(start_date=None, end_date=None, max_weeks=52, figsize=(14, 8), dpi=300):
+    """
+    绘制按首次上榜年份划分的在榜生存曲线：在榜超过 k 周的歌曲比例（Kaplan-Meier 估计）。
+    年份过多时均匀选取至多 12 条曲线。
+    """
+    df = get_song_lifecycles(start_date, end_date)
+    survival = shengming.cohort_survival(df, max_weeks) if not df.empty else pd.DataFrame()
+    if survival.empty:
+        print("无法获取在榜生存数据")
+        return
+    years = survival.columns
+    if len(years) > 12:
+        years = years[np.unique(np.linspace(0, len(years) - 1, 12).round().astype(int))]
+    plt.figure(figsize=figsize)
+    colors = sns.color_palette("viridis", len(years))
+    for year, color in zip(years, colors):
+        plt.step(survival.index, survival[year], where='post', label=str(year), color=color, linewidth=2)
+    plt.title('按首次上榜年份划分的在榜生存曲线' + format_date_range(start_date, end_date), fontsize=16)
+    plt.xlabel('在榜周数', fontsize=14)
+    plt.ylabel('在榜超过该周数的歌曲比例', fontsize=14)
+    plt.xlim(0, max_weeks)
+    plt.ylim(0, 1.02)
+    plt.grid(True, linestyle='--', alpha=0.7)
+    plt.legend(title='首次上榜年份', loc='upper right', fontsize=10)
+    output_path = os.path.join(OUTPUT_DIR, 'cohort_survival.png')
+    save_chart(output_path, dpi)
+    return survival
+
+
+@jishi.profiled
+def plot_artist_rank_trend(artist_name, start_date=None, end_date=None, max_points=caiyang.MAX_POINTS,
+                           figsize=(15, 10), dpi=300):
+    """绘制指定艺术家的排名趋势图，整个横轴约保留 max_points 个点，长时间范围时降采样（None 表示不降采样）"""
+    date_filter, params = build_date_filter('ce.chart_date', start_date, end_date)
+    params['artist_name'] = artist_name
     query = f"""
     SELECT ce.chart_date, CONCAT(s.name, '(', s.singer, ')') AS unique_song, ce.rank
     FROM chart_entries ce
     JOIN songs s ON ce.song_id = s.song_id
     JOIN song_artists sa ON s.song_id = sa.song_id
     JOIN artists a ON sa.artist_id = a.artist_id
-    WHERE a.name = '{artist_name}'
+    WHERE a.name = :artist_name AND {date_filter}
     ORDER BY ce.chart_date, ce.rank
     """
-    trend_df = get_data_from_query(query)
+    trend_df = get_data_from_query(query, params)
     if trend_df is None or trend_df.empty:
         print(f"无法获取艺术家 {artist_name} 的排名趋势数据")
         return
@@ -204,52 +577,45 @@ def plot_artist_rank_trend(artist_name):
     JOIN chart_entries ce ON s.song_id = ce.song_id
     JOIN song_artists sa ON s.song_id = sa.song_id
     JOIN artists a ON sa.artist_id = a.artist_id
-    WHERE a.name = '{artist_name}'
+    WHERE a.name = :artist_name AND {date_filter}
     GROUP BY unique_song
     ORDER BY best_rank
     LIMIT 5
     """
-    top_songs_df = get_data_from_query(top_songs_query)
+    top_songs_df = get_data_from_query(top_songs_query, params)
     if top_songs_df is None or top_songs_df.empty:
         print(f"无法获取艺术家 {artist_name} 的热门歌曲数据")
         return
     top_songs_list = top_songs_df['unique_song'].tolist()
     filtered_df = trend_df[trend_df['unique_song'].isin(top_songs_list)]
-    plt.figure(figsize=(15, 10))
-    colors = sns.color_palette("husl", len(top_songs_list))
-    color_map = {song: color for song, color in zip(top_songs_list, colors)}
-    for song in top_songs_list:
-        song_data = filtered_df[filtered_df['unique_song'] == song]
-        if not song_data.empty:
-            plt.plot(song_data['chart_date'], song_data['rank'], 'o-',
-                     label=song, color=color_map[song], linewidth=2, markersize=5)
+    plt.figure(figsize=figsize)
+    draw_rank_lines(filtered_df, top_songs_list, max_points=max_points)
     plt.gca().invert_yaxis()
     plt.ylim(100, 1)
-    plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m'))
-    plt.gca().xaxis.set_major_locator(mdates.MonthLocator(interval=3))
-    plt.title(f'{artist_name} 热门歌曲的Billboard排名趋势', fontsize=16)
+    caiyang.adaptive_date_ticks(plt.gca())
+    plt.title(f'{artist_name} 热门歌曲的Billboard排名趋势' + format_date_range(start_date, end_date), fontsize=16)
     plt.xlabel('日期', fontsize=14)
     plt.ylabel('排名', fontsize=14)
     plt.xticks(rotation=45)
     plt.grid(True, linestyle='--', alpha=0.7)
     plt.legend(loc='upper right', fontsize=10)
-    plt.tight_layout()
     output_path = os.path.join(OUTPUT_DIR, f'{artist_name}_rank_trend.png'.replace(' ', '_'))
-    plt.savefig(output_path, dpi=300)
-    plt.close()
-    print(f"图表已保存至: {output_path}")
+    save_chart(output_path, dpi)
+    return filtered_df
 
 
-def plot_seasonal_trends():
-    """绘制季节性趋势图：不同月份的新歌上榜数量"""
-    query = """
-    SELECT MONTH(chart_date) as month, COUNT(DISTINCT song_id) as new_songs
-    FROM chart_entries
-    WHERE last_week_rank IS NULL OR last_week_rank > 100
+@jishi.profiled
+def plot_seasonal_trends(start_date=None, end_date=None, figsize=(12, 8), dpi=300):
+    """绘制季节性趋势图：不同月份的新歌上榜数量（读取 chart_events 中的 debut 事件）"""
+    date_filter, params = build_date_filter('chart_date', start_date, end_date)
+    query = f"""
+    SELECT MONTH(chart_date) as month, COUNT(*) as new_songs
+    FROM chart_events
+    WHERE event_type = 'debut' AND {date_filter}
     GROUP BY MONTH(chart_date)
     ORDER BY month
     """
-    df = get_data_from_query(query)
+    df = get_data_from_query(query, params)
     if df is None or df.empty:
         print("无法获取季节性数据")
         return
@@ -257,45 +623,74 @@ def plot_seasonal_trends():
     full_months = pd.DataFrame({'month': range(1, 13)})
     df = pd.merge(full_months, df, on='month', how='left').fillna(0)
     df['month_name'] = df['month'].apply(lambda x: month_names[int(x) - 1])
-    plt.figure(figsize=(12, 8))
+    plt.figure(figsize=figsize)
     bars = plt.bar(df['month_name'], df['new_songs'], color=sns.color_palette("YlOrRd", 12))
     for bar in bars:
         height = bar.get_height()
         plt.text(bar.get_x() + bar.get_width() / 2., height + 5,
                  f'{height:.0f}', ha='center', va='bottom', fontsize=10)
-    plt.title('不同月份新歌上榜数量分布', fontsize=16)
+    plt.title('不同月份新歌上榜数量分布' + format_date_range(start_date, end_date), fontsize=16)
     plt.xlabel('月份', fontsize=14)
     plt.ylabel('新上榜歌曲数量', fontsize=14)
     plt.grid(axis='y', linestyle='--', alpha=0.7)
-    plt.tight_layout()
     output_path = os.path.join(OUTPUT_DIR, 'seasonal_trends.png')
-    plt.savefig(output_path, dpi=300)
-    plt.close()
-    print(f"图表已保存至: {output_path}")
+    save_chart(output_path, dpi)
+    return df
 
 
-def plot_rank_volatility():
-    """绘制排名波动性图：统计歌曲排名上升和下降的幅度"""
-    query = """
-    SELECT 
-        s.name as song_name,
-        s.singer,
-        MAX(ABS(ce.rank - ce.last_week_rank)) as max_change,
-        AVG(ABS(ce.rank - ce.last_week_rank)) as avg_change
-    FROM songs s
-    JOIN chart_entries ce ON s.song_id = ce.song_id
-    WHERE ce.last_week_rank IS NOT NULL
-    GROUP BY s.song_id
-    HAVING COUNT(ce.entry_id) > 5
-    ORDER BY max_change DESC
-    LIMIT 15
+@jishi.profiled
+def plot_chart_events(start_date=None, end_date=None, figsize=(15, 8), dpi=300):
+    """绘制榜单变动趋势图：每月首次上榜、重新上榜和跌出榜单的歌曲数量"""
+    date_filter, params = build_date_filter('chart_date', start_date, end_date)
+    query = f"""
+    SELECT YEAR(chart_date) as year, MONTH(chart_date) as month, event_type, COUNT(*) as event_count
+    FROM chart_events
+    WHERE event_type IN ('debut', 're-entry', 'drop-out') AND {date_filter}
+    GROUP BY YEAR(chart_date), MONTH(chart_date), event_type
+    ORDER BY year, month
     """
-    df = get_data_from_query(query)
+    df = get_data_from_query(query, params)
     if df is None or df.empty:
+        print("无法获取榜单变动数据")
+        return
+    df['month_start'] = pd.to_datetime(dict(year=df['year'], month=df['month'], day=1))
+    pivot = df.pivot_table(index='month_start', columns='event_type', values='event_count',
+                           aggfunc='sum', fill_value=0)
+    labels = {'debut': '首次上榜', 're-entry': '重新上榜', 'drop-out': '跌出榜单'}
+    colors = sns.color_palette("Set1", len(labels))
+    plt.figure(figsize=figsize)
+    for (event_type, label), color in zip(labels.items(), colors):
+        if event_type in pivot.columns:
+            plt.plot(pivot.index, pivot[event_type], 'o-', label=label, color=color, linewidth=2, markersize=3)
+    plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m'))
+    plt.title('Billboard Hot 100每月榜单变动' + format_date_range(start_date, end_date), fontsize=16)
+    plt.xlabel('月份', fontsize=14)
+    plt.ylabel('歌曲数量', fontsize=14)
+    plt.xticks(rotation=45)
+    plt.grid(True, linestyle='--', alpha=0.7)
+    plt.legend(loc='upper right', fontsize=10)
+    output_path = os.path.join(OUTPUT_DIR, 'chart_events.png')
+    save_chart(output_path, dpi)
+    return df
+
+
+@jishi.profiled
+def plot_rank_volatility(start_date=None, end_date=None, figsize=(14, 10), dpi=300):
+    """
+    绘制排名波动性图：统计歌曲排名上升和下降的幅度。
+    读取波动索引（见 bodong.py）中逐周的排名变化，只统计连续在榜的周，至少 6 周。
+    """
+    index = get_volatility_index()
+    summary = bodong.song_summary(index.frame(start_date, end_date), min_weeks=6)
+    if summary.empty:
         print("无法获取排名波动性数据")
         return
+    summary = summary.sort_values('max_change', ascending=False, kind='stable').head(15)
+    df = get_song_titles(summary.index).reset_index(drop=True)
+    df['max_change'] = summary['max_change'].to_numpy()
+    df['avg_change'] = summary['avg_change'].to_numpy()
     df['title'] = df['song_name'] + '\n' + df['singer']
-    plt.figure(figsize=(14, 10))
+    plt.figure(figsize=figsize)
     bars = plt.barh(df['title'], df['max_change'], color=sns.color_palette("plasma", len(df)))
     for i, (_, row) in enumerate(df.iterrows()):
         plt.plot([0, row['avg_change']], [i, i], 'k--', alpha=0.6)
@@ -305,54 +700,155 @@ def plot_rank_volatility():
         avg = df.iloc[i]['avg_change']
         plt.text(width + 2, bar.get_y() + bar.get_height() / 2,
                  f'最大: {width:.0f}, 平均: {avg:.1f}', ha='left', va='center', fontsize=9)
-    plt.title('Billboard Hot 100排名波动性最大的歌曲', fontsize=16)
+    plt.title('Billboard Hot 100排名波动性最大的歌曲' + format_date_range(start_date, end_date), fontsize=16)
     plt.xlabel('排名变化（位）', fontsize=14)
     plt.ylabel('歌曲 (歌手)', fontsize=14)
     plt.grid(axis='x', linestyle='--', alpha=0.7)
-    plt.tight_layout()
     output_path = os.path.join(OUTPUT_DIR, 'rank_volatility.png')
-    plt.savefig(output_path, dpi=300)
-    plt.close()
-    print(f"图表已保存至: {output_path}")
+    save_chart(output_path, dpi)
+    return df
 
 
-def plot_song_artist_heatmap():
+@jishi.profiled
+def plot_hottest_movers(start_date=None, end_date=None, top_n=15, figsize=(14, 10), dpi=300):
+    """
+    绘制势头最强的歌曲：时间范围内净上升名次（柱）和最新动量，★ 标记出现过突破周的歌曲。
+    未指定日期时取数据中最近 4 周；读取波动索引，不重新计算。
+    """
+    index = get_volatility_index()
+    if start_date is None and end_date is None and len(index):
+        start_date = shuju.EPOCH + pd.Timedelta(weeks=index.latest_week - 3)
+    movers = bodong.hottest_movers(index.frame(start_date, end_date), top_n)
+    if movers.empty:
+        print("无法获取势头最强的歌曲数据")
+        return
+    df = get_song_titles(movers.index).reset_index(drop=True)
+    for column in ('net_change', 'momentum', 'last_rank', 'breakouts'):
+        df[column] = movers[column].to_numpy()
+    df['title'] = df['song_name'] + '\n' + df['singer']
+    df = df.iloc[::-1].reset_index(drop=True)  # 动量最强的在最上方
+    plt.figure(figsize=figsize)
+    colors = ['#d62728' if change >= 0 else '#1f77b4' for change in df['net_change']]
+    bars = plt.barh(df['title'], df['net_change'], color=colors, alpha=0.8)
+    for bar, (_, row) in zip(bars, df.iterrows()):
+        label = f"动量 {row['momentum']:+.1f} · 最新第 {row['last_rank']} 名" + (' ★' if row['breakouts'] else '')
+        x = max(bar.get_width(), 0)
+        plt.text(x + 1, bar.get_y() + bar.get_height() / 2, label, ha='left', va='center', fontsize=9)
+    plt.axvline(0, color='black', linewidth=0.8)
+    plt.xlim(min(df['net_change'].min(), 0) * 1.1, max(df['net_change'].max(), 1) * 1.6)  # 为右侧的说明文字留出空间
+    plt.title('Billboard Hot 100势头最强的歌曲' + format_date_range(start_date, end_date), fontsize=16)
+    plt.xlabel('净上升名次', fontsize=14)
+    plt.ylabel('歌曲 (歌手)', fontsize=14)
+    plt.grid(axis='x', linestyle='--', alpha=0.7)
+    output_path = os.path.join(OUTPUT_DIR, 'hottest_movers.png')
+    save_chart(output_path, dpi)
+    return df
+
+
+@jishi.profiled
+def plot_streak_records(start_date=None, end_date=None, top_n=10, figsize=(18, 14), dpi=300):
+    """
+    绘制连续在榜纪录排行榜（2×2）：第 1 名最长连续周数、前 10 名最长连续周数、艺术家累计第 1 名周数、最长连续在榜。
+    读取连续段索引（见 lianxu.py），指定日期范围时只统计与范围有重叠的段（艺术家周数截取到范围内）。
+    返回各排行榜合并的表（record 列为排行榜名称）。
+    """
+    index = get_streak_index()
+    chart_df = get_chart_frame()
+    singers = chart_df.drop_duplicates('song_idx').set_index('song_idx')['singer']
+    boards = [
+        ('第 1 名最长连续周数', lianxu.longest_streaks(index, 1, top_n, start_date=start_date, end_date=end_date)),
+        ('前 10 名最长连续周数', lianxu.longest_streaks(index, 10, top_n, start_date=start_date, end_date=end_date)),
+        ('艺术家累计第 1 名周数', lianxu.artist_totals(index, 1, singers, top_n, start_date, end_date)),
+        ('最长连续在榜周数', lianxu.longest_streaks(index, 100, top_n, start_date=start_date, end_date=end_date)),
+    ]
+    if all(board.empty for _, board in boards):
+        print("无法获取连续在榜纪录数据")
+        return
+    fig, axes = plt.subplots(2, 2, figsize=figsize)
+    frames = []
+    for ax, (title, board), color in zip(axes.flat, boards, sns.color_palette("deep", 4)):
+        if 'artist' in board:
+            board['title'] = board['artist']
+            board['length'] = board['weeks']
+            notes = [f"{songs} 首歌" for songs in board['songs']]
+        else:
+            titles = get_song_titles(board['song_idx']).reset_index(drop=True)
+            board = pd.concat([board, titles], axis=1)
+            board['title'] = board['song_name'] + '\n' + board['singer']
+            notes = [f"{start:%Y-%m-%d} ~ {end:%Y-%m-%d}" + (' 进行中' if ongoing else '')
+                     for start, end, ongoing in zip(board['start_date'], board['end_date'], board['ongoing'])]
+        board = board.iloc[::-1].reset_index(drop=True)  # 纪录最长的在最上方
+        notes = notes[::-1]
+        bars = ax.barh(board['title'], board['length'], color=color, alpha=0.85)
+        for bar, note in zip(bars, notes):
+            ax.text(bar.get_width(), bar.get_y() + bar.get_height() / 2, f" {bar.get_width():.0f} 周 · {note}",
+                    ha='left', va='center', fontsize=8)
+        ax.set_xlim(0, max(board['length'].max(), 1) * 1.5)  # 为右侧的说明文字留出空间
+        ax.set_title(title, fontsize=13)
+        ax.tick_params(axis='y', labelsize=8)
+        ax.grid(axis='x', linestyle='--', alpha=0.7)
+        frames.append(board.iloc[::-1].assign(record=title))
+    fig.suptitle('Billboard Hot 100连续在榜纪录' + format_date_range(start_date, end_date), fontsize=16)
+    output_path = os.path.join(OUTPUT_DIR, 'streak_records.png')
+    save_chart(output_path, dpi)
+    return pd.concat(frames, ignore_index=True)[['record', 'title', 'length']].rename(columns={'length': 'weeks'})
+
+
+@jishi.profiled
+def plot_song_artist_heatmap(start_date=None, end_date=None, figsize=(15, 12), dpi=300):
     """绘制歌名和歌手的热力图"""
     # 首先获取上榜次数最多的前15位歌手
-    top_artists_query = """
-    SELECT a.name as artist_name, COUNT(DISTINCT ce.song_id) as song_count
-    FROM artists a
-    JOIN song_artists sa ON a.artist_id = sa.artist_id
-    JOIN chart_entries ce ON sa.song_id = ce.song_id
-    GROUP BY a.artist_id
-    ORDER BY song_count DESC
-    LIMIT 15
-    """
-    top_artists_df = get_data_from_query(top_artists_query)
+    top_artists_df = get_top_artists(start_date, end_date)
     if top_artists_df is None or top_artists_df.empty:
         print("无法获取顶级艺术家数据")
         return
 
     # 获取这些歌手的歌曲数据（每个歌手只取前3首最热门的歌曲）
     top_artists_list = top_artists_df['artist_name'].tolist()
-    songs_query = f"""
-    WITH RankedSongs AS (
-        SELECT 
-            s.singer,
-            s.name as song_name,
-            COUNT(ce.entry_id) as appearances,
-            ROW_NUMBER() OVER (PARTITION BY s.singer ORDER BY COUNT(ce.entry_id) DESC) as rn
-        FROM songs s
-        JOIN chart_entries ce ON s.song_id = ce.song_id
-        WHERE s.singer IN ({','.join([f"'{artist}'" for artist in top_artists_list])})
-        GROUP BY s.singer, s.name
-    )
-    SELECT singer, song_name, appearances
-    FROM RankedSongs
-    WHERE rn <= 3
-    ORDER BY singer, appearances DESC
-    """
-    df = get_data_from_query(songs_query)
+    artist_params = {f'artist_{i}': artist for i, artist in enumerate(top_artists_list)}
+    artist_placeholders = ','.join(f':{key}' for key in artist_params)
+    year_filter = build_year_filter('r.year', start_date, end_date)
+    if year_filter is not None:
+        # 整年范围：从汇总表读取每位歌手（独唱署名）各歌曲的在榜周数
+        year_condition, params = year_filter
+        songs_query = f"""
+        WITH RankedSongs AS (
+            SELECT
+                a.name as singer,
+                s.name as song_name,
+                SUM(r.chart_weeks) as appearances,
+                ROW_NUMBER() OVER (PARTITION BY a.name ORDER BY SUM(r.chart_weeks) DESC) as rn
+            FROM artist_song_rollup r
+            JOIN artists a ON a.artist_id = r.artist_id
+            JOIN songs s ON s.song_id = r.song_id
+            WHERE a.name IN ({artist_placeholders}) AND s.singer = a.name AND {year_condition}
+            GROUP BY a.name, s.name
+        )
+        SELECT singer, song_name, appearances
+        FROM RankedSongs
+        WHERE rn <= 3
+        ORDER BY singer, appearances DESC
+        """
+    else:
+        date_filter, params = build_date_filter('ce.chart_date', start_date, end_date)
+        songs_query = f"""
+        WITH RankedSongs AS (
+            SELECT
+                s.singer,
+                s.name as song_name,
+                COUNT(ce.entry_id) as appearances,
+                ROW_NUMBER() OVER (PARTITION BY s.singer ORDER BY COUNT(ce.entry_id) DESC) as rn
+            FROM songs s
+            JOIN chart_entries ce ON s.song_id = ce.song_id
+            WHERE s.singer IN ({artist_placeholders}) AND {date_filter}
+            GROUP BY s.singer, s.name
+        )
+        SELECT singer, song_name, appearances
+        FROM RankedSongs
+        WHERE rn <= 3
+        ORDER BY singer, appearances DESC
+        """
+    df = get_data_from_query(songs_query, {**params, **artist_params})
     if df is None or df.empty:
         print("无法获取歌名和歌手的热力图数据")
         return
@@ -371,7 +867,7 @@ def plot_song_artist_heatmap():
     heatmap_data = heatmap_data.fillna(0)
 
     # 设置图表大小和样式
-    plt.figure(figsize=(15, 12))
+    plt.figure(figsize=figsize)
 
     # 创建热力图
     sns.heatmap(
@@ -385,144 +881,363 @@ def plot_song_artist_heatmap():
     )
 
     # 设置标题和标签
-    plt.title("Top 15 歌手的最热门3首歌曲在榜出现次数", fontsize=16, pad=20)
+    plt.title("Top 15 歌手的最热门3首歌曲在榜出现次数" + format_date_range(start_date, end_date), fontsize=16, pad=20)
     plt.xlabel("歌曲名称", fontsize=12, labelpad=10)
     plt.ylabel("歌手", fontsize=12, labelpad=10)
 
     # 调整x轴标签
     plt.xticks(rotation=30, ha='right')
 
-    # 调整布局
-    plt.tight_layout()
-
-    # 保存图表
+    # 调整布局并保存图表
     output_path = os.path.join(OUTPUT_DIR, 'song_artist_heatmap.png')
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
-    plt.close()
-    print(f"图表已保存至: {output_path}")
+    save_chart(output_path, dpi, bbox_inches='tight')
+    return df
 
 
-def plot_song_name_wordcloud():
-    """绘制基于歌名数据的热词图（词云）"""
-    query = "SELECT name as song_name FROM songs"
-    df = get_data_from_query(query)
+@jishi.profiled
+def plot_artist_drilldown(decade=None, year=None, artist_name=None, figsize=(14, 8), dpi=300):
+    """
+    年代 → 年份 → 艺术家逐级钻取图（读取 artist_year_rollup 汇总表）。
+    未指定艺术家时绘制所选年代/年份在榜周数最多的艺术家；
+    指定艺术家时绘制其在所选范围内每年的在榜周数、冠军周数和上榜歌曲数。
+    """
+    params = {}
+    conditions = []
+    if year is not None:
+        conditions.append("r.year = :year")
+        params['year'] = int(year)
+        period = f'{int(year)}年'
+    elif decade is not None:
+        conditions.append("r.year BETWEEN :decade_start AND :decade_end")
+        params['decade_start'] = int(decade)
+        params['decade_end'] = int(decade) + 9
+        period = f'{int(decade)}年代'
+    else:
+        period = '全部年份'
+
+    if artist_name:
+        conditions.append("a.name = :artist_name")
+        params['artist_name'] = artist_name
+        query = f"""
+        SELECT r.year, r.song_count, r.chart_weeks, r.number_one_weeks, r.best_rank
+        FROM artist_year_rollup r
+        JOIN artists a ON a.artist_id = r.artist_id
+        WHERE {' AND '.join(conditions)}
+        ORDER BY r.year
+        """
+        df = get_data_from_query(query, params)
+        if df is None or df.empty:
+            print(f"无法获取艺术家 {artist_name} 的汇总数据")
+            return
+        plt.figure(figsize=figsize)
+        x = np.arange(len(df))
+        plt.bar(x - 0.2, df['chart_weeks'], width=0.4, label='在榜周数', color=sns.color_palette("viridis", 2)[0])
+        plt.bar(x + 0.2, df['number_one_weeks'], width=0.4, label='冠军周数', color=sns.color_palette("viridis", 2)[1])
+        for i, row in df.iterrows():
+            plt.text(i - 0.2, row['chart_weeks'] + 0.5, f"{row['song_count']:.0f}首",
+                     ha='center', va='bottom', fontsize=9)
+        plt.xticks(x, df['year'].astype(int), rotation=45)
+        plt.title(f'{artist_name} 每年上榜情况（{period}）', fontsize=16)
+        plt.xlabel('年份', fontsize=14)
+        plt.ylabel('周数', fontsize=14)
+        plt.legend(loc='upper right', fontsize=10)
+    else:
+        query = f"""
+        SELECT a.name as artist_name, SUM(r.chart_weeks) as chart_weeks,
+               SUM(r.number_one_weeks) as number_one_weeks, MIN(r.best_rank) as best_rank
+        FROM artist_year_rollup r
+        JOIN artists a ON a.artist_id = r.artist_id
+        WHERE {' AND '.join(conditions) or '1 = 1'}
+        GROUP BY a.artist_id
+        ORDER BY chart_weeks DESC
+        LIMIT 15
+        """
+        df = get_data_from_query(query, params)
+        if df is None or df.empty:
+            print(f"无法获取{period}的艺术家汇总数据")
+            return
+        plt.figure(figsize=figsize)
+        bars = plt.barh(df['artist_name'], df['chart_weeks'], color=sns.color_palette("viridis", len(df)))
+        for bar, (_, row) in zip(bars, df.iterrows()):
+            plt.text(bar.get_width() + 0.5, bar.get_y() + bar.get_height() / 2,
+                     f"{row['chart_weeks']:.0f}周 (冠军{row['number_one_weeks']:.0f}周, 最高#{row['best_rank']:.0f})",
+                     ha='left', va='center', fontsize=9)
+        plt.gca().invert_yaxis()
+        plt.title(f'在榜周数最多的艺术家（{period}）', fontsize=16)
+        plt.xlabel('在榜周数', fontsize=14)
+        plt.ylabel('艺术家', fontsize=14)
+    output_path = os.path.join(OUTPUT_DIR, 'artist_drilldown.png')
+    save_chart(output_path, dpi)
+    return df
+
+
+@jishi.profiled
+def plot_collaboration_graph(start_date=None, end_date=None, top_n=30, figsize=(14, 14), dpi=300):
+    """绘制艺术家合作网络图：PageRank 最高的 top_n 位艺术家及其之间的合作（边宽为共同在榜周数）"""
+    graph = get_collaboration_graph(start_date, end_date)
+    metrics = graph['metrics']
+    metrics = metrics[metrics['degree'] > 0].head(top_n)
+    if metrics.empty:
+        print("无法获取艺术家合作数据")
+        return
+    # 同一连通分量的艺术家排在一起，便于看出合作群体
+    metrics = metrics.sort_values(['component_size', 'component', 'pagerank'],
+                                  ascending=[False, True, False], kind='stable')
+    positions = graph['artists'].get_indexer(metrics['artist'])
+    sub = graph['adjacency'][positions][:, positions].tocoo()
+    angles = np.linspace(0, 2 * np.pi, len(metrics), endpoint=False)
+    xy = np.column_stack([np.cos(angles), np.sin(angles)])
+
+    plt.figure(figsize=figsize)
+    ax = plt.gca()
+    upper = sub.row < sub.col
+    segments = np.stack([xy[sub.row[upper]], xy[sub.col[upper]]], axis=1)
+    widths = 0.5 + 2.5 * np.log1p(sub.data[upper]) / np.log1p(sub.data.max() if sub.nnz else 1)
+    ax.add_collection(LineCollection(segments, linewidths=widths, colors='gray', alpha=0.5))
+    sizes = 3000 * metrics['pagerank'].to_numpy() / metrics['pagerank'].max()
+    ax.scatter(xy[:, 0], xy[:, 1], s=sizes, c=metrics['component'].to_numpy(), cmap='tab20', zorder=3,
+               edgecolors='black', linewidths=0.5)
+    for (x, y), angle, artist in zip(xy, angles, metrics['artist']):
+        plt.text(x * 1.12, y * 1.12, artist, ha='center', va='center', fontsize=9,
+                 rotation=np.degrees(angle) if np.cos(angle) >= 0 else np.degrees(angle) + 180)
+    ax.set_xlim(-1.4, 1.4)
+    ax.set_ylim(-1.4, 1.4)
+    ax.set_aspect('equal')
+    plt.axis('off')
+    plt.title(f'艺术家合作网络（PageRank 前 {len(metrics)} 位）' + format_date_range(start_date, end_date), fontsize=16)
+    output_path = os.path.join(OUTPUT_DIR, 'collaboration_graph.png')
+    save_chart(output_path, dpi)
+    return metrics
+
+
+@jishi.profiled
+def plot_song_name_wordcloud(start_date=None, end_date=None, artist_name=None, figsize=(10, 8), dpi=300):
+    """
+    绘制基于歌名数据的热词图（词云）。
+    词频读取歌名词频索引（见 cipin.py），歌曲按首次上榜年份归属，日期范围按年份截取；
+    指定 artist_name 时只统计该艺术家参与的歌曲。
+    """
+    start_date = normalize_date(start_date)
+    end_date = normalize_date(end_date)
+    conditions = []
+    params = {}
+    year_column = 't.debut_year' if artist_name else 't.year'
+    if start_date is not None:
+        conditions.append(f"{year_column} >= :start_year")
+        params['start_year'] = start_date.year
+    if end_date is not None:
+        conditions.append(f"{year_column} <= :end_year")
+        params['end_year'] = end_date.year
+    if artist_name:
+        conditions.append("a.name = :artist_name")
+        params['artist_name'] = artist_name
+        query = f"""
+        SELECT t.term, COUNT(*) as frequency
+        FROM song_title_terms t
+        JOIN song_artists sa ON sa.song_id = t.song_id
+        JOIN artists a ON a.artist_id = sa.artist_id
+        WHERE {' AND '.join(conditions)}
+        GROUP BY t.term
+        """
+    else:
+        query = f"""
+        SELECT t.term, SUM(t.song_count) as frequency
+        FROM title_term_years t
+        WHERE {' AND '.join(conditions) or '1 = 1'}
+        GROUP BY t.term
+        """
+    df = get_data_from_query(query, params)
     if df is None or df.empty:
-        print("无法获取歌名数据")
+        print("无法获取歌名词频数据")
         return
-    text = " ".join(df['song_name'].tolist())
-    try:
-        import jieba
-        text = " ".join(jieba.cut(text))
-    except ImportError:
-        pass
+    frequencies = dict(zip(df['term'], df['frequency'].astype(float)))
     wc = WordCloud(font_path="simhei.ttf", background_color="white", width=800, height=600)
-    wc.generate(text)
-    plt.figure(figsize=(10, 8))
+    wc.generate_from_frequencies(frequencies)
+    plt.figure(figsize=figsize)
     plt.imshow(wc, interpolation="bilinear")
     plt.axis("off")
-    plt.title("基于歌名的热词图", fontsize=16)
-    plt.tight_layout()
+    title = f"{artist_name} 歌名热词图" if artist_name else "基于歌名的热词图"
+    plt.title(title + format_date_range(start_date, end_date), fontsize=16)
     output_path = os.path.join(OUTPUT_DIR, 'song_name_wordcloud.png')
-    plt.savefig(output_path, dpi=300)
-    plt.close()
-    print(f"图表已保存至: {output_path}")
+    save_chart(output_path, dpi)
+    return df
 
 
-def plot_search_trend(search_str):
+@jishi.profiled
+def plot_search_trend(search_str, start_date=None, end_date=None, max_points=caiyang.MAX_POINTS,
+                      figsize=(15, 10), dpi=300):
     """
     根据用户输入的搜索字符串进行精确匹配，
-    使用 CONCAT(s.name, '(', s.singer, ')') 生成唯一标识，
+    使用 歌名(歌手) 作为唯一标识（unique_song），
     查询热门的歌曲（取前10）并绘制这些歌曲的排名趋势图。
+    数据来自内存中的紧凑榜单数据，歌名和歌手为分类列，匹配只比较分类编码。
+    整个横轴约保留 max_points 个点，长时间范围时降采样（None 表示不降采样）。
     """
-    query = f"""
-    SELECT ce.chart_date, CONCAT(s.name, '(', s.singer, ')') AS unique_song, ce.rank, ce.last_week_rank
-    FROM chart_entries ce
-    JOIN songs s ON ce.song_id = s.song_id
-    WHERE s.singer = '{search_str}' OR s.name = '{search_str}'
-    ORDER BY ce.chart_date, ce.rank
-    """
-    trend_df = get_data_from_query(query)
-    if trend_df is None or trend_df.empty:
+    chart_df = get_chart_frame(start_date, end_date)
+    matched = chart_df[(chart_df['singer'] == search_str) | (chart_df['name'] == search_str)]
+    if matched.empty:
         print(f"未找到与 [{search_str}] 完全匹配的歌曲或歌手的排名趋势数据")
         return
+    trend_df = pd.DataFrame({
+        'chart_date': matched['chart_date'],
+        'unique_song': matched['unique_song'].astype(str),
+        'rank': matched['rank'],
+        'last_week_rank': matched['last_week'],
+    })
 
-    top_songs_query = f"""
-    SELECT CONCAT(s.name, '(', s.singer, ')') AS unique_song, MIN(ce.rank) as best_rank
-    FROM chart_entries ce
-    JOIN songs s ON ce.song_id = s.song_id
-    WHERE s.singer = '{search_str}' OR s.name = '{search_str}'
-    GROUP BY unique_song
-    ORDER BY best_rank
-    LIMIT 10
-    """
-    top_songs_df = get_data_from_query(top_songs_query)
-    if top_songs_df is None or top_songs_df.empty:
+    top_songs_df = (trend_df.groupby('unique_song')['rank'].min()
+                    .rename('best_rank').reset_index()
+                    .sort_values('best_rank', kind='stable')
+                    .head(10))
+    if top_songs_df.empty:
         print(f"未找到与 [{search_str}] 完全匹配的热门歌曲数据")
         return
 
     top_songs_list = top_songs_df['unique_song'].tolist()
     filtered_df = trend_df[trend_df['unique_song'].isin(top_songs_list)]
 
-    plt.figure(figsize=(15, 10))
-    colors = sns.color_palette("husl", len(top_songs_list))
-    color_map = {song: color for song, color in zip(top_songs_list, colors)}
-
-    for song in top_songs_list:
-        song_data = filtered_df[filtered_df['unique_song'] == song].sort_values('chart_date')
-        if not song_data.empty:
-            # 找出连续上榜的段
-            segments = []
-            current_segment = []
-
-            for idx, row in song_data.iterrows():
-                if not current_segment:
-                    current_segment.append((row['chart_date'], row['rank']))
-                else:
-                    # 检查是否连续上榜
-                    if row['last_week_rank'] is not None and row['last_week_rank'] <= 100:
-                        current_segment.append((row['chart_date'], row['rank']))
-                    else:
-                        if current_segment:
-                            segments.append(current_segment)
-                        current_segment = [(row['chart_date'], row['rank'])]
-
-            if current_segment:
-                segments.append(current_segment)
-
-            # 绘制每个连续段
-            for segment in segments:
-                dates, ranks = zip(*segment)
-                plt.plot(dates, ranks, 'o-', label=song if segment == segments[0] else None,
-                         color=color_map[song], linewidth=2, markersize=5)
-
+    plt.figure(figsize=figsize)
+    # 每个连续上榜段单独成段（段间断开），长时间范围按 max_points 降采样
+    draw_rank_lines(filtered_df, top_songs_list, split_runs=True, max_points=max_points)
     plt.gca().invert_yaxis()
     plt.ylim(100, 1)
-    plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m'))
-    plt.gca().xaxis.set_major_locator(mdates.MonthLocator(interval=3))
-    plt.title(f'精确匹配 [{search_str}] 的热门歌曲的Billboard排名趋势', fontsize=16)
+    caiyang.adaptive_date_ticks(plt.gca())
+    plt.title(f'精确匹配 [{search_str}] 的热门歌曲的Billboard排名趋势' + format_date_range(start_date, end_date), fontsize=16)
     plt.xlabel('日期', fontsize=14)
     plt.ylabel('排名', fontsize=14)
     plt.xticks(rotation=45)
     plt.grid(True, linestyle='--', alpha=0.7)
     plt.legend(loc='upper right', fontsize=10)
-    plt.tight_layout()
     output_path = os.path.join(OUTPUT_DIR, f'{search_str}_search_trend.png'.replace(' ', '_'))
-    plt.savefig(output_path, dpi=300)
-    plt.close()
-    print(f"图表已保存至: {output_path}")
+    save_chart(output_path, dpi)
+    return filtered_df
+
+
+def parse_search_terms(search_terms):
+    """将逗号分隔的字符串（支持中文逗号）或列表解析为去重后的查询词列表，保持输入顺序"""
+    if isinstance(search_terms, str):
+        search_terms = re.split(r'[,，]', search_terms)
+    terms = [str(term).strip() for term in search_terms]
+    return list(dict.fromkeys(term for term in terms if term))
+
+
+def match_search_terms(chart_df, terms):
+    """
+    在内存中的紧凑榜单数据上一次解析多个歌手 / 歌名。
+    歌手匹配完整的歌手字段或署名中的任一艺术家（对歌手分类取值做一次子串预筛和署名拆分），歌名精确匹配；
+    之后每个词只在分类编码上做一次向量比较。
+    返回长表 (term, chart_date, unique_song, rank, last_week_rank)，一条记录可同时属于多个词（如合作歌曲）。
+    """
+    singers = chart_df['singer'].cat.categories
+    names = chart_df['name'].cat.categories
+    singer_codes = chart_df['singer'].cat.codes.to_numpy()
+    name_codes = chart_df['name'].cat.codes.to_numpy()
+    pattern = '|'.join(re.escape(term) for term in terms)
+    term_singers = {term: [] for term in terms}
+    for code in np.flatnonzero(singers.str.contains(pattern, regex=True)):
+        singer = singers[code]
+        credits = set(shuju.split_artists(singer)) | {singer}
+        for term in terms:
+            if term in credits:
+                term_singers[term].append(code)
+    name_matches = names.get_indexer(terms)
+    frames = []
+    for term, name_code in zip(terms, name_matches):
+        mask = np.isin(singer_codes, term_singers[term])
+        if name_code >= 0:
+            mask |= name_codes == name_code
+        rows = chart_df[mask]
+        frames.append(pd.DataFrame({
+            'term': term,
+            'chart_date': rows['chart_date'],
+            'unique_song': rows['unique_song'].astype(str),
+            'rank': rows['rank'],
+            'last_week_rank': rows['last_week'],
+        }))
+    trend_df = pd.concat(frames, ignore_index=True)
+    trend_df['term'] = pd.Categorical(trend_df['term'], categories=terms)
+    return trend_df
+
+
+@jishi.profiled
+def plot_trend_comparison(search_terms, start_date=None, end_date=None, top_n=5, max_points=caiyang.MAX_POINTS,
+                          figsize=None, dpi=300):
+    """
+    批量比较多个歌手 / 歌名的排名趋势：search_terms 为列表或逗号分隔的字符串。
+    所有词在内存数据上一次解析（见 match_search_terms），每个词取最高排名前 top_n 的歌曲，
+    在一张共享坐标轴的小多图中每个词一个子图，只渲染一次、只写一个文件。
+    每个子图约保留 max_points / 列数 个点（None 表示不降采样）。
+    """
+    terms = parse_search_terms(search_terms)
+    if not terms:
+        print("请输入至少一个歌手或歌名")
+        return
+    chart_df = get_chart_frame(start_date, end_date)
+    if chart_df.empty:
+        print("没有可用的榜单数据")
+        return
+    with jishi.stage('transform'):
+        trend_df = match_search_terms(chart_df, terms)
+        top_songs = (trend_df.groupby(['term', 'unique_song'], observed=True)['rank'].min()
+                     .rename('best_rank').reset_index()
+                     .sort_values(['term', 'best_rank'], kind='stable')
+                     .groupby('term', observed=True).head(top_n))
+        filtered_df = trend_df.merge(top_songs[['term', 'unique_song']], on=['term', 'unique_song'])
+    if filtered_df.empty:
+        print(f"未找到与 {terms} 完全匹配的歌曲或歌手的排名趋势数据")
+        return
+    missing = [term for term in terms if term not in set(top_songs['term'])]
+    if missing:
+        print(f"未找到: {', '.join(missing)}")
+
+    ncols = min(len(terms), 5, math.ceil(math.sqrt(len(terms))))
+    nrows = math.ceil(len(terms) / ncols)
+    fig, axes = plt.subplots(nrows, ncols, figsize=figsize or (4.5 * ncols, 3.2 * nrows + 1),
+                             sharex=True, sharey=True, squeeze=False)
+    panel_points = None if max_points is None else max(50, max_points // ncols)
+    for ax, term in zip(axes.flat, terms):
+        plt.sca(ax)
+        term_df = filtered_df[filtered_df['term'] == term]
+        songs = top_songs.loc[top_songs['term'] == term, 'unique_song'].tolist()
+        if term_df.empty:
+            ax.text(0.5, 0.5, '无数据', transform=ax.transAxes, ha='center', va='center', color='gray')
+        else:
+            draw_rank_lines(term_df, songs, split_runs=True, max_points=panel_points)
+            ax.legend(loc='lower left', fontsize=6)
+        ax.set_title(term, fontsize=11)
+        ax.grid(True, linestyle='--', alpha=0.7)
+    # 多余的格子隐藏，上一行同一列的子图补上横轴刻度
+    for index in range(len(terms), nrows * ncols):
+        row, col = divmod(index, ncols)
+        axes[row, col].set_visible(False)
+        axes[row - 1, col].xaxis.set_tick_params(labelbottom=True)
+    axes[0, 0].set_ylim(100, 1)
+    axes[0, 0].xaxis_date()
+    caiyang.adaptive_date_ticks(axes[0, 0])
+    for ax in axes.flat:
+        plt.setp(ax.get_xticklabels(), rotation=45)
+    fig.suptitle(f'{len(terms)} 位歌手 / 歌曲的Billboard排名趋势对比' + format_date_range(start_date, end_date),
+                 fontsize=16)
+    fig.supxlabel('日期', fontsize=12)
+    fig.supylabel('排名', fontsize=12)
+    output_path = os.path.join(OUTPUT_DIR, 'trend_comparison.png')
+    save_chart(output_path, dpi)
+    return filtered_df
 
 
 def interactive_loop():
     """
     交互模块循环：持续提示用户输入精确的歌手或歌名，
-    根据输入生成排名趋势图；输入 'q' 或 'Q' 时退出循环。
+    根据输入生成排名趋势图（逗号分隔的多个名称生成对比图）；输入 'q' 或 'Q' 时退出循环。
     """
     while True:
         user_input = input("请输入精确的歌手或歌名（输入 'q' 退出）：").strip()
         if user_input.lower() == 'q':
             print("退出交互模块。")
             break
-        if user_input:
+        if ',' in user_input or '，' in user_input:
+            plot_trend_comparison(user_input)
+        elif user_input:
             plot_search_trend(user_input)
         else:
             print("输入为空，请重新输入。")
@@ -543,7 +1258,11 @@ def main():
     plot_songs_longevity()
     print("\n4. 绘制歌曲最高排名分布图")
     plot_peak_positions_distribution()
-    print("\n5. 绘制知名艺术家排名趋势图")
+    print("\n5. 绘制歌曲生命周期图")
+    plot_song_lifecycle()
+    print("\n6. 绘制在榜生存曲线")
+    plot_cohort_survival()
+    print("\n7. 绘制知名艺术家排名趋势图")
     top_artist_query = """
     SELECT a.name, COUNT(*) as appearance_count
     FROM artists a
@@ -556,15 +1275,19 @@ def main():
     top_artist_df = get_data_from_query(top_artist_query)
     if top_artist_df is not None and not top_artist_df.empty:
         plot_artist_rank_trend(top_artist_df.iloc[0]['name'])
-    print("\n6. 绘制季节性趋势图")
+    print("\n8. 绘制季节性趋势图")
     plot_seasonal_trends()
-    print("\n7. 绘制排名波动性图")
+    print("\n9. 绘制榜单变动趋势图")
+    plot_chart_events()
+    print("\n10. 绘制排名波动性图")
     plot_rank_volatility()
-    print("\n8. 绘制歌名和歌手热力图")
+    print("\n11. 绘制势头最强的歌曲图")
+    plot_hottest_movers()
+    print("\n12. 绘制歌名和歌手热力图")
     plot_song_artist_heatmap()
-    print("\n9. 绘制基于歌名的热词图")
+    print("\n13. 绘制基于歌名的热词图")
     plot_song_name_wordcloud()
-    print("\n10. 进入交互模块：持续输入精确的歌手或歌名生成排名趋势图")
+    print("\n14. 进入交互模块：持续输入精确的歌手或歌名生成排名趋势图")
     interactive_loop()
     print("\n所有图表生成完成，请查看 charts 目录！")
 
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+连续在榜纪录模块
+
+对每首歌逐周的排名序列做一次游程编码：对每个名次门槛（THRESHOLDS，1 / 5 / 10 / 40 / 100）
+记录排名不低于门槛的每一段连续周数（起始周、结束周、长度）。
+    已结束的段   追加到紧凑数组中（与 bodong.py 相同的按倍数扩容方式）
+    进行中的段   由每首歌的状态（段起始周、最近达标周）得出，新的一周到来时只处理这一周
+另外按歌曲保存每个门槛的累计周数和最长一段的周数，纪录 / 排行榜查询（第 1 名最长连续周数、
+前 10 名最长连续周数、艺术家累计第 1 名周数、最长连续在榜）直接在这些数组上取前几名，不需要窗口查询。
+"""
+import numpy as np
+import pandas as pd
+import shuju
+
+# 名次门槛：排名不低于门槛（数值不大于门槛）的周计入该门槛的连续段
+THRESHOLDS = (1, 5, 10, 40, 100)
+
+# 已结束的连续段保存的字段及类型
+FIELDS = {
+    'song_idx': np.uint32,
+    'threshold': np.uint8,
+    'start_week': np.uint16,
+    'length': np.uint16,
+}
+
+# 结果缓存：数据版本 -> 索引（数据追加新的周时在原索引上增量更新）
+_index_cache = {}
+
+
+def threshold_column(threshold):
+    """门槛在状态数组中的列号，未知门槛抛出 ValueError"""
+    if threshold not in THRESHOLDS:
+        raise ValueError(f"未知名次门槛: {threshold}（可选: {', '.join(map(str, THRESHOLDS))}）")
+    return THRESHOLDS.index(threshold)
+
+
+def week_to_date(week_idx):
+    """week_idx 转换为榜单日期"""
+    return shuju.EPOCH + pd.to_timedelta(np.asarray(week_idx, dtype=np.int64) * 7, unit='D')
+
+
+class StreakIndex:
+    """按周追加的连续段数组，以及每首歌在各门槛下的游程状态"""
+
+    def __init__(self):
+        self.size = 0
+        self.latest_week = -1
+        self.arrays = {name: np.empty(0, dtype=dtype) for name, dtype in FIELDS.items()}
+        # 每首歌 × 门槛的状态（按 song_idx 索引，新歌出现时扩容）
+        self.run_start = np.empty((0, len(THRESHOLDS)), dtype=np.int32)
+        self.last_week = np.empty((0, len(THRESHOLDS)), dtype=np.int32)
+        self.total_weeks = np.empty((0, len(THRESHOLDS)), dtype=np.int32)
+        self.longest = np.empty((0, len(THRESHOLDS)), dtype=np.int32)
+        self.songs = 0
+        # 上一周在榜的歌曲及其排名（用于找出本周结束的段）
+        self.prev_song = np.empty(0, dtype=np.int64)
+        self.prev_rank = np.empty(0, dtype=np.int16)
+
+    def __len__(self):
+        return self.size
+
+    def _reserve(self, rows, songs):
+        """保证连续段数组和歌曲状态的容量（按倍数扩容，追加一周的摊还代价为常数）"""
+        capacity = len(self.arrays['song_idx'])
+        if self.size + rows > capacity:
+            capacity = max(self.size + rows, capacity * 2, 1024)
+            for name, array in self.arrays.items():
+                grown = np.empty(capacity, dtype=array.dtype)
+                grown[:self.size] = array[:self.size]
+                self.arrays[name] = grown
+        if songs > len(self.last_week):
+            extra = max(songs, len(self.last_week) * 2, 1024) - len(self.last_week)
+            shape = (extra, len(THRESHOLDS))
+            self.run_start = np.vstack([self.run_start, np.zeros(shape, dtype=np.int32)])
+            self.last_week = np.vstack([self.last_week, np.full(shape, -2, dtype=np.int32)])
+            self.total_weeks = np.vstack([self.total_weeks, np.zeros(shape, dtype=np.int32)])
+            self.longest = np.vstack([self.longest, np.zeros(shape, dtype=np.int32)])
+        self.songs = max(self.songs, songs)
+
+    def add_week(self, week_idx, song_idx, rank):
+        """处理新的一周（week_idx 需大于已处理的最后一周），song_idx / rank 为本周在榜歌曲"""
+        week_idx = int(week_idx)
+        if week_idx <= self.latest_week:
+            raise ValueError(f"周 {week_idx} 不晚于已处理的最后一周 {self.latest_week}")
+        song = np.asarray(song_idx, dtype=np.int64)
+        rank = np.asarray(rank, dtype=np.int16)
+        limits = np.asarray(THRESHOLDS, dtype=np.int16)
+        self._reserve(len(self.prev_song) * len(THRESHOLDS), int(song.max()) + 1 if len(song) else 0)
+
+        # 本周达标的 (歌曲, 门槛)；上周达标且本周不再延续的段在此结束
+        qualified = rank[:, None] <= limits[None, :]
+        continuing = qualified & (self.last_week[song] == week_idx - 1)
+        prev_qualified = self.prev_rank[:, None] <= limits[None, :]
+        still = np.zeros_like(prev_qualified)
+        if week_idx == self.latest_week + 1 and len(self.prev_song):
+            now = np.full(self.songs, np.iinfo(np.int16).max, dtype=np.int16)
+            now[song] = rank
+            still = now[self.prev_song][:, None] <= limits[None, :]
+        rows, cols = np.nonzero(prev_qualified & ~still)
+        ended = self.prev_song[rows]
+        self._append(ended, cols, self.run_start[ended, cols],
+                     self.last_week[ended, cols] - self.run_start[ended, cols] + 1)
+
+        # 更新状态：新开始的段记录起始周，达标的段更新最近达标周、累计周数和最长段
+        rows, cols = np.nonzero(qualified)
+        songs = song[rows]
+        starting = ~continuing[rows, cols]
+        self.run_start[songs[starting], cols[starting]] = week_idx
+        self.last_week[songs, cols] = week_idx
+        self.total_weeks[songs, cols] += 1
+        self.longest[songs, cols] = np.maximum(self.longest[songs, cols],
+                                               week_idx - self.run_start[songs, cols] + 1)
+        self.prev_song = song
+        self.prev_rank = rank
+        self.latest_week = week_idx
+
+    def _append(self, song, column, start, length):
+        """追加已结束的连续段"""
+        rows = slice(self.size, self.size + len(song))
+        self.arrays['song_idx'][rows] = song
+        self.arrays['threshold'][rows] = column
+        self.arrays['start_week'][rows] = start
+        self.arrays['length'][rows] = length
+        self.size += len(song)
+
+    def extend(self, df):
+        """
+        按周顺序处理多周数据。
+        df 需要包含 week_idx、song_idx、rank 列，并按 week_idx 排序（shuju.load_chart_data 的行顺序）。
+        """
+        data = df.dropna(subset=['rank'])
+        week = data['week_idx'].to_numpy()
+        song = data['song_idx'].to_numpy()
+        rank = data['rank'].to_numpy(dtype=np.int16)
+        self._reserve(0, int(song.max()) + 1 if len(song) else 0)
+        bounds = np.r_[0, np.flatnonzero(week[1:] != week[:-1]) + 1, len(week)]
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            self.add_week(week[start], song[start:stop], rank[start:stop])
+
+    def streaks(self, threshold, start_date=None, end_date=None):
+        """
+        返回某门槛下的全部连续段（DataFrame：song_idx、start_week、end_week、length、ongoing），
+        包括截至最后一周仍在进行的段。指定日期范围时只保留与范围有重叠的段。
+        """
+        column = threshold_column(threshold)
+        closed = self.arrays['threshold'][:self.size] == column
+        song = self.arrays['song_idx'][:self.size][closed].astype(np.int64)
+        start = self.arrays['start_week'][:self.size][closed].astype(np.int64)
+        length = self.arrays['length'][:self.size][closed].astype(np.int64)
+        ongoing = np.flatnonzero(self.last_week[:self.songs, column] == self.latest_week)
+        ongoing_start = self.run_start[ongoing, column].astype(np.int64)
+        frame = pd.DataFrame({
+            'song_idx': np.r_[song, ongoing],
+            'start_week': np.r_[start, ongoing_start],
+            'length': np.r_[length, self.latest_week - ongoing_start + 1],
+            'ongoing': np.r_[np.zeros(len(song), dtype=bool), np.ones(len(ongoing), dtype=bool)],
+        })
+        frame.insert(2, 'end_week', frame['start_week'] + frame['length'] - 1)
+        if start_date is not None:
+            frame = frame[frame['end_week'] >= shuju.date_to_week_idx(start_date, round_up=True)]
+        if end_date is not None:
+            frame = frame[frame['start_week'] <= shuju.date_to_week_idx(end_date)]
+        return frame.reset_index(drop=True)
+
+    def song_records(self):
+        """每首歌在各门槛下的累计周数和最长连续周数（按 song_idx 索引，列如 weeks_1、longest_1）"""
+        columns = {}
+        for column, threshold in enumerate(THRESHOLDS):
+            columns[f'weeks_{threshold}'] = self.total_weeks[:self.songs, column]
+            columns[f'longest_{threshold}'] = self.longest[:self.songs, column]
+        return pd.DataFrame(columns)
+
+
+def build_index(df):
+    """由全部历史构建索引（一次按周顺序的游程编码）"""
+    index = StreakIndex()
+    index.extend(df)
+    return index
+
+
+def _is_prefix(index, df, processed):
+    """df 的前 len(processed) 行是否正是索引已处理的数据（只追加了新的周），processed 为已处理的 (song_idx, rank)"""
+    song, rank = processed
+    n = len(song)
+    if n > len(df) or (len(df) > n and df['week_idx'].iat[n] <= index.latest_week):
+        return False
+    head = df.iloc[:n]
+    return (np.array_equal(head['song_idx'].to_numpy(), song)
+            and np.array_equal(head['rank'].to_numpy(dtype=np.int16, na_value=0), rank))
+
+
+def get_index(df=None, version=None):
+    """
+    返回当前数据的连续段索引，按数据版本缓存。
+    数据版本变化时，若只是追加了新的周，只处理新增的周；否则重新构建。
+    df 为已加载的紧凑榜单数据，version 为其数据版本（两者需来自同一快照，省略时按当前快照读取）。
+    """
+    snapshot = None
+    if version is None:
+        snapshot = shuju.pin_snapshot()
+        version = shuju.data_version(snapshot)
+    if _index_cache.get('version') == version:
+        return _index_cache['index']
+    if df is None:
+        df = shuju.load_chart_data(['rank', 'week_idx', 'song_idx'], snapshot=snapshot)
+    df = df.dropna(subset=['rank'])
+    index = _index_cache.get('index')
+    if index is not None and _is_prefix(index, df, _index_cache['processed']):
+        index.extend(df.iloc[len(_index_cache['processed'][0]):])
+    else:
+        index = build_index(df)
+    # 索引本身不保存逐周记录，保留已处理的 (song_idx, rank) 用于判断新数据是否只追加了新的周
+    _index_cache['processed'] = (df['song_idx'].to_numpy(), df['rank'].to_numpy(dtype=np.int16))
+    _index_cache['index'] = index
+    _index_cache['version'] = version
+    return index
+
+
+def longest_streaks(index, threshold, top_n=10, per_song=True, start_date=None, end_date=None):
+    """
+    某门槛下最长的连续段（第 1 名最长连续周数、前 10 名最长连续周数、最长连续在榜等），
+    per_song 为 True 时每首歌只取最长的一段。
+    """
+    frame = index.streaks(threshold, start_date, end_date)
+    frame = frame.sort_values(['length', 'start_week'], ascending=[False, True], kind='stable')
+    if per_song:
+        frame = frame.drop_duplicates('song_idx')
+    frame = frame.head(top_n).reset_index(drop=True)
+    frame['start_date'] = week_to_date(frame['start_week'])
+    frame['end_date'] = week_to_date(frame['end_week'])
+    return frame
+
+
+def artist_totals(index, threshold, singers, top_n=10, start_date=None, end_date=None):
+    """
+    艺术家在某门槛下的累计周数（如累计第 1 名周数）：每首歌的累计周数计入其每位署名艺术家。
+    singers 为按 song_idx 索引的署名（Series）；指定日期范围时由各段截取到范围内的周数累加。
+    返回 artist、weeks、songs 三列。
+    """
+    if start_date is None and end_date is None:
+        weeks = pd.Series(index.total_weeks[:index.songs, threshold_column(threshold)])
+    else:
+        frame = index.streaks(threshold, start_date, end_date)
+        lo = frame['start_week'] if start_date is None else \
+            frame['start_week'].clip(lower=shuju.date_to_week_idx(start_date, round_up=True))
+        hi = frame['end_week'] if end_date is None else \
+            frame['end_week'].clip(upper=shuju.date_to_week_idx(end_date))
+        weeks = (hi - lo + 1).groupby(frame['song_idx']).sum()
+    weeks = weeks[weeks > 0]
+    credits = singers.reindex(weeks.index).astype(str).map(shuju.split_artists).explode().dropna()
+    totals = pd.DataFrame({'artist': credits.to_numpy(), 'weeks': weeks.reindex(credits.index).to_numpy()})
+    totals = totals.groupby('artist').agg(weeks=('weeks', 'sum'), songs=('weeks', 'size'))
+    totals = totals.sort_values(['weeks', 'songs'], ascending=False, kind='stable').head(top_n)
+    return totals.reset_index()
@@ -2,13 +2,15 @@ import sys
 import os
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QPushButton, QTextEdit,
-    QVBoxLayout, QHBoxLayout, QDateEdit, QFileDialog, QLineEdit
+    QVBoxLayout, QHBoxLayout, QDateEdit, QFileDialog, QLineEdit, QCheckBox, QComboBox, QSpinBox
 )
 from PyQt5.QtCore import QDate, Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QPixmap
 import subprocess
 import datetime
 import keshihua  # 使用你原来的 keshihua.py
+import jishi
+import fenbu
 
 class SpiderThread(QThread):
     signal = pyqtSignal(str)
@@ -22,7 +24,7 @@ class SpiderThread(QThread):
     def run(self):
         self.signal.emit("开始爬取数据...")
         try:
-            subprocess.run(['python', 'pachong.py'], check=True)
+            subprocess.run(['python', 'pachong.py', self.start_date, self.end_date], check=True)
             self.signal.emit("爬取完成，开始导入数据库...")
             subprocess.run(['python', 'dada.py'], check=True)
             self.signal.emit("数据库导入完成！")
@@ -45,6 +47,9 @@ class MainWindow(QWidget):
         date_layout.addWidget(self.start_date)
         date_layout.addWidget(QLabel("结束日期："))
         date_layout.addWidget(self.end_date)
+        # 勾选后可视化图表也只统计所选日期范围
+        self.filter_charts = QCheckBox("图表按日期范围筛选")
+        date_layout.addWidget(self.filter_charts)
 
         # 控制按钮
         self.start_btn = QPushButton("开始爬取")
@@ -52,6 +57,10 @@ class MainWindow(QWidget):
 
         self.status_box = QTextEdit()
         self.status_box.setReadOnly(True)
+        # 设置环境变量 BILLBOARD_PROFILE=1 时，每次绘图的各阶段耗时显示在状态框中
+        jishi.add_listener(self.status_box.append)
+        if jishi.enabled():
+            self.status_box.append(f"性能剖析已开启，记录写入 {jishi.trace_path()}")
 
         # 可视化按钮区
         vis_buttons = QVBoxLayout()
@@ -60,10 +69,16 @@ class MainWindow(QWidget):
             "上榜最多艺术家": keshihua.plot_top_artists,
             "最长在榜歌曲": keshihua.plot_songs_longevity,
             "排名分布": keshihua.plot_peak_positions_distribution,
+            "生命周期": keshihua.plot_song_lifecycle,
+            "生存曲线": keshihua.plot_cohort_survival,
             "季节性趋势": keshihua.plot_seasonal_trends,
+            "榜单变动": keshihua.plot_chart_events,
             "波动性": keshihua.plot_rank_volatility,
+            "势头最强": keshihua.plot_hottest_movers,
+            "连续在榜纪录": keshihua.plot_streak_records,
             "歌手影响力": keshihua.plot_song_artist_heatmap,
             "歌曲关键词": keshihua.plot_song_name_wordcloud,
+            "合作网络": keshihua.plot_collaboration_graph,
         }
 
         for name, func in vis_map.items():
@@ -73,7 +88,7 @@ class MainWindow(QWidget):
  
         # 精确查询
         self.search_input = QLineEdit()
-        self.search_input.setPlaceholderText("输入歌手或歌名")
+        self.search_input.setPlaceholderText("输入歌手或歌名（多个用逗号分隔，生成对比图）")
         self.search_btn = QPushButton("生成趋势图")
         self.search_btn.clicked.connect(self.run_search)
 
@@ -81,6 +96,41 @@ class MainWindow(QWidget):
         search_layout.addWidget(self.search_input)
         search_layout.addWidget(self.search_btn)
 
+        # 年代 → 年份 → 艺术家钻取
+        self.decade_box = QComboBox()
+        self.decade_box.addItem("全部年代", None)
+        for decade in range(1950, QDate.currentDate().year() + 1, 10):
+            self.decade_box.addItem(f"{decade}年代", decade)
+        self.decade_box.currentIndexChanged.connect(self.update_year_box)
+        self.year_box = QComboBox()
+        self.update_year_box()
+        self.drill_artist_input = QLineEdit()
+        self.drill_artist_input.setPlaceholderText("艺术家（可选）")
+        self.drill_btn = QPushButton("钻取分析")
+        self.drill_btn.clicked.connect(self.run_drilldown)
+
+        drill_layout = QHBoxLayout()
+        drill_layout.addWidget(self.decade_box)
+        drill_layout.addWidget(self.year_box)
+        drill_layout.addWidget(self.drill_artist_input)
+        drill_layout.addWidget(self.drill_btn)
+
+        # 任意指标的分布
+        self.metric_box = QComboBox()
+        for metric, definition in fenbu.METRICS.items():
+            self.metric_box.addItem(definition['label'], metric)
+        self.bins_box = QSpinBox()
+        self.bins_box.setRange(1, 100)
+        self.bins_box.setValue(10)
+        self.bins_box.setPrefix("箱数 ")
+        self.dist_btn = QPushButton("分布图")
+        self.dist_btn.clicked.connect(self.run_distribution)
+
+        dist_layout = QHBoxLayout()
+        dist_layout.addWidget(self.metric_box)
+        dist_layout.addWidget(self.bins_box)
+        dist_layout.addWidget(self.dist_btn)
+
         # 图像展示区
         self.image_label = QLabel("图表将在此显示")
         self.image_label.setAlignment(Qt.AlignCenter)
@@ -94,6 +144,8 @@ class MainWindow(QWidget):
         main_layout.addWidget(self.status_box)
         main_layout.addLayout(vis_buttons)
         main_layout.addLayout(search_layout)
+        main_layout.addLayout(drill_layout)
+        main_layout.addLayout(dist_layout)
         main_layout.addWidget(self.image_label)
         self.setLayout(main_layout)
 
@@ -106,9 +158,18 @@ class MainWindow(QWidget):
         self.thread.signal.connect(self.status_box.append)
         self.thread.start()
 
+    def chart_date_range(self):
+        """返回图表使用的日期范围，未勾选筛选时返回全部历史"""
+        if not self.filter_charts.isChecked():
+            return {}
+        return {
+            'start_date': self.start_date.date().toString("yyyy-MM-dd"),
+            'end_date': self.end_date.date().toString("yyyy-MM-dd"),
+        }
+
     def run_vis(self, func, name):
         self.status_box.append(f"生成{name}图...")
-        func()
+        func(**self.chart_date_range())
         img_path = os.path.join('charts', f'{func.__name__[5:]}.png')
         if os.path.exists(img_path):
             self.show_image(img_path)
@@ -122,7 +183,15 @@ class MainWindow(QWidget):
             self.status_box.append("请输入查询内容")
             return
         self.status_box.append(f"正在查询: {name}")
-        keshihua.plot_search_trend(name)
+        if ',' in name or '，' in name:
+            # 多个名称：一次查询，生成一张共享坐标轴的对比图
+            if keshihua.plot_trend_comparison(name, **self.chart_date_range()) is not None:
+                self.show_image(os.path.join('charts', 'trend_comparison.png'))
+                self.status_box.append("对比图生成成功")
+            else:
+                self.status_box.append("未找到相关结果")
+            return
+        keshihua.plot_search_trend(name, **self.chart_date_range())
         img_path = os.path.join('charts', f'{name}_search_trend.png'.replace(' ', '_'))
         if os.path.exists(img_path):
             self.show_image(img_path)
@@ -130,6 +199,40 @@ class MainWindow(QWidget):
         else:
             self.status_box.append("未找到相关结果")
 
+    def update_year_box(self):
+        """根据所选年代刷新年份下拉框"""
+        decade = self.decade_box.currentData()
+        self.year_box.clear()
+        self.year_box.addItem("全部年份", None)
+        if decade is not None:
+            for year in range(decade, decade + 10):
+                self.year_box.addItem(str(year), year)
+
+    def run_drilldown(self):
+        decade = self.decade_box.currentData()
+        year = self.year_box.currentData()
+        artist_name = self.drill_artist_input.text().strip() or None
+        self.status_box.append(f"钻取分析: {self.decade_box.currentText()} / {self.year_box.currentText()}"
+                               + (f" / {artist_name}" if artist_name else ""))
+        keshihua.plot_artist_drilldown(decade=decade, year=year, artist_name=artist_name)
+        img_path = os.path.join('charts', 'artist_drilldown.png')
+        if os.path.exists(img_path):
+            self.show_image(img_path)
+            self.status_box.append("钻取图表生成成功")
+        else:
+            self.status_box.append("钻取图表生成失败")
+
+    def run_distribution(self):
+        metric = self.metric_box.currentData()
+        self.status_box.append(f"生成{self.metric_box.currentText()}分布图...")
+        keshihua.plot_distribution(metric, self.bins_box.value(), **self.chart_date_range())
+        img_path = os.path.join('charts', f'distribution_{metric}.png')
+        if os.path.exists(img_path):
+            self.show_image(img_path)
+            self.status_box.append("分布图生成成功")
+        else:
+            self.status_box.append("分布图生成失败")
+
     def show_image(self, path):
         pixmap = QPixmap(path)
         self.image_label.setPixmap(pixmap.scaled(
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+模拟榜单数据生成模块
+
+生成与 pachong.py 爬取结果同样结构的榜单历史（rank, name, singer, last_week, peak_pos,
+weeks_on_chart, chart_date, year, week），用于在更大的数据量上做性能测试。
+规模 1 对应约 10 年（522 周，与 dataall.csv 相当），规模 10 / 100 按周数等比放大，
+从 shuju.EPOCH 开始逐周生成，超出真实历史的部分顺延到未来的日期。
+
+模型：
+    每首歌有热度、到达峰值所需周数、衰减速度和寿命，每周按热度（加随机扰动）排出前 100 名；
+    仍在寿命内但排到 100 名以外的歌曲暂时跌出榜单，之后可能重新上榜；
+    少量节日歌曲每年 12 月重新上榜；
+    歌手按热门程度（长尾分布）选取，约 30% 的歌曲带有合作/客串歌手（Featuring、&、逗号）。
+"""
+import sys
+import numpy as np
+import pandas as pd
+import shuju
+
+# 规模 1 的周数（约 10 年）
+WEEKS_PER_SCALE = 522
+
+# 每期榜单的歌曲数
+CHART_SIZE = 100
+
+# 歌名用词
+TITLE_WORDS = [
+    'Love', 'Night', 'Heart', 'Baby', 'Girl', 'Boy', 'Time', 'Life', 'Dance', 'Fire', 'Rain', 'Summer',
+    'Money', 'Dream', 'Light', 'Wild', 'Blue', 'Gold', 'Sweet', 'Crazy', 'Forever', 'Tonight', 'Home',
+    'Road', 'City', 'Lonely', 'Young', 'Free', 'Broken', 'Good', 'Bad', 'Back', 'Again', 'Alone', 'Stars',
+    'Moon', 'Sun', 'Ocean', 'River', 'Angel', 'Devil', 'Kiss', 'Touch', 'Fever', 'Magic', 'Electric',
+    'Diamond', 'Paradise', 'Highway', 'Midnight', 'Sunset', 'Memories', 'Ghost', 'Thunder', 'Heaven',
+    'Party', 'Body', 'Closer', 'Faded', 'Falling', 'Running', 'Shining', 'Waiting', 'Calling', 'Dancing',
+    'Feel', 'Need', 'Want', 'Stay', 'Go', 'Hold', 'Tell', 'Call', 'Run', 'Shake', 'Move', 'Ride',
+    'Better', 'Higher', 'Slow', 'Fast', 'Hot', 'Cold', 'Red', 'Black', 'White', 'Golden', 'Silver',
+    'Starboy', 'Lover', 'Stranger', 'Friends', 'Enemy', 'Queen', 'King', 'Hero', 'Rebel', 'Legend',
+    'Yesterday', 'Tomorrow', 'Today', 'Morning', 'Weekend', 'Radio', 'Mirror',
+]
+
+# 节日歌曲歌名
+HOLIDAY_WORDS = ['Christmas', 'Holiday', 'Snow', 'Winter', 'Santa', 'Bells', 'Sleigh', 'Mistletoe']
+
+# 歌手名用词
+FIRST_NAMES = [
+    'Taylor', 'Ariana', 'Drake', 'Billie', 'Justin', 'Olivia', 'Harry', 'Dua', 'Post', 'Morgan', 'Luke',
+    'Kendrick', 'Doja', 'Bad', 'Travis', 'Megan', 'Lil', 'Young', 'Big', 'Chris', 'Jason', 'Kane', 'Zach',
+    'Sabrina', 'Noah', 'Miley', 'Bruno', 'Ed', 'Katy', 'Lady', 'Nicki', 'Cardi', 'Jack', 'Luke', 'Sam',
+    'Frank', 'Kelly', 'Mariah', 'Whitney', 'Elton', 'Stevie', 'Diana', 'Marvin', 'Aretha', 'Ray', 'Elvis',
+]
+LAST_NAMES = [
+    'Swift', 'Grande', 'Eilish', 'Bieber', 'Rodrigo', 'Styles', 'Lipa', 'Malone', 'Wallen', 'Combs',
+    'Lamar', 'Cat', 'Bunny', 'Scott', 'Stallion', 'Baby', 'Durk', 'Thug', 'Sean', 'Brown', 'Aldean',
+    'Brown', 'Bryan', 'Carpenter', 'Kahan', 'Cyrus', 'Mars', 'Sheeran', 'Perry', 'Gaga', 'Minaj', 'B',
+    'Harlow', 'Combs', 'Smith', 'Ocean', 'Clarkson', 'Carey', 'Houston', 'John', 'Wonder', 'Ross', 'Gaye',
+    'Franklin', 'Charles', 'Presley', 'Jones', 'Lee', 'Davis', 'Moore', 'King',
+]
+BAND_WORDS = ['The', 'Royal', 'Neon', 'Midnight', 'Electric', 'Golden', 'Silver', 'Velvet', 'Crystal', 'Wild']
+BAND_NOUNS = ['Kings', 'Rebels', 'Lights', 'Hearts', 'Wolves', 'Dreamers', 'Strangers', 'Machines', 'Tides']
+
+
+class _NameFactory:
+    """生成不重复的歌名和歌手名"""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.artists = []
+        self.artist_names = set()
+        self.songs = set()
+
+    def new_artist(self):
+        rng = self.rng
+        while True:
+            if rng.random() < 0.2:
+                name = f"{rng.choice(BAND_WORDS)} {rng.choice(BAND_NOUNS)}"
+            else:
+                name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            if name in self.artist_names:
+                # 重名时附加编号，模拟艺名中的数字
+                name = f"{name} {len(self.artists)}"
+            if name not in self.artist_names:
+                self.artist_names.add(name)
+                self.artists.append(name)
+                return len(self.artists) - 1
+
+    def new_title(self, singer, holiday=False):
+        rng = self.rng
+        words = HOLIDAY_WORDS if holiday else TITLE_WORDS
+        for _ in range(10):
+            title = ' '.join(rng.choice(words, size=rng.integers(1, 4), replace=False))
+            if (title, singer) not in self.songs:
+                break
+        else:
+            title = f"{title} Pt. {len(self.songs)}"
+        self.songs.add((title, singer))
+        return title
+
+
+def _credit(names, rng, lead, featured):
+    """按 Billboard 的署名格式组合主唱和客串歌手"""
+    lead_name = names.artists[lead]
+    featured_names = [names.artists[i] for i in featured]
+    if not featured_names:
+        return lead_name
+    style = rng.random()
+    if len(featured_names) == 1:
+        return f"{lead_name} {'Featuring' if style < 0.7 else '&'} {featured_names[0]}"
+    if style < 0.5:
+        return f"{lead_name} Featuring {' & '.join(featured_names)}"
+    return f"{lead_name}, {', '.join(featured_names[:-1])} & {featured_names[-1]}"
+
+
+def generate_chart_history(scale=1, seed=0, weeks=None):
+    """
+    生成模拟的榜单历史，返回与爬虫输出同样列的 DataFrame（数值列为整数，上周未在榜为 '-'）。
+    scale 为相对 dataall.csv 的规模（周数倍数），weeks 指定时直接使用该周数。
+    """
+    rng = np.random.default_rng(seed)
+    n_weeks = int(weeks if weeks is not None else WEEKS_PER_SCALE * scale)
+    names = _NameFactory(rng)
+    for _ in range(200):
+        names.new_artist()
+    artist_weight = list(rng.pareto(1.2, size=len(names.artists)) + 0.05)
+
+    # 当前存活歌曲的状态（按列保存的数组）
+    state = {
+        'song': np.zeros(0, dtype=np.int64),
+        'strength': np.zeros(0),
+        'age': np.zeros(0, dtype=np.int64),
+        'peak_age': np.zeros(0, dtype=np.int64),
+        'decay': np.zeros(0),
+        'lifetime': np.zeros(0, dtype=np.int64),
+    }
+    titles, singers = [], []
+    last_rank = {}  # song -> 上周排名
+    peak_pos = {}
+    weeks_on = {}
+    holiday_songs = []
+
+    def add_songs(count, holiday=False):
+        if count <= 0:
+            return
+        # 主唱：约 35% 是新歌手，其余按热门程度（含近期歌手优先）选取
+        window = max(0, len(names.artists) - 4000)
+        weights = np.asarray(artist_weight[window:])
+        picks = rng.choice(len(weights), size=count, p=weights / weights.sum()) + window
+        song_ids = []
+        for lead in picks:
+            if rng.random() < 0.35:
+                lead = names.new_artist()
+                artist_weight.append(rng.pareto(1.2) + 0.05)
+            featured = []
+            if rng.random() < 0.3:
+                n_featured = 1 if rng.random() < 0.8 else 2
+                featured = [int(a) for a in rng.choice(len(names.artists), size=n_featured) if a != lead]
+            singer = _credit(names, rng, int(lead), featured)
+            titles.append(names.new_title(singer, holiday))
+            singers.append(singer)
+            song_ids.append(len(titles) - 1)
+        strength = rng.lognormal(0, 0.8, size=count)
+        if holiday:
+            holiday_songs.extend(song_ids)
+            strength *= 2.5
+        state['song'] = np.r_[state['song'], song_ids]
+        state['strength'] = np.r_[state['strength'], strength]
+        state['age'] = np.r_[state['age'], np.zeros(count, dtype=np.int64)]
+        # 多数歌曲首次上榜即是峰值，其余数周后才到达
+        peak_age = np.where(rng.random(count) < 0.6, 0, rng.geometric(0.2, size=count))
+        state['peak_age'] = np.r_[state['peak_age'], peak_age]
+        state['decay'] = np.r_[state['decay'], 2 + 5 * strength]
+        lifetime = 4 if holiday else 1 + rng.exponential(8 * strength ** 0.9)
+        state['lifetime'] = np.r_[state['lifetime'], np.full(count, lifetime).astype(np.int64)]
+
+    dates = pd.date_range(shuju.EPOCH, periods=n_weeks, freq='7D')
+    iso_weeks = dates.isocalendar().week.to_numpy()
+    date_strings = dates.strftime('%Y-%m-%d').to_numpy()
+    columns = {key: [] for key in ('rank', 'song', 'last_week', 'peak_pos', 'weeks_on_chart', 'week_pos')}
+
+    for week_pos in range(n_weeks):
+        # 12 月初节日歌曲重新上榜：已有的节日歌曲重新激活，偶尔加入新的节日歌曲
+        if dates[week_pos].month == 12 and dates[week_pos].day <= 7:
+            alive_songs = set(state['song'].tolist())
+            revived = [song for song in holiday_songs if song not in alive_songs and rng.random() < 0.6]
+            if revived:
+                count = len(revived)
+                state['song'] = np.r_[state['song'], revived]
+                state['strength'] = np.r_[state['strength'], rng.lognormal(0.5, 0.5, size=count)]
+                state['age'] = np.r_[state['age'], np.zeros(count, dtype=np.int64)]
+                state['peak_age'] = np.r_[state['peak_age'], np.full(count, 2)]
+                state['decay'] = np.r_[state['decay'], np.full(count, 4.0)]
+                state['lifetime'] = np.r_[state['lifetime'], np.full(count, 4)]
+            add_songs(rng.poisson(0.5), holiday=True)
+
+        # 新歌：每周约 11 首，存活歌曲不足时补足
+        add_songs(rng.poisson(11) + max(0, CHART_SIZE + 40 - len(state['song'])))
+
+        # 热度：到达峰值前逐周上升，之后按衰减速度指数下降
+        age = state['age']
+        rise = np.minimum(1.0, (age + 1) / (state['peak_age'] + 1))
+        fall = np.exp(-np.maximum(0, age - state['peak_age']) / state['decay'])
+        score = state['strength'] * rise * fall * rng.lognormal(0, 0.15, size=len(age))
+        order = np.argsort(-score, kind='stable')[:CHART_SIZE]
+
+        for position, index in enumerate(order, start=1):
+            song = int(state['song'][index])
+            previous = last_rank.get(song)
+            peak_pos[song] = min(peak_pos.get(song, position), position)
+            weeks_on[song] = weeks_on.get(song, 0) + 1
+            columns['rank'].append(position)
+            columns['song'].append(song)
+            columns['last_week'].append(previous if previous is not None else '-')
+            columns['peak_pos'].append(peak_pos[song])
+            columns['weeks_on_chart'].append(weeks_on[song])
+            columns['week_pos'].append(week_pos)
+        last_rank = {int(state['song'][index]): position for position, index in enumerate(order, start=1)}
+
+        # 寿命结束的歌曲移出存活列表
+        state['age'] = age + 1
+        alive = state['age'] <= state['lifetime']
+        for key in state:
+            state[key] = state[key][alive]
+
+    song = np.asarray(columns['song'])
+    week_pos = np.asarray(columns['week_pos'])
+    df = pd.DataFrame({
+        'rank': columns['rank'],
+        'name': np.asarray(titles, dtype=object)[song],
+        'singer': np.asarray(singers, dtype=object)[song],
+        'last_week': columns['last_week'],
+        'peak_pos': columns['peak_pos'],
+        'weeks_on_chart': columns['weeks_on_chart'],
+        'chart_date': date_strings[week_pos],
+        'year': dates.year.to_numpy()[week_pos],
+        'week': iso_weeks[week_pos],
+    })
+    return df
+
+
+def write_csv(df, path):
+    """按 dataall.csv 的格式写出"""
+    df.to_csv(path, index=False, encoding='utf-8')
+    print(f"已生成 {len(df)} 条模拟榜单数据到 {path}")
+
+
+if __name__ == "__main__":
+    # 用法：python moni.py 10 data10x.csv [随机种子]
+    if len(sys.argv) >= 3:
+        write_csv(generate_chart_history(float(sys.argv[1]), int(sys.argv[3]) if len(sys.argv) >= 4 else 0),
+                  sys.argv[2])
+    else:
+        print("用法：python moni.py <规模> <输出 CSV> [随机种子]")
@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""
+本地 Billboard 模拟站点
+
+在本机提供 /charts/<chart_id>/<日期> 页面（chart_id 为 pachong.CHARTS 中注册的榜单），
+页面结构与 pachong.py 解析的 billboard.com 一致，用于离线、可重复地测试爬虫的正确性和吞吐量。页面来源：
+    录制的页面   --record-dir 目录下的 <chart_id>/<日期>.html（Hot 100 也可直接放在 <日期>.html）原样返回
+    合成的页面   由榜单数据（--csv 指定的 CSV、--scale 指定规模的 moni.py 模拟数据，或默认的本地数据）生成，
+                 其他榜单使用同一周的数据，按榜单行数截取或循环补足
+页面带 ETag 和 Last-Modified（页面首次可用的时间），支持 HEAD 和 If-None-Match / If-Modified-Since 条件请求（304）；
+publish_week 可在运行中发布新的一周，用于测试 jiankong.py。
+可注入的异常：
+    --latency / --jitter     每个请求的固定延迟和随机抖动（秒）
+    --rate-429 / --rate-5xx  返回 429（带 Retry-After）或 500/502/503 的概率
+    --variant / --variant-rate  页面结构变体：legacy-artist（歌手标签缺少 a-no-trucate）、
+                             badges（带 NEW / RE-ENTRY 标记）、truncated（缺少最后 10% 的行）、not-found（不是榜单页面）
+
+用法：
+    python monizhan.py --port 8765 --latency 0.05 --rate-429 0.02
+    python pachong.py 2015-01-01 2015-12-31 http://127.0.0.1:8765/charts/ --charts all
+"""
+import os
+import re
+import html
+import time
+import random
+import hashlib
+import argparse
+import threading
+import itertools
+from collections import Counter
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pandas as pd
+import shuju
+import pachong
+
+# 页面路径：/charts/<chart_id>/<日期>
+PATH_PATTERN = re.compile(r'^/charts/([a-z0-9-]+)/(\d{4}-\d{2}-\d{2})/?$')
+
+# 页面结构变体
+VARIANTS = ['default', 'legacy-artist', 'badges', 'truncated', 'not-found']
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="utf-8"><title>{title}</title></head>
+<body>
+<h1 class="c-heading">{title}</h1>
+<p class="c-tagline">Week of {date}</p>
+<div class="chart-results-list">
+{rows}
+</div>
+</body>
+</html>
+"""
+
+ROW_TEMPLATE = """<div class="o-chart-results-list-row-container">
+<ul class="o-chart-results-list-row">
+<li class="o-chart-results-list__item"><span class="c-label a-font-primary-bold-l">{rank}</span>{badge}</li>
+<li class="o-chart-results-list__item">
+<h3 id="title-of-a-story" class="c-title">{name}</h3>
+<span class="{artist_class}">{singer}</span>
+</li>
+<li class="o-chart-results-list__item"><span class="c-label">{last_week}</span></li>
+<li class="o-chart-results-list__item"><span class="c-label">{peak_pos}</span></li>
+<li class="o-chart-results-list__item"><span class="c-label">{weeks_on_chart}</span></li>
+</ul>
+</div>"""
+
+
+def _label(value):
+    """页面上的数字标签，空值显示为 '-'"""
+    return '-' if pd.isna(value) or str(value) in ('', 'N/A', 'nan', '<NA>') else str(value)
+
+
+def chart_rows(rows, size):
+    """将一周的榜单截取或循环补足为 size 行（用于合成其他榜单的页面），排名重新编号"""
+    return [dict(row, rank=rank) for rank, row in zip(range(1, size + 1), itertools.cycle(rows))] if rows else []
+
+
+def render_page(date_str, rows, variant='default', title='Billboard Hot 100™'):
+    """将一周的榜单（字典列表）渲染为 Billboard 结构的页面"""
+    if variant == 'not-found':
+        return PAGE_TEMPLATE.format(title='Page Not Found', date=date_str, rows='')
+    if variant == 'truncated':
+        rows = rows[:len(rows) * 9 // 10]
+    rendered = []
+    for row in rows:
+        badge = ''
+        if variant == 'badges' and _label(row['last_week']) == '-':
+            badge = '<span class="c-label">RE-ENTRY</span>' if _label(row['weeks_on_chart']) not in ('-', '1') \
+                else '<span class="c-label">NEW</span>'
+        rendered.append(ROW_TEMPLATE.format(
+            rank=int(row['rank']),
+            badge=badge,
+            name=html.escape(str(row['name'])),
+            singer=html.escape(str(row['singer'])),
+            artist_class='c-label' if variant == 'legacy-artist' else 'c-label a-no-trucate',
+            last_week=_label(row['last_week']),
+            peak_pos=_label(row['peak_pos']),
+            weeks_on_chart=_label(row['weeks_on_chart']),
+        ))
+    return PAGE_TEMPLATE.format(title=html.escape(title), date=date_str, rows='\n'.join(rendered))
+
+
+def load_weeks(csv_path=None, scale=None, seed=0):
+    """
+    读取合成页面所用的榜单数据，返回 {日期字符串: 按排名排序的字典列表}。
+    csv_path 优先；其次为 scale 规模的模拟数据；都未指定时读取本地归档（或 dataall.csv）。
+    """
+    if csv_path is not None:
+        df = pd.read_csv(csv_path, dtype=str)
+    elif scale is not None:
+        import moni
+        df = moni.generate_chart_history(scale, seed)
+    else:
+        df = shuju.load_chart_data(['rank', 'name', 'singer', 'last_week', 'peak_pos', 'weeks_on_chart', 'chart_date'])
+    df = df.assign(chart_date=pd.to_datetime(df['chart_date']).dt.strftime('%Y-%m-%d'),
+                   rank=pd.to_numeric(df['rank'], errors='coerce'))
+    df = df.dropna(subset=['rank']).sort_values(['chart_date', 'rank'], kind='stable')
+    columns = ['rank', 'name', 'singer', 'last_week', 'peak_pos', 'weeks_on_chart']
+    return {date: group[columns].to_dict('records') for date, group in df.groupby('chart_date', sort=True)}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """处理 /charts/<chart_id>/<日期> 请求，按配置注入延迟、错误和页面变体"""
+    protocol_version = 'HTTP/1.1'  # 支持长连接，爬虫的 Session 可复用连接
+
+    def do_GET(self):
+        self._handle(head=False)
+
+    def do_HEAD(self):
+        self._handle(head=True)
+
+    def _handle(self, head):
+        server = self.server
+        options = server.options
+        with server.lock:
+            delay = options['latency'] + server.random.uniform(0, options['jitter'])
+            roll = server.random.random()
+            variant = options['variant']
+            if variant == 'default' and server.random.random() < options['variant_rate']:
+                variant = server.random.choice(VARIANTS[1:])
+            error_code = None
+            if roll < options['rate_429']:
+                error_code = 429
+            elif roll < options['rate_429'] + options['rate_5xx']:
+                error_code = server.random.choice([500, 502, 503])
+        if delay > 0:
+            time.sleep(delay)
+
+        match = PATH_PATTERN.match(self.path.split('?')[0])
+        if error_code is not None:
+            self._send(error_code, f'Injected {error_code}', {'Retry-After': str(options['retry_after'])}, head=head)
+        elif match is None:
+            self._send(404, 'Not Found', head=head)
+        else:
+            page = server.get_page(match.group(2), variant, match.group(1))
+            if page is None:
+                self._send(404, 'Not Found', head=head)
+                return
+            etag = '"' + hashlib.sha1(page.encode('utf-8')).hexdigest()[:16] + '"'
+            modified = server.published_at(match.group(1), match.group(2))
+            headers = {'ETag': etag, 'Last-Modified': formatdate(modified, usegmt=True)}
+            if self._not_modified(etag, modified):
+                self._send(304, '', headers, head=True)
+            else:
+                self._send(200, page, headers, variant=variant, head=head)
+
+    def _not_modified(self, etag, modified):
+        """条件请求是否命中：If-None-Match 优先，其次比较 If-Modified-Since"""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            return etag in [tag.strip() for tag in if_none_match.split(',')]
+        since = self.headers.get('If-Modified-Since')
+        if since is None:
+            return False
+        try:
+            return int(modified) <= parsedate_to_datetime(since).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    def _send(self, status, body, headers=None, variant=None, head=False):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        if status != 304:
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if not head:
+            self.wfile.write(data)
+        with self.server.lock:
+            self.server.stats[status] += 1
+            if self.command == 'HEAD':
+                self.server.stats['HEAD'] += 1
+            if variant is not None:
+                self.server.stats[variant] += 1
+
+    def log_message(self, format, *args):
+        if self.server.options['verbose']:
+            super().log_message(format, *args)
+
+
+class StandInServer(ThreadingHTTPServer):
+    """模拟站点服务器：保存页面来源、注入配置和请求统计"""
+    daemon_threads = True
+
+    def __init__(self, address, weeks=None, record_dir=None, seed=0, **options):
+        super().__init__(address, StandInHandler)
+        self.weeks = weeks or {}
+        self.record_dir = record_dir
+        self.options = {
+            'latency': 0.0, 'jitter': 0.0, 'rate_429': 0.0, 'rate_5xx': 0.0,
+            'variant': 'default', 'variant_rate': 0.0, 'retry_after': 1, 'verbose': False,
+        }
+        self.options.update(options)
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = Counter()
+        self._pages = {}
+        self._published = {}
+        self.started = time.time()
+
+    def publish_week(self, date_str, rows):
+        """在运行中发布新的一周（rows 为按排名排序的字典列表），之前缓存的该周页面作废"""
+        with self.lock:
+            self.weeks[date_str] = rows
+            self._published[date_str] = time.time()
+            self._pages = {key: page for key, page in self._pages.items() if key[1] != date_str}
+
+    def published_at(self, chart_id, date_str):
+        """页面首次可用的时间（Last-Modified），启动时已有的周为启动时间"""
+        return self._published.get(date_str, self.started)
+
+    def get_page(self, date_str, variant='default', chart_id='hot-100'):
+        """返回某个榜单某一周的页面：优先使用录制的页面，否则由榜单数据合成（结果缓存）"""
+        if chart_id not in pachong.CHARTS:
+            return None
+        if self.record_dir is not None:
+            paths = [os.path.join(self.record_dir, chart_id, f'{date_str}.html')]
+            if chart_id == 'hot-100':
+                paths.append(os.path.join(self.record_dir, f'{date_str}.html'))
+            for path in paths:
+                if os.path.exists(path):
+                    with open(path, encoding='utf-8') as f:
+                        return f.read()
+        if date_str not in self.weeks:
+            return None
+        key = (chart_id, date_str, variant)
+        if key not in self._pages:
+            spec = pachong.CHARTS[chart_id]
+            rows = self.weeks[date_str] if chart_id == 'hot-100' else chart_rows(self.weeks[date_str], spec['size'])
+            title = 'Billboard Hot 100™' if chart_id == 'hot-100' else spec['title']
+            self._pages[key] = render_page(date_str, rows, variant, title)
+        return self._pages[key]
+
+    @property
+    def root_url(self):
+        """爬虫使用的根 URL（对应 pachong.URL_ROOT）"""
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/charts/'
+
+    @property
+    def base_url(self):
+        """Hot 100 的基础 URL（对应 pachong.URL_BASE）"""
+        return self.root_url + 'hot-100/'
+
+
+def start_in_background(weeks=None, host='127.0.0.1', port=0, **options):
+    """在后台线程中启动模拟站点（port 为 0 时自动选择端口），返回服务器对象"""
+    server = StandInServer((host, port), weeks, **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地 Billboard 榜单模拟站点')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--csv', help='合成页面所用的榜单 CSV（与 dataall.csv 同样的列）')
+    parser.add_argument('--scale', type=float, help='使用 moni.py 生成该规模的模拟数据')
+    parser.add_argument('--record-dir', help='录制页面目录（<chart_id>/<日期>.html）')
+    parser.add_argument('--latency', type=float, default=0.0, help='每个请求的固定延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='随机附加延迟的上限（秒）')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='返回 429 的概率')
+    parser.add_argument('--rate-5xx', type=float, default=0.0, help='返回 5xx 的概率')
+    parser.add_argument('--retry-after', type=int, default=1, help='429 响应的 Retry-After（秒）')
+    parser.add_argument('--variant', choices=VARIANTS, default='default', help='固定使用的页面变体')
+    parser.add_argument('--variant-rate', type=float, default=0.0, help='随机使用非默认变体的概率')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--verbose', action='store_true', help='打印每个请求')
+    args = parser.parse_args()
+
+    weeks = {} if args.record_dir and not (args.csv or args.scale) else load_weeks(args.csv, args.scale, args.seed)
+    server = StandInServer((args.host, args.port), weeks, record_dir=args.record_dir, seed=args.seed,
+                           latency=args.latency, jitter=args.jitter, rate_429=args.rate_429, rate_5xx=args.rate_5xx,
+                           retry_after=args.retry_after, variant=args.variant, variant_rate=args.variant_rate,
+                           verbose=args.verbose)
+    if weeks:
+        print(f"合成页面：{len(weeks)} 周（{min(weeks)} 至 {max(weeks)}）")
+    print(f"模拟站点已启动: {server.root_url}<chart_id>/<日期>（可用榜单: {', '.join(pachong.CHARTS)}）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("模拟站点已停止")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,22 @@
 import requests  # 导入requests库，用于发送HTTP请求
 from bs4 import BeautifulSoup  # 导入BeautifulSoup库，用于解析HTML
-import csv  # 导入csv库，用于处理CSV文件
 import certifi  # 导入certifi库，用于SSL证书验证
 import time  # 导入time库，用于添加延时
-import os  # 导入os库，用于文件和目录操作
 import datetime  # 导入datetime库，用于日期处理
+import threading  # 导入threading库，用于多线程共享的限速器
+from concurrent.futures import ThreadPoolExecutor  # 导入线程池，用于并发抓取
 from datetime import timedelta  # 导入timedelta，用于日期计算
 from requests.adapters import HTTPAdapter  # 导入HTTPAdapter，用于配置HTTP请求的重试机制
 from urllib3.util.retry import Retry  # 导入Retry，用于定义重试策略
 import pandas as pd  # 导入pandas库，用于数据分析
+import argparse  # 导入argparse库，用于解析命令行参数
+import cunchu  # 导入列式存储模块，用于按榜单、年份分区追加数据
 
 # 配置参数
-URL_BASE = 'https://www.billboard.com/charts/hot-100/'  # Billboard Hot 100榜单的基础URL
+URL_ROOT = 'https://www.billboard.com/charts/'  # 所有榜单页面的根URL（可替换为本地模拟站点，见 monizhan.py）
+URL_BASE = URL_ROOT + 'hot-100/'  # Billboard Hot 100榜单的基础URL
+ROW_SELECTOR = 'ul.o-chart-results-list-row'  # 每个排名对应一个o-chart-results-list-row元素
+REQUEST_INTERVAL = 2  # 两次请求之间的最小间隔（秒），避免被封
 HEADERS = {  # 请求头信息，模拟浏览器访问
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
     'Accept-Language': 'en-US,en;q=0.9',
@@ -25,48 +30,59 @@ RETRY_STRATEGY = Retry(  # 定义HTTP请求的重试策略
     status_forcelist=[429, 500, 502, 503, 504],
     allowed_methods=["GET"]
 )
-CSV_OUTPUT_DIR = r'C:\Users\Administrator\Desktop\tet'  # CSV输出目录路径
-CSV_ALL_DATA_PATH = os.path.join(CSV_OUTPUT_DIR, 'dataall.csv')  # 所有数据的CSV文件路径
 
 
-def get_ssl_session():
-    """创建带重试机制的Session"""
+def get_ssl_session(pool_maxsize=requests.adapters.DEFAULT_POOLSIZE):
+    """创建带重试机制的Session（pool_maxsize 为每个主机保留的连接数，多个线程共用一个会话时应与线程数相同）"""
     session = requests.Session()  # 创建一个会话对象
-    adapter = HTTPAdapter(max_retries=RETRY_STRATEGY)  # 创建一个HTTP适配器，配置重试策略
+    adapter = HTTPAdapter(max_retries=RETRY_STRATEGY, pool_maxsize=max(1, pool_maxsize))  # 创建一个HTTP适配器，配置重试策略和连接池大小
     session.mount("https://", adapter)  # 将适配器应用于HTTPS请求
     session.mount("http://", adapter)  # 将适配器应用于HTTP请求
     return session  # 返回配置好的会话对象
 
 
-def extract_song_info(soup, rank, chart_date, year_week):
+class RateLimiter:
+    """限速器：多个线程共享，任意两次请求的开始时间至少间隔 min_interval 秒"""
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval  # 最小间隔（秒）
+        self.lock = threading.Lock()  # 保护下一次可发送时间
+        self.next_time = 0.0  # 下一次请求最早可以开始的时间
+
+    def wait(self):
+        """等待直到允许发送下一次请求"""
+        with self.lock:
+            now = time.monotonic()
+            wait_time = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.min_interval
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+
+def _placeholder(rank, name, singer, chart_date, year_week):
+    """解析失败时的占位数据"""
+    return {
+        'rank': rank,  # 排名
+        'name': name,  # 歌曲名称
+        'singer': singer,  # 歌手
+        'last_week': 'N/A',  # 上周排名
+        'peak_pos': 'N/A',  # 最高排名
+        'weeks_on_chart': '0',  # 在榜周数
+        'chart_date': chart_date,  # 榜单日期
+        'year': year_week[0],  # 年份
+        'week': year_week[1]  # 周数
+    }
+
+
+def parse_chart_row(row, rank, chart_date, year_week):
     """
-    直接从页面HTML提取特定排名的歌曲信息
-    专门处理Billboard的复杂HTML结构
+    从一行榜单（o-chart-results-list-row 元素）提取歌曲信息
+    专门处理Billboard的复杂HTML结构，Hot 100、Billboard 200 和各类型榜单的行结构相同
     """
     try:
         # 获取年份和周数信息
         year, week_num = year_week  # 解包年份和周数
 
-        # 查找所有歌曲行 - 每个排名对应一个o-chart-results-list-row元素
-        all_song_rows = soup.select('ul.o-chart-results-list-row')  # 使用CSS选择器获取所有歌曲行
-
-        # 如果找不到足够的行，返回占位数据
-        if len(all_song_rows) < rank:  # 检查是否有足够的行
-            return {  # 返回占位数据
-                'rank': rank,  # 排名
-                'name': f"Missing_Song_{rank}",  # 歌曲名称
-                'singer': "Data not available",  # 歌手
-                'last_week': 'N/A',  # 上周排名
-                'peak_pos': 'N/A',  # 最高排名
-                'weeks_on_chart': '0',  # 在榜周数
-                'chart_date': chart_date,  # 榜单日期
-                'year': year,  # 年份
-                'week': week_num  # 周数
-            }
-
-        # 获取对应排名的行 (0-indexed所以要减1)
-        row = all_song_rows[rank - 1]  # 获取特定排名的行
-
         # 找到显示的排名数字 (第一个带数字的标签，通常是黑色背景)
         rank_span = None  # 初始化排名元素变量
         for span in row.select('.o-chart-results-list__item .c-label'):  # 遍历所有可能的标签
@@ -135,17 +151,60 @@ def extract_song_info(soup, rank, chart_date, year_week):
         }
     except Exception as e:  # 捕获所有异常
         # 出错时返回占位数据
-        return {  # 返回错误占位数据
-            'rank': rank,  # 排名
-            'name': f"Error_Song_{rank}",  # 错误歌曲名称
-            'singer': f"Error: {str(e)[:50]}",  # 错误歌手
-            'last_week': 'N/A',  # 上周排名
-            'peak_pos': 'N/A',  # 最高排名
-            'weeks_on_chart': '0',  # 在榜周数
-            'chart_date': chart_date,  # 榜单日期
-            'year': year,  # 年份
-            'week': week_num  # 周数
-        }
+        return _placeholder(rank, f"Error_Song_{rank}", f"Error: {str(e)[:50]}", chart_date, year_week)
+
+
+def extract_song_info(soup, rank, chart_date, year_week):
+    """从整个页面提取特定排名的歌曲信息（兼容旧接口；抓取整页时请使用 parse_chart_row 逐行解析）"""
+    all_song_rows = soup.select(ROW_SELECTOR)  # 使用CSS选择器获取所有歌曲行
+    if len(all_song_rows) < rank:  # 如果找不到足够的行，返回占位数据
+        return _placeholder(rank, f"Missing_Song_{rank}", "Data not available", chart_date, year_week)
+    return parse_chart_row(all_song_rows[rank - 1], rank, chart_date, year_week)  # 0-indexed所以要减1
+
+
+# 榜单注册表：chart_id -> 榜单定义（见 register_chart）
+CHARTS = {}
+
+
+def register_chart(chart_id, title, size, marker=None, path=None, parser=parse_chart_row):
+    """
+    注册一个榜单。
+    title   榜单名称（用于输出）
+    size    榜单行数
+    marker  校验页面时需出现的文字（默认为 title）
+    path    相对 URL_ROOT 的页面路径模式，{date} 为日期（默认为 '<chart_id>/{date}'）
+    parser  行解析函数 parser(row, rank, chart_date, year_week) -> 字典
+    """
+    CHARTS[chart_id] = {
+        'chart_id': chart_id,
+        'title': title,
+        'size': size,
+        'marker': marker or title,
+        'path': path or chart_id + '/{date}',
+        'parser': parser,
+    }
+    return CHARTS[chart_id]
+
+
+register_chart('hot-100', 'Billboard Hot 100', 100, marker='Hot 100')
+register_chart('billboard-200', 'Billboard 200', 200)
+register_chart('billboard-global-200', 'Billboard Global 200', 200, marker='Global 200')
+register_chart('country-songs', 'Hot Country Songs', 50, marker='Country')
+register_chart('r-b-hip-hop-songs', 'Hot R&B/Hip-Hop Songs', 50, marker='Hip-Hop')
+register_chart('hot-rock-songs', 'Hot Rock & Alternative Songs', 50, marker='Rock')
+register_chart('latin-songs', 'Hot Latin Songs', 50, marker='Latin')
+
+
+def get_chart(chart_id):
+    """返回已注册的榜单定义，未注册时抛出 ValueError"""
+    if chart_id not in CHARTS:
+        raise ValueError(f"未注册的榜单: {chart_id}（可选: {', '.join(CHARTS)}）")
+    return CHARTS[chart_id]
+
+
+def chart_url(chart_id, date_str, url_root=URL_ROOT):
+    """某个榜单某一周的页面URL"""
+    return url_root + get_chart(chart_id)['path'].format(date=date_str)
 
 
 def get_saturday_dates(start_date_str, end_date_str):
@@ -176,147 +235,194 @@ def get_year_week(date_str):
     return year, week_num  # 返回年份和周数的元组
 
 
-def scrape_chart_for_date(date_str):
-    """抓取特定日期的Billboard Hot 100榜单"""
-    session = get_ssl_session()  # 获取配置好的会话
-    url = URL_BASE + date_str  # 构建完整URL
+def is_failed(song):
+    """记录是否为解析失败的占位数据"""
+    return "Error_" in song['name'] or "Missing_" in song['name']
 
-    print(f"正在获取 {date_str} 的Billboard Hot 100数据...")  # 打印当前正在获取的日期
 
-    try:
-        # 发送HTTP请求获取页面内容
-        response = session.get(
-            url,
-            headers=HEADERS,
-            verify=certifi.where(),  # 使用certifi提供的证书
-            timeout=20  # 设置20秒超时
-        )
-        response.raise_for_status()  # 检查是否有HTTP错误
+def parse_chart_page(spec, text, date_str):
+    """解析一个榜单页面的HTML，返回 spec['size'] 条记录（每条带 chart_id），页面不正确时返回占位记录"""
+    title, size = spec['title'], spec['size']
+    year_week = get_year_week(date_str)  # 获取年份和周数
 
-        # 验证页面内容是否正确
-        if "Hot 100" not in response.text:
-            print(f"警告：{date_str} 可能无法获取到正确的Hot 100页面")
-            year_week = get_year_week(date_str)  # 获取年份和周数
-            # 创建100个占位条目并返回
-            return [
-                {
-                    'rank': rank,
-                    'name': f"PageError_{rank}",
-                    'singer': "Page not available",
-                    'last_week': 'N/A',
-                    'peak_pos': 'N/A',
-                    'weeks_on_chart': '0',
-                    'chart_date': date_str,
-                    'year': year_week[0],
-                    'week': year_week[1]
-                }
-                for rank in range(1, 101)
-            ]
-
-        # 使用BeautifulSoup解析HTML
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        # 计算年份和周数
-        year_week = get_year_week(date_str)
+    # 验证页面内容是否正确
+    if spec['marker'] not in text:
+        print(f"警告：{date_str} 可能无法获取到正确的{title}页面")
+        # 创建占位条目并返回
+        songs = [_placeholder(rank, f"PageError_{rank}", "Page not available", date_str, year_week)
+                 for rank in range(1, size + 1)]
+    else:
+        # 使用BeautifulSoup解析HTML，所有行只选择一次
+        soup = BeautifulSoup(text, 'html.parser')
+        rows = soup.select(ROW_SELECTOR)
 
-        # 直接从HTML提取每首歌曲的信息
+        # 逐行提取每首歌曲的信息
         songs = []
         success_count = 0
         error_count = 0
 
-        for rank in range(1, 101):  # 处理所有100个排名
-            song_data = extract_song_info(soup, rank, date_str, year_week)
+        for rank in range(1, size + 1):
+            if rank <= len(rows):
+                song_data = spec['parser'](rows[rank - 1], rank, date_str, year_week)
+            else:
+                song_data = _placeholder(rank, f"Missing_Song_{rank}", "Data not available", date_str, year_week)
             songs.append(song_data)
 
             # 检查是否成功解析
-            if "Error_" in song_data['name'] or "Missing_" in song_data['name']:
+            if is_failed(song_data):
                 error_count += 1
-                print(f"[{date_str}] #{rank:3d} 解析失败: {song_data['name']} - {song_data['singer']}")
+                print(f"[{spec['chart_id']} {date_str}] #{rank:3d} 解析失败: {song_data['name']} - {song_data['singer']}")
             else:
                 success_count += 1
 
-        print(f"{date_str} 统计: 成功 {success_count} 首, 失败 {error_count} 首")
-        return songs
+        print(f"{title} {date_str} 统计: 成功 {success_count} 首, 失败 {error_count} 首")
+
+    for song in songs:
+        song['chart_id'] = spec['chart_id']
+    return songs
+
+
+def fetch_chart(spec, url, date_str, session=None):
+    """抓取并解析一个榜单页面，返回 spec['size'] 条记录（每条带 chart_id），出错时返回占位记录"""
+    session = session or get_ssl_session()  # 获取配置好的会话
+
+    print(f"正在获取 {date_str} 的{spec['title']}数据...")  # 打印当前正在获取的日期
+
+    try:
+        # 发送HTTP请求获取页面内容
+        response = session.get(
+            url,
+            headers=HEADERS,
+            verify=certifi.where(),  # 使用certifi提供的证书
+            timeout=20  # 设置20秒超时
+        )
+        response.raise_for_status()  # 检查是否有HTTP错误
+        return parse_chart_page(spec, response.text, date_str)
 
     except Exception as e:
-        print(f"抓取 {date_str} 时出错: {str(e)}")
+        print(f"抓取 {spec['title']} {date_str} 时出错: {str(e)}")
+        # 返回错误占位条目
         year_week = get_year_week(date_str)
-        # 返回100个错误占位条目
-        return [
-            {
-                'rank': rank,
-                'name': f"Error_{rank}",
-                'singer': f"Error: {str(e)[:30]}...",
-                'last_week': 'N/A',
-                'peak_pos': 'N/A',
-                'weeks_on_chart': '0',
-                'chart_date': date_str,
-                'year': year_week[0],
-                'week': year_week[1]
-            }
-            for rank in range(1, 101)
-        ]
-
-
-def save_to_csv(data, filepath, fieldnames=None):
-    """将数据保存到CSV文件"""
-    # 确保目录存在
-    os.makedirs(os.path.dirname(filepath), exist_ok=True)
-
-    # 如果未提供列名，从第一个数据项中提取
-    if fieldnames is None and data:
-        fieldnames = data[0].keys()
-
-    # 写入CSV文件
-    with open(filepath, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()  # 写入表头
-        writer.writerows(data)  # 写入所有数据行
-
-    print(f"成功保存 {len(data)} 条数据到 {filepath}")
-
-
-def main():
-    start_date = "2015-01-01"  # 起始日期
-    end_date = "2025-01-01"  # 结束日期
-
-    # 确保输出目录存在
-    os.makedirs(CSV_OUTPUT_DIR, exist_ok=True)
+        return [dict(_placeholder(rank, f"Error_{rank}", f"Error: {str(e)[:30]}...", date_str, year_week),
+                     chart_id=spec['chart_id'])
+                for rank in range(1, spec['size'] + 1)]
 
-    # 获取所有需要爬取的星期六日期
-    saturday_dates = get_saturday_dates(start_date, end_date)
-    print(f"将爬取 {len(saturday_dates)} 个星期六的Billboard Hot 100榜单")
 
-    # 保存所有歌曲的列表
-    all_songs = []
+def scrape_chart(chart_id, date_str, url_root=URL_ROOT, session=None):
+    """抓取已注册榜单中某一周的数据（url_root 可指向本地模拟站点）"""
+    return fetch_chart(get_chart(chart_id), chart_url(chart_id, date_str, url_root), date_str, session)
 
-    # 定义CSV字段名
-    fieldnames = ['rank', 'name', 'singer', 'last_week', 'peak_pos', 'weeks_on_chart', 'chart_date', 'year', 'week']
 
-    # 对每个日期进行爬取
-    for date_str in saturday_dates:
-        songs = scrape_chart_for_date(date_str)  # 爬取当前日期的数据
-        all_songs.extend(songs)  # 将当前日期的数据添加到总列表
+def scrape_chart_for_date(date_str, url_base=URL_BASE, session=None):
+    """抓取特定日期的Billboard Hot 100榜单（url_base 可指向本地模拟站点）"""
+    return fetch_chart(CHARTS['hot-100'], url_base + date_str, date_str, session)
 
-        # 每爬取一个日期后休息一下，避免被封
-        time.sleep(2)
 
-        # 每爬取10个日期（1000首歌曲）保存一次数据块文件
-        if len(all_songs) % 1000 == 0:
-            chunk_num = len(all_songs) // 1000
-            print(f"保存第{chunk_num}千条数据，当前已处理 {len(all_songs) // 100} 个星期六...")
+def scrape_dates(dates, url_base=URL_BASE, workers=1, min_interval=REQUEST_INTERVAL):
+    """
+    抓取多个日期的Hot 100榜单，按日期顺序逐个返回 (日期, 歌曲列表)。
+    workers 为并发线程数，所有线程共享一个限速器（请求间隔不小于 min_interval 秒）和一个会话的连接池。
+    """
+    limiter = RateLimiter(min_interval)
+    session = get_ssl_session(pool_maxsize=workers)
+
+    def fetch(date_str):
+        limiter.wait()
+        return date_str, scrape_chart_for_date(date_str, url_base, session)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(fetch, dates)
+
+
+def scrape_charts(chart_ids, dates, url_root=URL_ROOT, workers=1, min_interval=REQUEST_INTERVAL):
+    """
+    抓取多个榜单、多个日期，按 (日期, 榜单) 顺序逐个返回 (chart_id, 日期, 歌曲列表)。
+    所有榜单共用一个线程池、一个会话（连接池大小与线程数相同，各线程复用同一组长连接）和一个全局限速器，
+    同一天的各个榜单交错请求，整体吞吐量由限速器决定，而不是按榜单数成倍增加请求压力。
+    """
+    for chart_id in chart_ids:
+        get_chart(chart_id)
+    limiter = RateLimiter(min_interval)
+    session = get_ssl_session(pool_maxsize=workers)
+    jobs = [(chart_id, date_str) for date_str in dates for chart_id in chart_ids]
+
+    def fetch(job):
+        chart_id, date_str = job
+        limiter.wait()
+        return chart_id, date_str, scrape_chart(chart_id, date_str, url_root, session)
 
-            chunk_path = os.path.join(CSV_OUTPUT_DIR, f'data{chunk_num}k.csv')
-            save_to_csv(all_songs[-1000:], chunk_path, fieldnames)
-            print(f"数据块{chunk_num}已保存到 {chunk_path}")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(fetch, jobs)
 
-    # 保存所有数据到最终dataall.csv文件
-    if all_songs:
-        save_to_csv(all_songs, CSV_ALL_DATA_PATH, fieldnames)
-        print(f"所有数据已保存到 {CSV_ALL_DATA_PATH}")
+
+def url_root_from(url):
+    """命令行传入的URL转换为根URL：兼容旧用法中以榜单路径结尾的基础URL（如 .../charts/hot-100/）"""
+    url = url if url.endswith('/') else url + '/'
+    for chart_id in CHARTS:
+        if url.endswith('/' + chart_id + '/'):
+            return url[:-len(chart_id) - 1]
+    return url
+
+
+def main(start_date="2015-01-01", end_date="2025-01-01", url_root=URL_ROOT, workers=1,
+         min_interval=REQUEST_INTERVAL, charts=('hot-100',)):
+    """
+    爬取 start_date 到 end_date 之间每个星期六的各个榜单（charts 为注册表中的 chart_id）。
+    含解析失败占位记录的页面整页不写入归档（归档按 (chart_id, chart_date, rank) 以新数据覆盖旧数据，
+    写入占位记录会替换已归档的正确数据），结束时列出这些页面以便重新爬取。
+    """
+
+    # 获取所有需要爬取的星期六日期
+    saturday_dates = get_saturday_dates(start_date, end_date)
+    titles = '、'.join(get_chart(chart_id)['title'] for chart_id in charts)
+    print(f"将爬取 {len(saturday_dates)} 个星期六的 {titles} 榜单")
+
+    # 尚未写入归档的歌曲列表，以及每个榜单累计爬取的数量
+    pending_songs = []
+    counts = dict.fromkeys(charts, 0)
+    failed_pages = []
+
+    # 所有榜单的请求由同一个限速器控制间隔，避免被封
+    for chart_id, date_str, songs in scrape_charts(charts, saturday_dates, url_root, workers, min_interval):
+        if any(is_failed(song) for song in songs):
+            failed_pages.append((chart_id, date_str))
+            continue
+        pending_songs.extend(songs)  # 将当前页面的数据添加到待写入列表
+        counts[chart_id] += len(songs)
+
+        # 每累计1000条记录追加一次归档分区（按 chart_id 分开写入），中断后已爬取的数据不会丢失
+        if len(pending_songs) >= 1000:
+            print(f"当前已处理 {sum(counts.values())} 条记录，写入归档...")
+            cunchu.append_rows(pending_songs)
+            pending_songs = []
+
+    # 写入剩余数据（只重写涉及到的榜单、年份分区，不再整体重写 dataall.csv）
+    if pending_songs:
+        cunchu.append_rows(pending_songs)
+    if sum(counts.values()):
+        for chart_id, count in counts.items():
+            print(f"{get_chart(chart_id)['title']}: {count} 条")
+        print(f"所有数据已追加到归档 {cunchu.ARCHIVE_DIR}")
     else:
         print("未能获取任何数据")
+    if failed_pages:
+        print(f"以下 {len(failed_pages)} 个页面解析失败，未写入归档，请稍后重新爬取：")
+        for chart_id, date_str in failed_pages:
+            print(f"    {chart_id} {date_str}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # 用法：python pachong.py 2020-01-01 2024-12-31
+    # 可选第三个参数指定根URL（也可沿用以 hot-100/ 结尾的旧写法）：
+    #     python pachong.py 2020-01-01 2024-12-31 http://127.0.0.1:8765/charts/ --charts hot-100,billboard-200
+    parser = argparse.ArgumentParser(description='爬取 Billboard 榜单')
+    parser.add_argument('start_date', nargs='?', default='2015-01-01')
+    parser.add_argument('end_date', nargs='?', default='2025-01-01')
+    parser.add_argument('url', nargs='?', default=URL_ROOT, help='榜单页面的根URL')
+    parser.add_argument('--charts', default='hot-100',
+                        help=f"逗号分隔的 chart_id，all 表示全部（可选: {', '.join(CHARTS)}）")
+    parser.add_argument('--workers', type=int, default=1, help='并发线程数（所有榜单共用）')
+    parser.add_argument('--interval', type=float, default=REQUEST_INTERVAL, help='两次请求之间的最小间隔（秒）')
+    args = parser.parse_args()
+    chart_ids = list(CHARTS) if args.charts == 'all' else [c.strip() for c in args.charts.split(',') if c.strip()]
+    main(args.start_date, args.end_date, url_root_from(args.url), max(1, args.workers), args.interval, chart_ids)
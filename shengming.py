@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+歌曲生命周期分析模块
+
+对全部歌曲一次向量化计算（按 song_idx、week_idx 排序后用 reduceat / bincount 分组聚合）：
+    time_to_peak   首次上榜到首次达到最高排名的周数
+    weeks_at_peak  处于最高排名的周数
+    decay_slope    达到最高排名后排名随周数变化的斜率（正数表示逐周下滑）
+    chart_runs     连续在榜段数，max_gap / mean_gap 为两段之间跌出榜单的周数
+以及按首次上榜年份划分的在榜生存曲线（Kaplan-Meier，仍在榜的歌曲按右删失处理）。
+爬取的 peak_pos / weeks_on_chart 汇总为 reported_peak / reported_weeks，
+可用于核对数据第一周之前就已在榜的歌曲。
+结果保存为紧凑类型的 DataFrame，按数据版本缓存。
+"""
+import numpy as np
+import pandas as pd
+import shuju
+
+# 结果缓存：数据版本 -> 生命周期表
+_lifecycle_cache = {}
+
+
+def compute_lifecycles(df):
+    """
+    计算每首歌的生命周期指标。
+    df 需要包含 song_idx、week_idx、rank 列（见 shuju.load_chart_data），
+    可附带 unique_song、peak_pos、weeks_on_chart。
+    """
+    data = df.dropna(subset=['rank']).sort_values(['song_idx', 'week_idx'], kind='stable')
+    song = data['song_idx'].to_numpy()
+    week = data['week_idx'].to_numpy().astype(np.int32)
+    rank = data['rank'].to_numpy(dtype=np.int32)
+    if len(data) == 0:
+        return pd.DataFrame()
+    first_week_all = week.min()
+    last_week_all = week.max()
+
+    # 每首歌在排序后数组中的起止位置
+    starts = np.r_[0, np.flatnonzero(song[1:] != song[:-1]) + 1]
+    counts = np.diff(np.r_[starts, len(song)])
+    n = len(starts)
+    group = np.repeat(np.arange(n), counts)
+
+    debut_week = week[starts]
+    last_week = week[starts + counts - 1]
+    peak_rank = np.minimum.reduceat(rank, starts)
+
+    # 最高排名：处于最高排名的周数，以及第一次达到的周（数组已按周排序，取每组第一个）
+    at_peak = rank == peak_rank[group]
+    weeks_at_peak = np.bincount(group, weights=at_peak, minlength=n)
+    peak_rows = np.flatnonzero(at_peak)
+    _, first_peak = np.unique(group[peak_rows], return_index=True)
+    peak_week = week[peak_rows[first_peak]]
+
+    # 连续在榜段：与上一行不是同一首歌或不是相邻周时开始新的一段
+    new_run = np.r_[True, (song[1:] != song[:-1]) | (week[1:] != week[:-1] + 1)]
+    chart_runs = np.bincount(group, weights=new_run, minlength=n)
+    reentry = new_run.copy()
+    reentry[starts] = False
+    gap = np.zeros(len(week), dtype=np.int32)
+    gap[1:] = week[1:] - week[:-1] - 1
+    gap = np.where(reentry, gap, 0)
+    max_gap = np.zeros(n, dtype=np.int32)
+    np.maximum.at(max_gap, group[reentry], gap[reentry])
+    total_gap = np.bincount(group, weights=gap, minlength=n)
+    mean_gap = np.divide(total_gap, chart_runs - 1, out=np.full(n, np.nan), where=chart_runs > 1)
+
+    # 峰值之后的衰减斜率：对峰值后的 (周数, 排名) 做最小二乘，用分组求和一次算出
+    after = week > peak_week[group]
+    g = group[after]
+    x = (week - peak_week[group])[after].astype(np.float64)
+    y = rank[after].astype(np.float64)
+    cnt = np.bincount(g, minlength=n)
+    sx = np.bincount(g, weights=x, minlength=n)
+    sy = np.bincount(g, weights=y, minlength=n)
+    sxx = np.bincount(g, weights=x * x, minlength=n)
+    sxy = np.bincount(g, weights=x * y, minlength=n)
+    denominator = cnt * sxx - sx * sx
+    decay_slope = np.divide(cnt * sxy - sx * sy, denominator,
+                            out=np.full(n, np.nan), where=denominator > 0)
+
+    lifecycles = pd.DataFrame({
+        'song_idx': song[starts].astype(np.uint32),
+        'debut_week': debut_week.astype(np.uint16),
+        'debut_date': shuju.EPOCH + pd.to_timedelta(debut_week.astype(np.int64) * 7, unit='D'),
+        'peak_rank': peak_rank.astype(np.uint8),
+        'peak_week': peak_week.astype(np.uint16),
+        'time_to_peak': (peak_week - debut_week).astype(np.uint16),
+        'weeks_at_peak': weeks_at_peak.astype(np.uint16),
+        'total_weeks': counts.astype(np.uint16),
+        'chart_runs': chart_runs.astype(np.uint8),
+        'max_gap': max_gap.astype(np.uint16),
+        'mean_gap': mean_gap.astype(np.float32),
+        'decay_slope': decay_slope.astype(np.float32),
+        # 数据第一周就已在榜（首次上榜时间未知）/ 数据最后一周仍在榜（在榜周数尚未结束）
+        'left_censored': debut_week == first_week_all,
+        'active': last_week == last_week_all,
+    })
+    lifecycles['debut_year'] = lifecycles['debut_date'].dt.year.astype(np.int16)
+    if 'unique_song' in data.columns:
+        lifecycles['unique_song'] = data['unique_song'].array[starts]
+    # 榜单页面上报的最高排名和在榜周数（缺失时为 NA）
+    if 'peak_pos' in data.columns:
+        reported_peak = np.minimum.reduceat(data['peak_pos'].fillna(255).to_numpy(dtype=np.int32), starts)
+        lifecycles['reported_peak'] = pd.Series(reported_peak, dtype='UInt8').where(reported_peak < 255)
+    if 'weeks_on_chart' in data.columns:
+        reported_weeks = np.maximum.reduceat(data['weeks_on_chart'].fillna(0).to_numpy(dtype=np.int32), starts)
+        lifecycles['reported_weeks'] = pd.Series(reported_weeks, dtype='UInt16').where(reported_weeks > 0)
+    return lifecycles
+
+
+def cohort_survival(lifecycles, max_weeks=52):
+    """
+    按首次上榜年份计算在榜生存曲线 S(k)：在榜周数超过 k 周的歌曲比例。
+    使用 Kaplan-Meier 估计，仍在榜的歌曲视为右删失；首次上榜时间未知的歌曲不参与。
+    返回以 k（0..max_weeks）为索引、年份为列的 DataFrame。
+    """
+    data = lifecycles[~lifecycles['left_censored']]
+    if data.empty:
+        return pd.DataFrame()
+    years, cohort = np.unique(data['debut_year'].to_numpy(), return_inverse=True)
+    duration = np.minimum(data['total_weeks'].to_numpy().astype(np.int64), max_weeks + 1)
+    ended = ~data['active'].to_numpy()
+    width = max_weeks + 2
+    # 每个年份、每个在榜周数上的结束数和删失数
+    ends = np.bincount(cohort * width + duration, weights=ended, minlength=len(years) * width).reshape(-1, width)
+    totals = np.bincount(cohort * width + duration, minlength=len(years) * width).reshape(-1, width)
+    # at_risk[k]：在榜周数 ≥ k 的歌曲数
+    at_risk = totals[:, ::-1].cumsum(axis=1)[:, ::-1]
+    hazard = np.divide(ends, at_risk, out=np.zeros_like(ends, dtype=np.float64), where=at_risk > 0)
+    survival = np.cumprod(1 - hazard, axis=1)[:, :max_weeks + 1]
+    return pd.DataFrame(survival.T, index=pd.RangeIndex(max_weeks + 1, name='weeks'), columns=years)
+
+
+def get_lifecycles():
+    """返回全部歌曲的生命周期表，按数据版本缓存（版本号和数据取自同一快照）"""
+    snapshot = shuju.pin_snapshot()
+    version = shuju.data_version(snapshot)
+    if version not in _lifecycle_cache:
+        df = shuju.load_chart_data(['song_idx', 'week_idx', 'rank', 'unique_song', 'peak_pos', 'weeks_on_chart'],
+                                   snapshot=snapshot)
+        _lifecycle_cache.clear()
+        _lifecycle_cache[version] = compute_lifecycles(df)
+    return _lifecycle_cache[version]
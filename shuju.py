@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+榜单数据的共享加载模块
+
+返回内存占用紧凑的 DataFrame，供 dada.py 导入和 keshihua.py 的内存分析共用：
+    name / singer / unique_song  -> category
+    rank / last_week / peak_pos  -> UInt8（可空）
+    weeks_on_chart               -> UInt16（可空）
+    chart_date                   -> datetime64，另附 week_idx（距第一期榜单的周数，uint16）
+    song_idx                     -> uint32，歌曲（歌名 + 歌手）的整数编号
+"""
+import os
+import re
+import hashlib
+import numpy as np
+import pandas as pd
+import cunchu
+
+# 数据库连接配置（dada.py 写入、keshihua.py 读取）
+DB_CONFIG = {
+    'host': 'localhost',
+    'port': 3306,
+    'user': 'root',
+    'password': '123456',
+    'database': 'data'
+}
+
+# 第一期 Billboard Hot 100（1958-08-04）所在周的星期六，作为周索引的起点
+EPOCH = pd.Timestamp('1958-08-02')
+
+# 旧版 CSV 文件路径，归档为空时使用
+CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dataall.csv')
+
+# 各列的紧凑类型
+COLUMN_DTYPES = {
+    'rank': 'UInt8',
+    'last_week': 'UInt8',
+    'peak_pos': 'UInt8',
+    'weeks_on_chart': 'UInt16',
+    'year': 'int16',
+    'week': 'uint8',
+}
+
+
+def split_artists(singers_raw):
+    """清洗歌手字段，拆分出参与的每位艺术家"""
+    singers_raw = str(singers_raw)
+    if singers_raw.lower() in ['n/a', '-', 'nan']:
+        return []
+    cleaned = re.sub(r'\b(Featuring|feat\.?|Ft\.?)\b', '&', singers_raw, flags=re.IGNORECASE)
+    artists = [artist.strip() for artist in re.split(r'&|,|/| and ', cleaned)]
+    return [artist for artist in artists if artist != '']
+
+
+def date_to_week_idx(value, round_up=False):
+    """将日期转换为周索引（距 EPOCH 的整周数），round_up 为 True 时向上取整"""
+    days = (pd.Timestamp(value) - EPOCH).days
+    return int(-(-days // 7) if round_up else days // 7)
+
+
+def compact_frame(df):
+    """将原始榜单 DataFrame 转换为紧凑类型，并补充 week_idx、song_idx 和 unique_song 列"""
+    df = df.copy()
+    for column, dtype in COLUMN_DTYPES.items():
+        if column in df.columns:
+            if dtype.startswith('U'):
+                df[column] = pd.to_numeric(df[column], errors='coerce').astype(dtype)
+            else:
+                df[column] = pd.to_numeric(df[column], errors='coerce').fillna(0).astype(dtype)
+    for column in ('name', 'singer'):
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype(str).astype('category')
+    if 'chart_date' in df.columns:
+        df['chart_date'] = pd.to_datetime(df['chart_date'], errors='coerce')
+        df = df.dropna(subset=['chart_date'])
+        df['week_idx'] = ((df['chart_date'] - EPOCH).dt.days // 7).astype('uint16')
+        df = df.sort_values(['week_idx', 'rank'] if 'rank' in df.columns else ['week_idx'], kind='stable')
+        df = df.reset_index(drop=True)
+    if 'name' in df.columns and 'singer' in df.columns:
+        # 同名不同歌手视为不同歌曲，编号按首次出现的顺序分配
+        codes = df.groupby(['name', 'singer'], observed=True, sort=False).ngroup().to_numpy()
+        df['song_idx'] = codes.astype('uint32')
+        keys = df[['name', 'singer']].drop_duplicates()
+        labels = pd.Index(keys['name'].astype(str) + '(' + keys['singer'].astype(str) + ')')
+        if labels.is_unique:
+            df['unique_song'] = pd.Categorical.from_codes(codes, categories=labels)
+        else:
+            df['unique_song'] = pd.Categorical(labels.to_numpy()[codes])
+    return df
+
+
+def pin_snapshot():
+    """取得当前归档快照（见 cunchu.read_snapshot），之后的 data_version / load_chart_data 传入同一快照即读到同一版本"""
+    return cunchu.read_snapshot()
+
+
+def load_chart_data(columns=None, start_date=None, end_date=None, snapshot=None):
+    """
+    加载紧凑类型的榜单数据。
+    优先读取列式归档（只读需要的列和年份分区），归档为空时回退到 CSV_PATH。
+    columns 为 None 时加载全部列；snapshot 为 pin_snapshot 的结果，省略时使用当前快照。
+    """
+    snapshot = snapshot or pin_snapshot()
+    read_columns = None
+    if columns is not None:
+        # 派生列依赖的原始列
+        read_columns = set(columns) - {'week_idx', 'song_idx', 'unique_song'}
+        if 'week_idx' in columns:
+            read_columns.add('chart_date')
+        if 'song_idx' in columns or 'unique_song' in columns:
+            read_columns.update(['name', 'singer'])
+        read_columns = sorted(read_columns)
+
+    if snapshot['partitions']:
+        df = cunchu.read_archive(read_columns, start_date, end_date, snapshot=snapshot)
+    elif os.path.exists(CSV_PATH):
+        print(f"归档为空，改为读取 {CSV_PATH}")
+        df = cunchu.rows_to_frame(pd.read_csv(CSV_PATH, dtype=str))
+        if start_date is not None:
+            df = df[df['chart_date'] >= pd.Timestamp(start_date)]
+        if end_date is not None:
+            df = df[df['chart_date'] <= pd.Timestamp(end_date)]
+        if read_columns is not None:
+            df = df[read_columns]
+    else:
+        print("没有可用的榜单数据")
+        return pd.DataFrame(columns=columns)
+
+    df = compact_frame(df)
+    if columns is not None:
+        df = df[list(columns)]
+    return df
+
+
+def slice_weeks(df, start_date=None, end_date=None):
+    """
+    在按 week_idx 排序的内存数据上截取日期范围。
+    使用二分查找定位起止位置，耗时与窗口大小成正比，而不是与全部历史成正比。
+    """
+    week_idx = df['week_idx'].to_numpy()
+    start = 0
+    stop = len(df)
+    if start_date is not None:
+        start = int(np.searchsorted(week_idx, date_to_week_idx(start_date, round_up=True), side='left'))
+    if end_date is not None:
+        stop = int(np.searchsorted(week_idx, date_to_week_idx(end_date), side='right'))
+    return df.iloc[start:stop]
+
+
+def data_version(snapshot=None):
+    """
+    返回当前数据（或指定快照）的版本号。
+    由快照中的分区文件（或 CSV）的路径、大小和修改时间计算，数据有任何追加或重写时都会变化。
+    """
+    digest = hashlib.sha1()
+    files = cunchu.list_partition_files(snapshot=snapshot or pin_snapshot())
+    if not files and os.path.exists(CSV_PATH):
+        files = [CSV_PATH]
+    for path in files:
+        stat = os.stat(path)
+        digest.update(f'{path}:{stat.st_size}:{stat.st_mtime_ns};'.encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def db_version():
+    """
+    数据库中的数据版本（dada.py 每次写入时在同一事务中更新，见 dada.bump_version），
+    数据库不可用或尚未写入版本时返回 None。
+    """
+    try:
+        import pymysql
+    except ImportError:
+        return None
+    try:
+        conn = pymysql.connect(host=DB_CONFIG['host'], port=DB_CONFIG['port'], user=DB_CONFIG['user'],
+                               password=DB_CONFIG['password'], database=DB_CONFIG['database'], connect_timeout=2)
+    except pymysql.MySQLError:
+        return None
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT version FROM db_version WHERE id = 1")
+            row = cursor.fetchone()
+        return row[0] if row else None
+    except pymysql.MySQLError:
+        return None
+    finally:
+        conn.close()
+
+
+def memory_usage_mb(df):
+    """返回 DataFrame 实际占用的内存（MB）"""
+    return df.memory_usage(deep=True).sum() / 1024 / 1024
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""测试公共设置：模块位于仓库根目录；归档和 CSV 路径指向临时目录，不读写正式数据"""
+import os
+import sys
+
+import matplotlib
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+matplotlib.use('Agg')
+
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    """空的临时归档（CSV 路径也指向不存在的文件，读取时不会回退到 dataall.csv）"""
+    import cunchu
+    import shuju
+    monkeypatch.setattr(cunchu, 'ARCHIVE_DIR', str(tmp_path / 'archive'))
+    monkeypatch.setattr(shuju, 'CSV_PATH', str(tmp_path / 'dataall.csv'))
+    return tmp_path / 'archive'
+
+
+def make_rows(chart_date, size=100, prefix='Song', chart_id=None):
+    """一周的爬虫格式记录：第 i 名为 '{prefix} i' / 'Artist i'"""
+    rows = []
+    for rank in range(1, size + 1):
+        row = {'rank': rank, 'name': f'{prefix} {rank}', 'singer': f'Artist {rank}', 'last_week': 'N/A',
+               'peak_pos': rank, 'weeks_on_chart': 1, 'chart_date': chart_date,
+               'year': int(chart_date[:4]), 'week': 1}
+        if chart_id is not None:
+            row['chart_id'] = chart_id
+        rows.append(row)
+    return rows
+
+
+class FakeCursor:
+    """记录执行的 SQL（空白折叠为单个空格），查询结果由连接的 responder(sql, params) 给出"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        sql = ' '.join(sql.split())
+        self.conn.log.append((sql, params))
+        self.rows = list(self.conn.responder(sql, params) or [])
+
+    def executemany(self, sql, rows):
+        self.conn.log.append((' '.join(sql.split()), list(rows)))
+        self.rows = []
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FakeConnection:
+    """代替 pymysql 连接：所有语句（含 COMMIT / ROLLBACK）按顺序记入 log"""
+
+    def __init__(self, responder=None, database=None, log=None):
+        self.responder = responder or (lambda sql, params: [])
+        self.database = database
+        self.log = [] if log is None else log
+        self.closed = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.log.append(('COMMIT', self.database))
+
+    def rollback(self):
+        self.log.append(('ROLLBACK', self.database))
+
+    def close(self):
+        self.closed = True
+
+    def statements(self, prefix=''):
+        return [sql for sql, _ in self.log if sql.startswith(prefix)]
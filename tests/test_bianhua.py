@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+import bianhua
+import shuju
+
+
+def chart(weeks):
+    """{week_idx: {song_idx: rank}} -> build_events 所需的数据"""
+    rows = [(week, song, rank) for week, ranks in weeks.items() for song, rank in ranks.items()]
+    df = pd.DataFrame(rows, columns=['week_idx', 'song_idx', 'rank'])
+    df['chart_date'] = shuju.EPOCH + pd.to_timedelta(df['week_idx'] * 7, unit='D')
+    return df.sort_values(['week_idx', 'rank'], ignore_index=True)
+
+
+def replay(df):
+    """逐周调用 diff_weeks（与 dada.ingest_week 相同：上一周为正好早 7 天的一周）"""
+    by_week = {week: dict(zip(group['song_idx'], group['rank'])) for week, group in df.groupby('week_idx')}
+    dates = df.groupby('week_idx')['chart_date'].first()
+    seen, parts = set(), []
+    for i, (week, ranks) in enumerate(by_week.items()):
+        parts.append(bianhua.diff_weeks(by_week.get(week - 1, {}), ranks, seen, dates[week], first_week=i == 0))
+        seen |= set(ranks)
+    return pd.concat(parts, ignore_index=True)
+
+
+def normalized(events):
+    frame = pd.DataFrame({
+        'song_id': events['song_id'].astype(int),
+        'chart_date': pd.to_datetime(events['chart_date']),
+        'event_type': events['event_type'].astype(str),
+        'rank': events['rank'].astype('Int64'),
+        'prev_rank': events['prev_rank'].astype('Int64'),
+    })
+    return frame.sort_values(['chart_date', 'song_id', 'event_type'], ignore_index=True)
+
+
+def test_event_types():
+    df = chart({0: {1: 1, 2: 2}, 1: {1: 2, 2: 1, 3: 3}, 2: {2: 1, 3: 2}, 3: {1: 1, 2: 2}})
+    events = normalized(bianhua.build_events(df))
+    got = {(row.chart_date, row.song_id): row.event_type for row in events.itertuples()}
+    week = lambda i: shuju.EPOCH + pd.Timedelta(weeks=i)
+    assert got == {
+        (week(1), 1): 'fall', (week(1), 2): 'climb', (week(1), 3): 'debut',
+        (week(2), 1): 'drop-out', (week(2), 3): 'climb',
+        (week(3), 1): 're-entry', (week(3), 2): 'fall', (week(3), 3): 'drop-out',
+    }
+
+
+def test_first_week_has_no_events():
+    df = chart({0: {1: 1, 2: 2}})
+    assert bianhua.build_events(df).empty
+    assert replay(df).empty
+
+
+@pytest.mark.parametrize('missing', [[], [3], [3, 4], [1, 6]])
+def test_rebuild_matches_weekly_ingest(missing):
+    rng = np.random.default_rng(len(missing))
+    weeks = {}
+    for week in range(10):
+        songs = rng.choice(30, size=12, replace=False)
+        weeks[week] = dict(zip(songs.tolist(), range(1, 13)))
+    df = chart({week: ranks for week, ranks in weeks.items() if week not in missing})
+    pd.testing.assert_frame_equal(normalized(bianhua.build_events(df)), normalized(replay(df)))
+
+
+def test_missing_week_gives_entries_not_moves():
+    # 第 1 周缺失：第 2 周的歌曲都记为 re-entry / debut，没有 climb / fall，也没有 drop-out
+    df = chart({0: {1: 1, 2: 2}, 2: {1: 2, 3: 1}})
+    events = normalized(bianhua.build_events(df))
+    assert sorted(events['event_type']) == ['debut', 're-entry']
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+import bodong
+
+
+def random_chart(weeks=80, songs=60, seed=5):
+    """按周排序的随机榜单：每首歌随机在榜 / 跌出，排名随机"""
+    rng = np.random.default_rng(seed)
+    present = rng.random((weeks, songs)) < 0.6
+    week, song = np.nonzero(present)
+    return pd.DataFrame({
+        'week_idx': (week + 1000).astype(np.uint16),
+        'song_idx': song.astype(np.uint32),
+        'rank': rng.integers(1, 101, size=len(week)).astype(np.uint8),
+    })
+
+
+def pstd(values):
+    return float(np.std(values)) if len(values) >= 2 else np.nan
+
+
+def batch_reference(df):
+    """逐首歌按定义计算 change / entry / volatility / momentum / breakout"""
+    result = {}
+    for song, group in df.groupby('song_idx'):
+        last_week = last_rank = None
+        changes, momentum = [], 0.0
+        for row in group.itertuples():
+            continuing = last_week == row.week_idx - 1
+            change = int(last_rank) - int(row.rank) if continuing else 0
+            if continuing:
+                prev = pstd(changes[-bodong.WINDOW:])
+                threshold = max(bodong.BREAKOUT_MIN_CLIMB, bodong.BREAKOUT_Z * np.nan_to_num(prev))
+                breakout = change >= threshold
+                changes.append(change)
+                momentum = bodong.ALPHA * change + (1 - bodong.ALPHA) * momentum
+            else:
+                breakout = False
+                changes, momentum = [], 0.0
+            result[(int(row.week_idx), int(song))] = (
+                change, not continuing, pstd(changes[-bodong.WINDOW:]), momentum, breakout)
+            last_week, last_rank = row.week_idx, row.rank
+    return result
+
+
+def test_streaming_matches_batch_definition():
+    df = random_chart()
+    frame = bodong.build_index(df).frame()
+    assert len(frame) == len(df)
+    expected = batch_reference(df)
+    for row in frame.itertuples():
+        change, entry, volatility, momentum, breakout = expected[(int(row.week_idx), int(row.song_idx))]
+        assert row.change == change and row.entry == entry and row.breakout == breakout
+        np.testing.assert_allclose(row.volatility, volatility, rtol=1e-5, atol=1e-5)
+        np.testing.assert_allclose(row.momentum, momentum, rtol=1e-5, atol=1e-5)
+    assert frame['breakout'].any()
+
+
+def test_song_extremes_match_frame():
+    index = bodong.build_index(random_chart())
+    frame = index.frame()
+    moves = frame[~frame['entry']].groupby('song_idx')['change']
+    extremes = index.song_extremes()
+    np.testing.assert_array_equal(extremes.loc[moves.max().index, 'max_climb'], moves.max().clip(lower=0))
+    np.testing.assert_array_equal(extremes.loc[moves.min().index, 'max_fall'], -moves.min().clip(upper=0))
+
+
+def test_get_index_extends_appended_weeks(monkeypatch):
+    monkeypatch.setattr(bodong, '_index_cache', {})
+    df = random_chart()
+    head = df[df['week_idx'] < 1050]
+    first = bodong.get_index(head, version='v1')
+    second = bodong.get_index(df, version='v2')
+    assert second is first
+    pd.testing.assert_frame_equal(second.frame(), bodong.build_index(df).frame())
+
+
+def test_get_index_rebuilds_when_history_changes(monkeypatch):
+    monkeypatch.setattr(bodong, '_index_cache', {})
+    df = random_chart()
+    first = bodong.get_index(df, version='v1')
+    changed = df.copy()
+    changed.loc[3, 'rank'] = (int(changed.loc[3, 'rank']) % 100) + 1
+    second = bodong.get_index(changed, version='v2')
+    assert second is not first
+    pd.testing.assert_frame_equal(second.frame(), bodong.build_index(changed).frame())
+
+
+def test_add_week_rejects_old_weeks():
+    index = bodong.build_index(random_chart(weeks=3))
+    with pytest.raises(ValueError):
+        index.add_week(index.latest_week, [0], [1])
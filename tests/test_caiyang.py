@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+import caiyang
+
+
+def test_lttb_keeps_endpoints_and_point_count():
+    rng = np.random.default_rng(0)
+    x = np.arange(1000)
+    y = rng.normal(size=1000).cumsum()
+    index = caiyang.lttb(x, y, 50)
+    assert len(index) == 50
+    assert index[0] == 0 and index[-1] == 999
+    assert np.all(np.diff(index) > 0)
+
+
+@pytest.mark.parametrize('n_out', [2, 10, 11])
+def test_lttb_returns_all_points_when_nothing_to_drop(n_out):
+    np.testing.assert_array_equal(caiyang.lttb(np.arange(10), np.zeros(10), n_out), np.arange(10))
+
+
+def test_lttb_keeps_spikes():
+    y = np.zeros(200)
+    y[[37, 120]] = [-50, 80]
+    index = caiyang.lttb(np.arange(200), y, 10)
+    assert {37, 120} <= set(index.tolist())
+
+
+def test_downsample_runs_keeps_run_edges_and_peaks():
+    rng = np.random.default_rng(2)
+    lengths = [300, 5, 600, 1]
+    runs = np.repeat(np.arange(len(lengths)), lengths)
+    x = np.arange(len(runs)) + runs * 10              # 段与段之间有空缺
+    y = rng.integers(2, 100, size=len(runs))
+    peaks = [37, 300 + 3, 305 + 512]
+    y[peaks] = 1
+    index = caiyang.downsample_runs(x, y, runs, max_points=60)
+    kept = set(index.tolist())
+    starts = np.cumsum([0] + lengths[:-1])
+    ends = starts + np.array(lengths) - 1
+    assert set(starts.tolist()) | set(ends.tolist()) | set(peaks) <= kept
+    assert len(index) < 120
+    assert np.all(np.diff(index) > 0)
+
+
+def test_downsample_runs_without_budget_keeps_everything():
+    runs = np.zeros(50)
+    np.testing.assert_array_equal(caiyang.downsample_runs(np.arange(50), np.arange(50), runs, None), np.arange(50))
+    np.testing.assert_array_equal(caiyang.downsample_runs(np.arange(50), np.arange(50), runs, 50), np.arange(50))
+
+
+def test_line_budget():
+    assert caiyang.line_budget(10, 1000, max_points=600) == 6
+    assert caiyang.line_budget(1, 1000, max_points=600) == 3
+    assert caiyang.line_budget(1000, 1000, max_points=600) == 600
+    assert caiyang.line_budget(0, 0, max_points=600) == 600
+    assert caiyang.line_budget(10, 1000, max_points=None) is None
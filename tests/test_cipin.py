@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+import cipin
+from conftest import FakeConnection
+
+
+def test_tokenize_drops_stopwords_letters_and_numbers():
+    assert cipin.tokenize("Love Story (Taylor's Version) feat. A 22") == ['love', 'story']
+    assert cipin.tokenize("Don't Stop Believin'") == ['stop', 'believin']
+
+
+def test_build_term_rows_counts_repeats_once_per_song():
+    rows = cipin.build_term_rows([(1, 'Bad Bad Romance', 2009), (2, 'Bad Guy', 2019)])
+    assert sorted(rows) == [(1, 'bad', 2, 2009), (1, 'romance', 1, 2009), (2, 'bad', 1, 2019), (2, 'guy', 1, 2019)]
+
+
+def test_update_terms_skips_indexed_songs():
+    def respond(sql, params):
+        if sql.startswith('SELECT DISTINCT song_id FROM song_title_terms'):
+            return [(1,)]
+        if sql.startswith('SELECT song_id, name FROM songs'):
+            return [(2, 'Bad Guy')]
+        return []
+    conn = FakeConnection(respond)
+    cipin.update_terms(conn.cursor(), [1, 2], 2019)
+    inserted = [params for sql, params in conn.log if sql.startswith('INSERT INTO song_title_terms')]
+    assert inserted == [[(2, 'bad', 1, 2019), (2, 'guy', 1, 2019)]]
+    year_counts = [params for sql, params in conn.log if sql.startswith('INSERT INTO title_term_years')]
+    assert sorted(year_counts[0]) == [(2019, 'bad', 1), (2019, 'guy', 1)]
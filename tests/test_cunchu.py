@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import cunchu
+import pachong
+from conftest import make_rows
+
+
+def test_append_rows_keeps_last_copy_of_each_rank(archive):
+    cunchu.append_rows(make_rows('2020-01-04') + make_rows('2020-01-11'))
+    cunchu.append_rows(make_rows('2020-01-11', prefix='Fixed'))
+
+    df = cunchu.read_archive()
+    assert len(df) == 200
+    assert not df.duplicated(['chart_date', 'rank']).any()
+    names = df.groupby(df['chart_date'].dt.strftime('%Y-%m-%d'))['name'].apply(lambda s: s.astype(str).iloc[0])
+    assert names['2020-01-04'] == 'Song 1'
+    assert names['2020-01-11'] == 'Fixed 1'
+
+
+def test_append_rows_writes_one_partition_per_year(archive):
+    cunchu.append_rows(make_rows('2019-12-28') + make_rows('2020-01-04'))
+    assert cunchu.list_years() == [2019, 2020]
+    assert cunchu.latest_chart_date().strftime('%Y-%m-%d') == '2020-01-04'
+
+
+def test_append_rows_splits_by_chart_id(archive):
+    cunchu.append_rows(make_rows('2020-01-04', chart_id='hot-100') +
+                       make_rows('2020-01-04', size=50, chart_id='country-songs'))
+    assert len(cunchu.read_archive(chart_id='hot-100')) == 100
+    assert len(cunchu.read_archive(chart_id='country-songs')) == 50
+
+
+def test_scraper_does_not_overwrite_archive_with_failed_pages(archive, monkeypatch, capsys):
+    cunchu.append_rows(make_rows('2020-01-04') + make_rows('2020-01-11'))
+    failed = [pachong._placeholder(rank, f'PageError_{rank}', 'Error', '2020-01-11', (2020, 2))
+              for rank in range(1, 101)]
+    pages = [('hot-100', '2020-01-04', make_rows('2020-01-04', prefix='New', chart_id='hot-100')),
+             ('hot-100', '2020-01-11', failed)]
+    monkeypatch.setattr(pachong, 'scrape_charts', lambda *args, **kwargs: iter(pages))
+
+    pachong.main('2020-01-04', '2020-01-11', min_interval=0)
+
+    df = cunchu.read_archive()
+    assert not df['name'].astype(str).map(lambda name: pachong.is_failed({'name': name})).any()
+    by_date = df.groupby(df['chart_date'].dt.strftime('%Y-%m-%d'))['name'].apply(lambda s: s.astype(str).iloc[0])
+    assert by_date['2020-01-04'] == 'New 1'
+    assert by_date['2020-01-11'] == 'Song 1'
+    assert 'hot-100 2020-01-11' in capsys.readouterr().out
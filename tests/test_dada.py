@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+import re
+import datetime
+
+import pandas as pd
+import pytest
+
+import bianhua
+import cipin
+import cunchu
+import dada
+import huizong
+import shuju
+from conftest import FakeConnection, make_rows
+
+
+def week_responder(old_song_ids, songs):
+    """ingest_week 中各查询的结果：songs 为 [(song_id, name, singer)]，old_song_ids 为数据库中该周的旧数据"""
+    def respond(sql, params):
+        if sql.startswith('SELECT song_id, name, singer FROM songs'):
+            return songs
+        if sql.startswith('SELECT artist_id, name FROM artists'):
+            return [(song_id, singer) for song_id, _, singer in songs]
+        if sql.startswith('SELECT song_id FROM chart_entries WHERE chart_date'):
+            return [(song_id,) for song_id in old_song_ids]
+        if sql.startswith('SELECT 1 FROM chart_entries'):
+            return [(1,)]
+        if sql.startswith('SELECT DISTINCT song_id FROM song_title_terms'):
+            return [(song_id,) for song_id, _, _ in songs]
+        return []
+    return respond
+
+
+def test_ingest_week_refreshes_rollups_for_replaced_songs(monkeypatch):
+    refreshed = []
+    monkeypatch.setattr(huizong, 'refresh_rollups', lambda cursor, year, song_ids: refreshed.append((year, song_ids)))
+    week_df = cunchu.rows_to_frame(make_rows('2020-01-11', size=2))
+    conn = FakeConnection(week_responder(old_song_ids=[2, 9], songs=[(1, 'Song 1', 'Artist 1'), (2, 'Song 2', 'Artist 2')]))
+
+    dada.ingest_week(conn, week_df)
+
+    assert refreshed == [(2020, [1, 2, 9])]
+    deletes = conn.statements('DELETE FROM chart_entries')
+    selects = [i for i, (sql, _) in enumerate(conn.log) if sql.startswith('SELECT song_id FROM chart_entries')]
+    # 旧数据中的歌曲需在删除之前读取
+    assert selects and selects[0] < next(i for i, (sql, _) in enumerate(conn.log) if sql in deletes)
+
+
+def test_ingest_week_compares_with_the_week_seven_days_earlier():
+    week_df = cunchu.rows_to_frame(make_rows('2020-01-11', size=2))
+    conn = FakeConnection(week_responder(old_song_ids=[], songs=[(1, 'Song 1', 'Artist 1'), (2, 'Song 2', 'Artist 2')]))
+    dada.ingest_week(conn, week_df)
+    prev = [params for sql, params in conn.log if sql.startswith('SELECT song_id, `rank` FROM chart_entries')]
+    assert prev == [(datetime.date(2020, 1, 4),)]
+
+
+def test_ingest_week_only_looks_up_the_weeks_songs_and_artists(monkeypatch):
+    monkeypatch.setattr(dada, 'BATCH_SIZE', 2)
+    rows = make_rows('2020-01-11', size=3)
+    rows[2]['singer'] = 'Artist 1 & Artist 2'
+    week_df = cunchu.rows_to_frame(rows)
+    songs = [(1, 'Song 1', 'Artist 1'), (2, 'Song 2', 'Artist 2'), (3, 'Song 3', 'Artist 1 & Artist 2')]
+    conn = FakeConnection(week_responder(old_song_ids=[], songs=songs))
+    dada.ingest_week(conn, week_df)
+
+    # 增量导入不读取整张表：每个 SELECT 都带条件，歌曲和艺术家按本周的键分批查询
+    selects = [(sql, params) for sql, params in conn.log if sql.startswith('SELECT')]
+    assert all(' WHERE ' in sql for sql, _ in selects)
+    song_lookups = [params for sql, params in selects if sql.startswith('SELECT song_id, name, singer FROM songs')]
+    assert song_lookups == [('Song 1', 'Artist 1', 'Song 2', 'Artist 2'), ('Song 3', 'Artist 1 & Artist 2')]
+    artist_lookups = [params for sql, params in selects if sql.startswith('SELECT artist_id, name FROM artists')]
+    assert artist_lookups == [('Artist 1', 'Artist 2')]
+    assert conn.statements('SELECT song_id, name, singer FROM songs')[0].endswith(
+        'WHERE (name, singer) IN ((%s, %s), (%s, %s))')
+
+def frame_responder(df):
+    """import_frame 中 upsert_songs 读取编号的查询结果：歌曲和艺术家按出现顺序编号"""
+    songs = df.drop_duplicates('song_idx')
+    songs = [(i + 1, str(name), str(singer)) for i, (name, singer) in enumerate(zip(songs['name'], songs['singer']))]
+    artists = sorted({artist for _, _, singer in songs for artist in shuju.split_artists(singer)})
+
+    def respond(sql, params):
+        if sql.startswith('SELECT song_id, name, singer FROM songs'):
+            return songs
+        if sql.startswith('SELECT artist_id, name FROM artists'):
+            return list(enumerate(artists, start=1))
+        return []
+    return respond
+
+
+def sample_frame():
+    """跨三个年份的几周榜单，每周换掉一部分歌曲以产生变动事件"""
+    rows = []
+    for i, chart_date in enumerate(['2019-12-21', '2019-12-28', '2020-01-04', '2020-01-11',
+                                    '2020-01-18', '2021-01-02', '2021-01-09']):
+        week = make_rows(chart_date, size=6)
+        for row in week[:3]:
+            row['name'], row['singer'] = f"Song {row['rank']} v{i}", f"Artist {i}"
+        rows += week
+    return shuju.compact_frame(cunchu.rows_to_frame(rows))
+
+
+def test_import_frame_bumps_db_version_in_the_same_transaction(monkeypatch):
+    monkeypatch.setattr(huizong, 'rebuild_rollups', lambda cursor: None)
+    monkeypatch.setattr(cipin, 'rebuild_terms', lambda cursor: None)
+    df = sample_frame()
+    conn = FakeConnection(frame_responder(df))
+    dada.import_frame(conn, df)
+    sql = [entry[0] for entry in conn.log]
+    assert sql.count('COMMIT') == 1
+    assert sql[-2].startswith('REPLACE INTO db_version') and sql[-1] == 'COMMIT'
+
+
+def test_ingest_week_bumps_db_version_before_commit():
+    week_df = cunchu.rows_to_frame(make_rows('2020-01-11', size=2))
+    conn = FakeConnection(week_responder(old_song_ids=[], songs=[(1, 'Song 1', 'Artist 1'), (2, 'Song 2', 'Artist 2')]))
+    dada.ingest_week(conn, week_df)
+    sql = [entry[0] for entry in conn.log]
+    assert sql[0].startswith('CREATE TABLE IF NOT EXISTS db_version')
+    assert sql[-2].startswith('REPLACE INTO db_version') and sql[-1] == 'COMMIT'
+    dada.ingest_week(conn, week_df)
+    versions = [params[0] for sql, params in conn.log if sql.startswith('REPLACE INTO db_version')]
+    assert len(set(versions)) == 2
+
+
+class FakeSchema:
+    """
+    按库记录表、二级索引和外键，响应 information_schema 查询并执行 ALTER / RENAME / DROP TABLE，
+    用于在没有 MySQL 的环境中检查并行导入和整体发布生成的语句。
+    """
+
+    def __init__(self, *databases):
+        self.databases = {name: {} for name in databases}
+        self.log = []   # (库名, SQL)，跨连接按执行顺序记录
+
+    def new_table(self, table):
+        return {'indexes': set(dada.SECONDARY_INDEXES.get(table, ())),
+                'foreign_keys': {f'{table}_ibfk_1'} if table in dada.FOREIGN_KEYS else set()}
+
+    def responder(self, database, base=None):
+        def respond(sql, params):
+            self.log.append((database, sql))
+            tables = self.databases.setdefault(database, {})
+            if match := re.match(r'CREATE TABLE IF NOT EXISTS (\w+)', sql):
+                tables.setdefault(match.group(1), self.new_table(match.group(1)))
+            elif match := re.match(r'CREATE DATABASE IF NOT EXISTS `(\w+)`', sql):
+                self.databases.setdefault(match.group(1), {})
+            elif 'information_schema.STATISTICS' in sql:
+                return [('PRIMARY',)] + [(name,) for name in sorted(tables[params[0]]['indexes'])]
+            elif 'SELECT CONSTRAINT_NAME FROM information_schema.REFERENTIAL_CONSTRAINTS' in sql:
+                return [(name,) for name in sorted(tables[params[0]]['foreign_keys'])]
+            elif 'SELECT COUNT(*) FROM information_schema.REFERENTIAL_CONSTRAINTS' in sql:
+                return [(len(tables[params[0]]['foreign_keys']),)]
+            elif match := re.match(r'ALTER TABLE (\w+) (.*)', sql):
+                table = tables[match.group(1)]
+                table['indexes'] -= set(re.findall(r'DROP INDEX `(\w+)`', sql))
+                table['indexes'] |= set(re.findall(r'ADD INDEX `(\w+)`', sql))
+                table['foreign_keys'] -= set(re.findall(r'DROP FOREIGN KEY `(\w+)`', sql))
+                if 'ADD FOREIGN KEY' in sql:
+                    table['foreign_keys'].add(f'{match.group(1)}_ibfk_1')
+            elif sql.startswith('RENAME TABLE'):
+                # 与 MySQL 相同按顺序逐个改名，目标表必须不存在
+                for src_db, src, dst_db, dst in re.findall(r'`(\w+)`\.`(\w+)` TO `(\w+)`\.`(\w+)`', sql):
+                    assert dst not in self.databases[dst_db]
+                    self.databases[dst_db][dst] = self.databases[src_db].pop(src)
+            elif sql.startswith('DROP TABLE IF EXISTS'):
+                for db, table in re.findall(r'`(\w+)`\.`(\w+)`', sql):
+                    self.databases.get(db, {}).pop(table, None)
+            return base(sql, params) if base else []
+        return respond
+
+    def connect(self, base, default, log=None):
+        """代替 dada.get_connection，记录建立的连接（log 为 None 时每个连接单独记录语句）"""
+        self.connections = []
+
+        def get_connection(database=None):
+            database = database or default
+            conn = FakeConnection(self.responder(database, base), database, log)
+            self.connections.append(conn)
+            return conn
+        return get_connection
+
+
+def rows_of(log, prefix):
+    """executemany 写入的批次（每批为行列表）"""
+    return [params for sql, params in log if sql.startswith(prefix) and isinstance(params, list)]
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_import_frame_parallel_partitions_by_year(monkeypatch, workers):
+    monkeypatch.setattr(huizong, 'rebuild_rollups', lambda cursor: None)
+    monkeypatch.setattr(cipin, 'rebuild_terms', lambda cursor: None)
+    df = sample_frame()
+    events = bianhua.build_events(df)
+    log = []
+    schema = FakeSchema()
+    monkeypatch.setattr(dada, 'get_connection', schema.connect(frame_responder(df), 'charts', log))
+    conn = FakeConnection(schema.responder('stage', frame_responder(df)), 'stage', log)
+    dada.create_tables(conn.cursor())
+
+    dada.import_frame_parallel(conn, df, workers=workers, database='stage')
+
+    # 每个年份每张表一个分区，每个分区在工作连接上单独提交，工作连接都已关闭
+    years = df['year'].nunique() + pd.to_datetime(events['chart_date']).dt.year.nunique()
+    assert 1 <= len(schema.connections) <= workers
+    assert all(c.database == 'stage' and c.closed for c in schema.connections)
+    assert log.count(('COMMIT', 'stage')) == years + 2
+    entries = rows_of(log, 'INSERT INTO chart_entries')
+    event_rows = rows_of(log, 'INSERT INTO chart_events')
+    assert len(entries) + len(event_rows) == years
+    assert all(len({row[4].year for row in batch}) == 1 for batch in entries)
+    assert all(len({row[1].year for row in batch}) == 1 for batch in event_rows)
+    assert sum(map(len, entries)) == len(df) and sum(map(len, event_rows)) == len(events)
+    if workers == 1:
+        # 单个连接时按分区大小从大到小依次写入
+        sizes = [len(params) for sql, params in log if sql.startswith('INSERT INTO chart_') and isinstance(params, list)]
+        assert sizes == sorted(sizes, reverse=True)
+
+    # 写入前删除二级索引和外键，全部写入后一次性重建
+    sql = [entry[0] for entry in log]
+    inserts = [i for i, s in enumerate(sql) if s.startswith('INSERT INTO chart_')]
+    drops = [i for i, s in enumerate(sql) if s.startswith('ALTER TABLE') and 'DROP' in s]
+    adds = [i for i, s in enumerate(sql) if s.startswith('ALTER TABLE') and 'ADD' in s]
+    assert len(drops) == 3 and len(adds) == 2
+    assert max(drops) < min(inserts) and max(inserts) < min(adds)
+    assert schema.databases['stage']['chart_entries'] == schema.new_table('chart_entries')
+    assert schema.databases['stage']['chart_events'] == schema.new_table('chart_events')
+    assert sql[-2].startswith('REPLACE INTO db_version') and log[-1] == ('COMMIT', 'stage')
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_publish_rebuild_swaps_all_tables_in_one_rename(monkeypatch, workers):
+    monkeypatch.setattr(huizong, 'rebuild_rollups', lambda cursor: None)
+    monkeypatch.setattr(cipin, 'rebuild_terms', lambda cursor: None)
+    monkeypatch.setitem(shuju.DB_CONFIG, 'database', 'charts')
+    df = sample_frame()
+    schema = FakeSchema('charts')
+    schema.databases['charts'] = {table: schema.new_table(table) for table in dada.TABLES}
+    old_songs = schema.databases['charts']['songs']
+    monkeypatch.setattr(dada, 'get_connection', schema.connect(frame_responder(df), 'charts'))
+
+    dada.publish_rebuild(df, workers)
+
+    live, staging = schema.connections[0], schema.connections[1]
+    assert (live.database, staging.database) == ('charts', 'charts_staging')
+    assert all(conn.closed for conn in schema.connections)
+    # 正式库只执行建表、建库、外键和交换，不写入数据
+    assert not live.statements('INSERT') and not live.statements('DELETE')
+    assert live.statements('CREATE DATABASE') == [
+        'CREATE DATABASE IF NOT EXISTS `charts_staging` CHARACTER SET utf8mb3',
+        'CREATE DATABASE IF NOT EXISTS `charts_retired` CHARACTER SET utf8mb3']
+    renames = live.statements('RENAME TABLE')
+    assert len(renames) == 1
+    pairs = re.findall(r'`(\w+)`\.`(\w+)` TO `(\w+)`\.`(\w+)`', renames[0])
+    assert pairs == [pair for table in dada.TABLES for pair in [('charts', table, 'charts_retired', table),
+                                                                 ('charts_staging', table, 'charts', table)]]
+
+    # 暂存库导入完成（写入版本号）后才交换；交换前两边的外键都已删除，交换后在正式库中重新添加
+    order = schema.log
+    rename = order.index(('charts', renames[0]))
+    staged = [i for i, (db, sql) in enumerate(order) if db == 'charts_staging' and sql.startswith('REPLACE INTO db_version')]
+    fk_drops = [i for i, (db, sql) in enumerate(order) if 'DROP FOREIGN KEY' in sql]
+    fk_adds = [i for i, (db, sql) in enumerate(order) if 'ADD FOREIGN KEY' in sql]
+    assert len(staged) == 1 and staged[0] < rename
+    assert {order[i][0] for i in fk_drops if i < rename} == {'charts', 'charts_staging'}
+    assert [order[i][0] for i in fk_adds if i > rename] == ['charts']
+
+    # 正式库换成了新表（索引和外键齐全），旧表已删除，暂存库中不再有表
+    assert set(schema.databases['charts']) == set(dada.TABLES)
+    assert all(schema.databases['charts'][table] == schema.new_table(table) for table in dada.TABLES)
+    assert schema.databases['charts']['songs'] is not old_songs
+    assert schema.databases['charts_staging'] == {} and schema.databases['charts_retired'] == {}
+    assert live.log[-1] == ('COMMIT', 'charts') and live.statements('DROP TABLE')[-1].startswith(
+        'DROP TABLE IF EXISTS `charts_retired`.`title_term_years`')
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+import fenbu
+
+
+def test_make_edges_uniform_covers_the_range():
+    np.testing.assert_array_equal(fenbu.make_edges(10, 1, 100), np.arange(1, 102, 10))
+    np.testing.assert_array_equal(fenbu.make_edges(3, 1, 10), [1, 5, 9, 13])
+    np.testing.assert_array_equal(fenbu.make_edges(50, 1, 5), [1, 2, 3, 4, 5, 6])
+
+
+@pytest.mark.parametrize('bins', [0, [1], [1, 1, 5], [1, 2.5, 5]])
+def test_make_edges_rejects_bad_bins(bins):
+    with pytest.raises(ValueError):
+        fenbu.make_edges(bins, 1, 100)
+
+
+@pytest.mark.parametrize('bins', [7, [1, 2, 4, 11, 41, 101], [-99, -10, 0, 1, 10, 100]])
+def test_count_bins_matches_numpy_histogram(bins):
+    rng = np.random.default_rng(3)
+    values = rng.integers(-120, 130, size=5000)
+    edges = fenbu.make_edges(bins, -99, 99)
+    inside = values[(values >= edges[0]) & (values < edges[-1])]
+    # np.histogram 的最后一个箱包含右端点，整数数据减去 0.5 后各箱即为左闭右开
+    expected, _ = np.histogram(inside, bins=edges - 0.5)
+    np.testing.assert_array_equal(fenbu.count_bins(values, edges), expected)
+
+
+def test_histogram_frame_labels():
+    frame = fenbu.histogram_frame(np.array([1, 2, 11, 101]), [1, 2, 3])
+    assert frame['label'].tolist() == ['1', '2-10', '11-100']
+    frame = fenbu.histogram_frame(np.array([-99, 0, 1, 100]), [1, 2, 3])
+    assert frame['label'].tolist() == ['-99~-1', '0', '1~99']
+
+
+def test_metric_values_per_entry_and_song():
+    df = pd.DataFrame({
+        'song_idx': [0, 0, 0, 2, 2, 5],
+        'rank': [40, 12, 30, 3, 1, 100],
+        'last_week': pd.array([pd.NA, 40, 12, 7, 3, pd.NA], dtype='Int16'),
+    })
+    np.testing.assert_array_equal(fenbu.metric_values('rank_change', df), [28, -18, 4, 2])
+    np.testing.assert_array_equal(fenbu.metric_values('weeks_on_chart', df), [3, 2, 1])
+    np.testing.assert_array_equal(fenbu.metric_values('peak_rank', df), [12, 1, 100])
+    counts = fenbu.histogram('peak_rank', bins=[1, 11, 101], df=df)['count'].tolist()
+    assert counts == [1, 2]
+
+
+@pytest.mark.parametrize('bins', [10, [1, 2, 4, 11, 41, 101]])
+def test_database_buckets_agree_with_memory(bins):
+    edges = fenbu.make_edges(bins, 1, 100)
+    query, params = fenbu.build_query('rank', edges, "ce.chart_date BETWEEN :start_date AND :end_date")
+    assert params['lo'] == 1 and params['hi'] == int(edges[-1])
+    if fenbu.is_uniform(edges):
+        assert "DIV :width" in query and params['width'] == 10
+    else:
+        assert "INTERVAL(value, :e0, :e1, :e2, :e3, :e4, :e5)" in query
+        assert [params[f'e{i}'] for i in range(len(edges))] == edges.tolist()
+    # 模拟数据库按箱号分组后的结果（只返回非空箱）
+    values = np.random.default_rng(4).integers(1, 60, size=1000)
+    index = np.searchsorted(edges, values, side='right') - 1
+    buckets = pd.Series(index).value_counts().rename_axis('bucket').reset_index(name='count')
+    result = fenbu.from_bucket_counts(edges, buckets)
+    pd.testing.assert_frame_equal(result, fenbu.histogram_frame(edges, fenbu.count_bins(values, edges)))
+
+
+def test_lifecycle_metrics_are_memory_only():
+    with pytest.raises(ValueError):
+        fenbu.build_value_query('chart_runs', "1 = 1")
+    with pytest.raises(ValueError):
+        fenbu.get_metric('nope')
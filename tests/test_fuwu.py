@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import pytest
+
+import fuwu
+import shuju
+
+
+class FakePool:
+    """同步执行渲染：render(chart, kwargs, fmt) 返回 (body, used_db)"""
+
+    def __init__(self, render):
+        self.render = render
+        self.calls = []
+
+    def submit(self, func, chart, kwargs, fmt):
+        self.calls.append(chart)
+        future = Future()
+        future.set_result(self.render(chart, kwargs, fmt))
+        return future
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """不启动渲染进程的服务：archive_version / db_version 由测试修改"""
+    versions = {'archive': 'a1', 'db': 'd1'}
+    monkeypatch.setattr(shuju, 'data_version', lambda: versions['archive'])
+    monkeypatch.setattr(shuju, 'db_version', lambda: versions['db']() if callable(versions['db']) else versions['db'])
+    monkeypatch.setattr(fuwu, 'VERSION_TTL', -1)
+    service = fuwu.ChartService.__new__(fuwu.ChartService)
+    service.charts = {
+        'archive_chart': {'params': ['start_date', 'end_date', 'dpi'], 'required': []},
+        'db_chart': {'params': ['search_terms', 'bins', 'top_n', 'dpi'], 'required': ['search_terms']},
+    }
+    service.pool = FakePool(lambda chart, kwargs, fmt: (f'{chart}-{versions}'.encode(), chart == 'db_chart'))
+    service.workers = 1
+    service.lock = threading.Lock()
+    service.cache = OrderedDict()
+    service.inflight = {}
+    service.version = (None, 0.0)
+    service.db_version = (None, 0.0)
+    service.db_refresh = None
+    service.uses_db = {}
+    service.stats = dict.fromkeys(['hits', 'not_modified', 'renders', 'coalesced', 'rejected'], 0)
+    service.versions = versions
+    service._refresh_db_version()
+    return service
+
+
+def refresh(service):
+    """等待之前的读取结束，再触发并等待一次后台读取数据库版本"""
+    if service.db_refresh is not None:
+        service.db_refresh.join()
+    service.data_version()
+    service.db_refresh.join()
+
+
+def test_archive_chart_ignores_db_writes(service):
+    status, etag, _ = service.get('archive_chart', {'dpi': 100}, 'png')
+    assert status == 200 and service.uses_db == {'archive_chart': False}
+    service.versions['db'] = 'd2'
+    refresh(service)
+    assert service.get('archive_chart', {'dpi': 100}, 'png', if_none_match=etag)[0] == 304
+    service.versions['archive'] = 'a2'
+    status, new_etag, _ = service.get('archive_chart', {'dpi': 100}, 'png', if_none_match=etag)
+    assert status == 200 and new_etag != etag
+    assert service.pool.calls == ['archive_chart', 'archive_chart']
+
+
+def test_db_chart_is_rendered_again_after_db_writes(service):
+    kwargs = {'search_terms': ('Drake',), 'dpi': 100}
+    status, etag, body = service.get('db_chart', kwargs, 'png')
+    assert status == 200 and service.uses_db == {'db_chart': True}
+    assert service.get('db_chart', kwargs, 'png', if_none_match=etag)[0] == 304
+    service.versions['db'] = 'd2'
+    refresh(service)
+    status, new_etag, new_body = service.get('db_chart', kwargs, 'png', if_none_match=etag)
+    assert status == 200 and new_etag != etag and new_body != body
+    assert service.pool.calls == ['db_chart', 'db_chart']
+
+
+def test_slow_database_does_not_block_requests(service):
+    status, etag, _ = service.get('archive_chart', {'dpi': 100}, 'png')
+    connecting = threading.Event()
+    release = threading.Event()
+
+    def slow_db_version():
+        connecting.set()
+        release.wait(10)
+        return None                            # 连接超时
+    service.versions['db'] = slow_db_version
+    previous = service.db_refresh
+    if previous is not None:
+        previous.join()
+    service.data_version()
+    assert connecting.wait(5)
+    # 后台线程等待数据库时，命中缓存和 304 的请求不等待，数据库图表的键沿用原来的数据库版本
+    done = []
+    worker = threading.Thread(target=lambda: done.append(service.get('archive_chart', {'dpi': 100}, 'png', etag)))
+    worker.start()
+    worker.join(2)
+    assert done and done[0][0] == 304
+    assert service.cache_key('db_chart', {}, 'png')[0] == ('a1', 'd1')
+    release.set()
+    service.db_refresh.join()
+    # 读取失败：保留最后一次读到的版本
+    assert service.data_version() == ('a1', 'd1') and service.health()['db_version'] == 'd1'
+
+
+def test_unrendered_chart_key_includes_db_version(service):
+    key = service.cache_key('archive_chart', {}, 'png')
+    assert key[0] == ('a1', 'd1')
+    service.uses_db['archive_chart'] = False
+    assert service.cache_key('archive_chart', {}, 'png')[0] == 'a1'
+
+
+def test_parse_request_converts_parameters(service):
+    kwargs, fmt = service.parse_request('db_chart', {
+        'terms': ['Drake, SZA ,'], 'bins': ['1,5,10'], 'top_n': ['5'], 'dpi': ['5000'], 'format': ['json']})
+    assert fmt == 'json'
+    assert kwargs == {'search_terms': ('Drake', 'SZA'), 'bins': (1, 5, 10), 'top_n': 5, 'dpi': fuwu.MAX_DPI}
+    kwargs, fmt = service.parse_request('archive_chart', {'from': ['2020-1-5'], 'to': ['2020-02-01']})
+    assert fmt == 'png'
+    assert kwargs == {'start_date': '2020-01-05', 'end_date': '2020-02-01', 'dpi': fuwu.DEFAULT_DPI}
+
+
+@pytest.mark.parametrize('chart, query', [
+    ('nope', {}),
+    ('archive_chart', {'format': ['gif']}),
+    ('archive_chart', {'q': ['x']}),
+    ('archive_chart', {'from': ['not a date']}),
+    ('db_chart', {'terms': ['Drake'], 'top_n': ['ten']}),
+    ('db_chart', {}),
+])
+def test_parse_request_rejects_bad_requests(service, chart, query):
+    with pytest.raises(ValueError):
+        service.parse_request(chart, query)
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+import hezuo
+
+
+def weeks_of(songs):
+    """[(song_idx, singer, 在榜周数)] -> 每周一行的榜单数据"""
+    rows = [(song, singer) for song, singer, weeks in songs for _ in range(weeks)]
+    return pd.DataFrame(rows, columns=['song_idx', 'singer'])
+
+
+def test_build_graph_weights_edges_by_chart_weeks():
+    df = weeks_of([(0, 'A Featuring B', 3), (1, 'A & C', 2), (2, 'B Featuring A', 1), (3, 'D', 5)])
+    artists, adjacency = hezuo.build_graph(df)
+    index = {artist: i for i, artist in enumerate(artists)}
+    dense = adjacency.toarray()
+    assert dense[index['A'], index['B']] == dense[index['B'], index['A']] == 4
+    assert dense[index['A'], index['C']] == 2
+    assert dense[index['B'], index['C']] == 0
+    assert np.all(np.diag(dense) == 0)
+    assert 'D' in index and dense[index['D']].sum() == 0
+
+
+def test_pagerank_matches_dense_power_iteration():
+    rng = np.random.default_rng(0)
+    weights = np.triu(rng.integers(0, 3, size=(6, 6)), 1).astype(float)
+    weights = weights + weights.T
+    weights[5, :] = weights[:, 5] = 0   # 没有合作的艺术家
+    rank = hezuo.pagerank(sparse.csr_matrix(weights))
+
+    n = len(weights)
+    out = weights.sum(axis=1)
+    transition = np.where(out[:, None] > 0, weights / np.where(out > 0, out, 1)[:, None], 1.0 / n).T
+    expected = np.full(n, 1.0 / n)
+    for _ in range(200):
+        expected = 0.85 * transition @ expected + 0.15 / n
+    np.testing.assert_allclose(rank, expected / expected.sum(), atol=1e-8)
+
+
+def test_graph_metrics_components():
+    df = weeks_of([(0, 'A & B', 1), (1, 'C & D', 1), (2, 'D & E', 1), (3, 'F', 1)])
+    metrics = hezuo.graph_metrics(*hezuo.build_graph(df)).set_index('artist')
+    assert metrics.loc['E', 'component_size'] == 3
+    assert metrics.loc['A', 'component_size'] == 2
+    assert metrics.loc['F', 'degree'] == 0
+    assert abs(metrics['pagerank'].sum() - 1) < 1e-12
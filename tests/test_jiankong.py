@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import cunchu
+import jiankong
+import pachong
+from conftest import make_rows
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.is_redirect = False
+        self.text = ''
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    """按顺序返回 HEAD / GET 响应，记录请求头"""
+
+    def __init__(self, response):
+        self.response = response
+        self.requests = []
+
+    def head(self, url, headers=None, **kwargs):
+        self.requests.append(('HEAD', headers))
+        return self.response
+
+    def get(self, url, headers=None, **kwargs):
+        self.requests.append(('GET', headers))
+        return self.response
+
+
+@pytest.fixture
+def watcher(archive, tmp_path, monkeypatch):
+    """临时状态文件，归档中已有 2020-01-04 这一周"""
+    monkeypatch.setattr(jiankong, 'STATE_PATH', str(tmp_path / 'watcher_state.json'))
+    cunchu.append_rows(make_rows('2020-01-04'), jiankong.CHART_ID)
+
+
+def publish(monkeypatch, weeks):
+    """weeks 中的周已发布，其余为未发布"""
+    def fetch_week(session, date_str, url_root, state):
+        return ('ok', make_rows(date_str)) if date_str in weeks else ('unpublished', None)
+    monkeypatch.setattr(jiankong, 'fetch_week', fetch_week)
+
+
+def test_pending_weeks_survive_a_failing_database_write(watcher, monkeypatch):
+    publish(monkeypatch, {'2020-01-11', '2020-01-18'})
+
+    def fail(state):
+        raise RuntimeError('数据库写入中断')
+    monkeypatch.setattr(jiankong, 'ingest_database', fail)
+    with pytest.raises(RuntimeError):
+        jiankong.check_once(session=object(), now='2020-02-01')
+    assert jiankong.load_state()['db_pending'] == ['2020-01-11', '2020-01-18']
+    assert str(cunchu.latest_chart_date(jiankong.CHART_ID).date()) == '2020-01-18'
+
+
+def test_pending_week_saved_before_the_next_archive_write(watcher, monkeypatch):
+    publish(monkeypatch, {'2020-01-11', '2020-01-18'})
+    append_rows = cunchu.append_rows
+
+    def append_once(rows, chart_id):
+        if rows[0]['chart_date'] == '2020-01-18':
+            raise KeyboardInterrupt
+        return append_rows(rows, chart_id)
+    monkeypatch.setattr(cunchu, 'append_rows', append_once)
+    with pytest.raises(KeyboardInterrupt):
+        jiankong.check_once(with_db=False, session=object(), now='2020-02-01')
+    assert jiankong.load_state()['db_pending'] == ['2020-01-11']
+
+
+def test_check_once_stops_at_unpublished_week(watcher, monkeypatch):
+    publish(monkeypatch, {'2020-01-11'})
+    assert jiankong.check_once(with_db=False, session=object(), now='2020-02-01') == 1
+    state = jiankong.load_state()
+    assert state['db_pending'] == ['2020-01-11'] and state['last_check'] == '2020-02-01T00:00:00'
+
+
+def test_incomplete_page_with_only_last_modified_is_revalidated(monkeypatch):
+    monkeypatch.setattr(pachong, 'parse_chart_page', lambda spec, text, date_str: [{'name': 'Error_1'}])
+    state = {'validators': {}, 'db_pending': []}
+    session = FakeSession(FakeResponse(headers={'Last-Modified': 'Sat, 11 Jan 2020 00:00:00 GMT'}))
+    assert jiankong.fetch_week(session, '2020-01-11', pachong.URL_ROOT, state)[0] == 'incomplete'
+    # 没有 ETag 时只按 Last-Modified 发送条件请求，页面仍返回 200 时重新解析
+    assert jiankong.fetch_week(session, '2020-01-11', pachong.URL_ROOT, state)[0] == 'incomplete'
+    method, headers = session.requests[-1]
+    assert method == 'GET' and 'If-None-Match' not in headers
+    assert headers['If-Modified-Since'] == 'Sat, 11 Jan 2020 00:00:00 GMT'
+    session.response = FakeResponse(304)
+    assert jiankong.fetch_week(session, '2020-01-11', pachong.URL_ROOT, state)[0] == 'unchanged'
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+import json
+import threading
+
+import pytest
+
+import jishi
+
+
+class Clock:
+    """可手动推进的 perf_counter"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(jishi.time, 'perf_counter', clock)
+    return clock
+
+
+@pytest.fixture
+def trace_file(tmp_path, monkeypatch):
+    path = tmp_path / 'trace.jsonl'
+    monkeypatch.setenv(jishi.PROFILE_ENV, '1')
+    monkeypatch.setenv(jishi.TRACE_ENV, str(path))
+    return path
+
+
+def make_chart(clock):
+    @jishi.profiled
+    def plot_example(year, top_n=10):
+        with jishi.stage('connect'):
+            clock.now += 0.5
+        with jishi.stage('query'):
+            clock.now += 1.0
+            with jishi.stage('encode'):       # 嵌套的阶段不单独计时
+                clock.now += 2.0
+            jishi.add_rows(42)
+        clock.now += 0.25                     # 未计入任何阶段的耗时归入 transform
+        with jishi.stage('encode'):
+            clock.now += 0.125
+        return 'done'
+    return plot_example
+
+
+def test_trace_record_shape(clock, trace_file):
+    assert make_chart(clock)(2020, top_n=5) == 'done'
+    [record] = jishi.load_trace(str(trace_file))
+    assert set(record) == {'ts', 'pid', 'chart', 'args', 'kwargs', 'total', 'stages', 'rows', 'bytes'}
+    assert record['chart'] == 'plot_example'
+    assert record['args'] == ['2020'] and record['kwargs'] == {'top_n': '5'}
+    assert record['total'] == 3.875 and record['rows'] == 42 and record['bytes'] == 0
+    assert record['stages'] == {'connect': 0.5, 'query': 3.0, 'transform': 0.25, 'layout': 0.0, 'encode': 0.125}
+
+
+def test_nested_profiled_calls_record_only_the_outermost(clock, trace_file):
+    inner = make_chart(clock)
+
+    @jishi.profiled
+    def plot_outer():
+        with jishi.stage('layout'):
+            clock.now += 1.0
+        return inner(1999)
+
+    plot_outer()
+    records = jishi.load_trace(str(trace_file))
+    assert [record['chart'] for record in records] == ['plot_outer']
+    assert records[0]['stages']['layout'] == 1.0 and records[0]['stages']['connect'] == 0.5
+
+
+def test_traces_are_isolated_per_thread(trace_file):
+    barrier = threading.Barrier(2)
+
+    @jishi.profiled
+    def plot_rows(count):
+        barrier.wait()                        # 两个线程的绘图同时进行
+        jishi.add_rows(count)
+        barrier.wait()
+
+    threads = [threading.Thread(target=plot_rows, args=(count,)) for count in (3, 7)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    records = jishi.load_trace(str(trace_file))
+    assert sorted(record['rows'] for record in records) == [3, 7]
+
+
+@pytest.mark.parametrize('value', ['', '0', 'false', 'OFF', 'no'])
+def test_disabled_profiling_is_a_no_op(tmp_path, monkeypatch, value):
+    path = tmp_path / 'trace.jsonl'
+    monkeypatch.setenv(jishi.PROFILE_ENV, value)
+    monkeypatch.setenv(jishi.TRACE_ENV, str(path))
+
+    def fail():
+        raise AssertionError('未开启剖析时不应计时')
+    monkeypatch.setattr(jishi.time, 'perf_counter', fail)
+    calls = []
+    jishi.add_listener(calls.append)
+    try:
+        assert make_chart(Clock())(2020) == 'done'
+    finally:
+        jishi.remove_listener(calls.append)
+    assert not jishi.enabled() and not path.exists() and calls == []
+
+
+def test_environment_gate_is_read_on_every_call(clock, tmp_path, monkeypatch):
+    path = tmp_path / 'trace.jsonl'
+    monkeypatch.setenv(jishi.TRACE_ENV, str(path))
+    chart = make_chart(clock)
+    monkeypatch.delenv(jishi.PROFILE_ENV, raising=False)
+    chart(1)
+    monkeypatch.setenv(jishi.PROFILE_ENV, 'yes')
+    chart(2)
+    assert [record['args'] for record in jishi.load_trace(str(path))] == [['2']]
+
+
+def test_listeners_receive_the_summary(clock, trace_file):
+    summaries = []
+    jishi.add_listener(summaries.append)
+    try:
+        make_chart(clock)(2020)
+    finally:
+        jishi.remove_listener(summaries.append)
+    make_chart(clock)(2021)
+    assert len(summaries) == 1
+    assert summaries[0].startswith('[性能] plot_example 总计 3.875s')
+    assert '查询 3.000s' in summaries[0] and '42 行' in summaries[0]
+    jishi.remove_listener(summaries.append)       # 重复取消不报错
+
+
+def test_folded_stacks_and_summary():
+    records = [
+        {'chart': 'plot_a', 'total': 1.0, 'rows': 1, 'bytes': 10,
+         'stages': {'connect': 0.0, 'query': 0.25, 'transform': 0.5, 'layout': 0.0, 'encode': 0.25}},
+        {'chart': 'plot_a', 'total': 3.0, 'rows': 5, 'bytes': 20,
+         'stages': {'connect': 0.0, 'query': 0.75, 'transform': 1.0, 'layout': 0.25, 'encode': 1.0}},
+        {'chart': 'plot_b', 'total': 0.5, 'rows': 0, 'bytes': 0,
+         'stages': {'connect': 0.0, 'query': 0.5, 'transform': 0.0, 'layout': 0.0, 'encode': 0.0}},
+    ]
+    assert jishi.folded_stacks(records) == [
+        'plot_a;encode 1250000', 'plot_a;layout 250000', 'plot_a;query 1000000', 'plot_a;transform 1500000',
+        'plot_b;query 500000']
+    summary = jishi.summarize(records)
+    assert [item['chart'] for item in summary] == ['plot_a', 'plot_b']
+    assert summary[0]['runs'] == 2 and summary[0]['median'] == 2.0 and summary[0]['p95'] == 3.0
+    assert summary[0]['share']['query'] == 0.25 and summary[0]['rows'] == 5
+
+
+def test_load_trace_skips_broken_lines(tmp_path):
+    path = tmp_path / 'trace.jsonl'
+    path.write_text(json.dumps({'chart': 'plot_a'}) + '\n{"chart": \n', encoding='utf-8')
+    assert jishi.load_trace(str(path)) == [{'chart': 'plot_a'}]
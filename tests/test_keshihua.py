@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+import datetime
+
+import pytest
+
+import cunchu
+import keshihua
+from conftest import make_rows
+
+
+@pytest.fixture
+def queries(monkeypatch):
+    """记录发往数据库的查询 (SQL, 参数)，不连接数据库"""
+    log = []
+
+    def get_data_from_query(query, params=None):
+        log.append((' '.join(query.split()), params))
+        return None
+    monkeypatch.setattr(keshihua, 'get_data_from_query', get_data_from_query)
+    return log
+
+
+def test_build_date_filter_between():
+    condition, params = keshihua.build_date_filter('ce.chart_date', '2020-03-01', datetime.datetime(2020, 6, 30, 12))
+    assert condition == 'ce.chart_date BETWEEN :start_date AND :end_date'
+    assert params == {'start_date': datetime.date(2020, 3, 1), 'end_date': datetime.date(2020, 6, 30)}
+
+
+@pytest.mark.parametrize('start, end, condition, params', [
+    ('2020-03-01', None, 'chart_date >= :start_date', {'start_date': datetime.date(2020, 3, 1)}),
+    (None, datetime.date(2020, 6, 30), 'chart_date <= :end_date', {'end_date': datetime.date(2020, 6, 30)}),
+    ('', None, '1 = 1', {}),
+    (None, None, '1 = 1', {}),
+])
+def test_build_date_filter_open_ended(start, end, condition, params):
+    assert keshihua.build_date_filter('chart_date', start, end) == (condition, params)
+
+
+@pytest.mark.parametrize('start, end, expected', [
+    ('2019-01-01', '2020-12-31', ('r.year >= :start_year AND r.year <= :end_year', {'start_year': 2019, 'end_year': 2020})),
+    ('2019-01-01', None, ('r.year >= :start_year', {'start_year': 2019})),
+    (None, '2020-12-31', ('r.year <= :end_year', {'end_year': 2020})),
+    (None, None, ('1 = 1', {})),
+    ('2019-01-02', '2020-12-31', None),
+    ('2019-01-01', '2020-12-30', None),
+    (None, '2020-06-30', None),
+])
+def test_build_year_filter_only_for_whole_years(start, end, expected):
+    assert keshihua.build_year_filter('r.year', start, end) == expected
+
+
+def test_whole_years_read_the_rollup_table(queries):
+    keshihua.get_top_artists('2019-01-01', '2020-12-31', limit=5)
+    query, params = queries[-1]
+    assert 'FROM artist_song_rollup r' in query and 'chart_entries' not in query
+    assert 'WHERE r.year >= :start_year AND r.year <= :end_year' in query and query.endswith('LIMIT 5')
+    assert params == {'start_year': 2019, 'end_year': 2020}
+
+
+def test_partial_years_read_chart_entries(queries):
+    keshihua.get_top_artists('2019-01-01', '2020-06-30')
+    query, params = queries[-1]
+    assert 'JOIN chart_entries ce' in query and 'rollup' not in query
+    assert 'WHERE ce.chart_date BETWEEN :start_date AND :end_date' in query
+    assert params == {'start_date': datetime.date(2019, 1, 1), 'end_date': datetime.date(2020, 6, 30)}
+
+
+def test_open_ended_partial_range_reads_chart_entries(queries):
+    keshihua.get_top_artists(start_date='2019-07-01')
+    query, params = queries[-1]
+    assert 'WHERE ce.chart_date >= :start_date' in query and params == {'start_date': datetime.date(2019, 7, 1)}
+
+
+@pytest.mark.parametrize('search_terms, expected', [
+    ('Drake,Taylor Swift', ['Drake', 'Taylor Swift']),
+    (' Drake ， Taylor Swift ,, ', ['Drake', 'Taylor Swift']),
+    ('Drake, Adele, Drake', ['Drake', 'Adele']),
+    (['Adele ', '', '  ', 'Adele', 'adele'], ['Adele', 'adele']),
+    (',', []),
+])
+def test_parse_search_terms(search_terms, expected):
+    assert keshihua.parse_search_terms(search_terms) == expected
+
+
+@pytest.fixture
+def comparison_chart(archive, tmp_path, monkeypatch):
+    """三周的榜单：Drake 独唱和合作的歌曲、名为 Hello 的歌曲，其余为填充"""
+    monkeypatch.setattr(keshihua, '_chart_frame_cache', {})
+    monkeypatch.setattr(keshihua, 'OUTPUT_DIR', str(tmp_path))
+    rows = []
+    for week, chart_date in enumerate(['2020-01-04', '2020-01-11', '2020-01-18']):
+        week_rows = make_rows(chart_date, size=10)
+        week_rows[0].update(name='Solo', singer='Drake')
+        week_rows[1 + week].update(name='Work', singer='Rihanna Featuring Drake')
+        week_rows[5].update(name='Hello', singer='Adele')
+        week_rows[6].update(name='Drake Song', singer='Drakeo')
+        rows += week_rows
+    cunchu.append_rows(rows)
+    return keshihua.get_chart_frame()
+
+
+def test_match_search_terms_exact_artist_and_title(comparison_chart):
+    trend = keshihua.match_search_terms(comparison_chart, ['Drake', 'Hello', 'drake', 'Nobody'])
+    songs = trend.groupby('term', observed=False)['unique_song'].unique()
+    # 歌手匹配完整署名或拆分后的任一艺术家，不匹配子串（Drakeo）；歌名精确匹配；大小写不折叠
+    assert sorted(songs['Drake']) == ['Solo(Drake)', 'Work(Rihanna Featuring Drake)']
+    assert list(songs['Hello']) == ['Hello(Adele)']
+    assert len(songs['drake']) == 0 and len(songs['Nobody']) == 0
+    assert trend['term'].cat.categories.tolist() == ['Drake', 'Hello', 'drake', 'Nobody']
+    assert len(trend) == 9
+
+
+def test_plot_trend_comparison_writes_one_file(comparison_chart, tmp_path, capsys):
+    result = keshihua.plot_trend_comparison(' Drake , Hello,Drake, drake ', top_n=1, dpi=30)
+    assert (tmp_path / 'trend_comparison.png').exists()
+    assert result.groupby('term', observed=True)['unique_song'].unique().map(list).to_dict() == {
+        'Drake': ['Solo(Drake)'], 'Hello': ['Hello(Adele)']}
+    assert '未找到: drake' in capsys.readouterr().out
+
+
+def test_plot_trend_comparison_without_terms(comparison_chart, tmp_path, capsys):
+    assert keshihua.plot_trend_comparison(' , ，') is None
+    assert '请输入至少一个歌手或歌名' in capsys.readouterr().out
+    assert not (tmp_path / 'trend_comparison.png').exists()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+import lianxu
+import shuju
+
+
+def random_chart(weeks=120, songs=50, seed=6, skip=(40, 41)):
+    """按周排序的随机榜单，排名偏向前列以产生较长的前几名连续段；skip 中的周整周缺失"""
+    rng = np.random.default_rng(seed)
+    present = rng.random((weeks, songs)) < 0.7
+    present[list(skip)] = False
+    week, song = np.nonzero(present)
+    return pd.DataFrame({
+        'week_idx': (week + 2000).astype(np.uint16),
+        'song_idx': song.astype(np.uint32),
+        'rank': np.minimum(rng.geometric(0.08, size=len(week)), 100).astype(np.uint8),
+    })
+
+
+def islands(df, threshold):
+    """按定义找出连续段：达标的周按 week_idx - 序号 分组（gaps and islands）"""
+    latest = df['week_idx'].max()
+    rows = []
+    qualified = df[df['rank'] <= threshold]
+    for song, weeks in qualified.groupby('song_idx')['week_idx']:
+        weeks = weeks.to_numpy(dtype=np.int64)
+        for _, run in pd.Series(weeks).groupby(weeks - np.arange(len(weeks))):
+            rows.append((int(song), int(run.iat[0]), int(run.iat[-1]), len(run), run.iat[-1] == latest))
+    return sorted(rows)
+
+
+def as_rows(frame):
+    return sorted((int(r.song_idx), int(r.start_week), int(r.end_week), int(r.length), bool(r.ongoing))
+                  for r in frame.itertuples())
+
+
+@pytest.mark.parametrize('threshold', lianxu.THRESHOLDS)
+def test_streaks_match_gaps_and_islands(threshold):
+    df = random_chart()
+    assert as_rows(lianxu.build_index(df).streaks(threshold)) == islands(df, threshold)
+
+
+def test_song_records_match_streaks():
+    df = random_chart()
+    index = lianxu.build_index(df)
+    records = index.song_records()
+    for threshold in lianxu.THRESHOLDS:
+        qualified = df[df['rank'] <= threshold]
+        weeks = qualified.groupby('song_idx').size().reindex(records.index, fill_value=0)
+        np.testing.assert_array_equal(records[f'weeks_{threshold}'], weeks)
+        longest = index.streaks(threshold).groupby('song_idx')['length'].max()
+        np.testing.assert_array_equal(records[f'longest_{threshold}'], longest.reindex(records.index, fill_value=0))
+
+
+def test_streaks_date_filter_keeps_overlapping_runs():
+    df = random_chart()
+    index = lianxu.build_index(df)
+    start, end = lianxu.week_to_date(2030), lianxu.week_to_date(2060)
+    expected = [row for row in islands(df, 10) if row[2] >= 2030 and row[1] <= 2060]
+    assert as_rows(index.streaks(10, start, end)) == expected
+
+
+def test_get_index_extends_appended_weeks(monkeypatch):
+    monkeypatch.setattr(lianxu, '_index_cache', {})
+    df = random_chart()
+    first = lianxu.get_index(df[df['week_idx'] < 2070], version='v1')
+    second = lianxu.get_index(df, version='v2')
+    assert second is first
+    rebuilt = lianxu.build_index(df)
+    for threshold in lianxu.THRESHOLDS:
+        assert as_rows(second.streaks(threshold)) == as_rows(rebuilt.streaks(threshold))
+    pd.testing.assert_frame_equal(second.song_records(), rebuilt.song_records())
+
+
+def test_get_index_rebuilds_when_history_changes(monkeypatch):
+    monkeypatch.setattr(lianxu, '_index_cache', {})
+    df = random_chart()
+    first = lianxu.get_index(df, version='v1')
+    changed = df.copy()
+    changed.loc[0, 'rank'] = 1 if changed.loc[0, 'rank'] != 1 else 2
+    second = lianxu.get_index(changed, version='v2')
+    assert second is not first
+    assert as_rows(second.streaks(1)) == islands(changed, 1)
+
+
+def test_longest_streaks_one_per_song():
+    df = random_chart()
+    top = lianxu.longest_streaks(lianxu.build_index(df), 40, top_n=5)
+    assert top['song_idx'].is_unique and len(top) == 5
+    assert top['length'].iat[0] == max(row[3] for row in islands(df, 40))
+    assert top['length'].is_monotonic_decreasing
+    assert (top['end_date'] - top['start_date']).dt.days.tolist() == ((top['length'] - 1) * 7).tolist()
+
+
+def test_artist_totals_split_credits():
+    df = random_chart()
+    index = lianxu.build_index(df)
+    names = ['Alpha', 'Beta', 'Alpha & Beta', 'Gamma Featuring Alpha', 'Beta x Delta']
+    singers = pd.Series([names[i % len(names)] for i in range(index.songs)])
+    start, end = lianxu.week_to_date(2010), lianxu.week_to_date(2090)
+    for dates, rows in [((None, None), df), ((start, end), df[df['week_idx'].between(2010, 2090)])]:
+        weeks = rows[rows['rank'] <= 1].groupby('song_idx').size()
+        expected = {}
+        for song, count in weeks.items():
+            for artist in shuju.split_artists(singers[song]):
+                expected[artist] = expected.get(artist, 0) + count
+        totals = lianxu.artist_totals(index, 1, singers, 10, *dates)
+        assert dict(zip(totals['artist'], totals['weeks'])) == expected
+        assert totals['weeks'].is_monotonic_decreasing
+
+
+def test_unknown_threshold():
+    with pytest.raises(ValueError):
+        lianxu.threshold_column(3)
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import http.client
+
+import pytest
+
+import monizhan
+from conftest import make_rows
+
+
+@pytest.fixture
+def server():
+    server = monizhan.start_in_background({'2020-01-04': make_rows('2020-01-04')})
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def request(conn, method, path):
+    conn.request(method, path)
+    response = conn.getresponse()
+    return response.status, response.read()
+
+
+@pytest.mark.parametrize('error, path', [
+    ('rate_429', '/charts/hot-100/2020-01-04'),
+    ('rate_5xx', '/charts/hot-100/2020-01-04'),
+    (None, '/no-such-page'),
+    (None, '/charts/hot-100/1999-01-02'),
+])
+def test_head_error_responses_have_no_body(server, error, path):
+    if error is not None:
+        server.options[error] = 1.0
+    conn = http.client.HTTPConnection(*server.server_address[:2], timeout=5)
+    status, body = request(conn, 'HEAD', path)
+    assert status in (404, 429, 500, 502, 503) and body == b''
+    # 同一条长连接上的下一个响应不应读到上一个 HEAD 的正文
+    server.options.update(rate_429=0.0, rate_5xx=0.0)
+    status, body = request(conn, 'GET', '/charts/hot-100/2020-01-04')
+    assert status == 200 and body.startswith(b'<!DOCTYPE html>')
+    conn.close()
+    assert server.stats['HEAD'] == 1
+
+
+def test_conditional_get_returns_304(server):
+    conn = http.client.HTTPConnection(*server.server_address[:2], timeout=5)
+    conn.request('GET', '/charts/hot-100/2020-01-04')
+    response = conn.getresponse()
+    response.read()
+    etag = response.getheader('ETag')
+    conn.request('GET', '/charts/hot-100/2020-01-04', headers={'If-None-Match': etag})
+    response = conn.getresponse()
+    assert response.status == 304 and response.read() == b''
+    conn.close()
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import time
+
+import pytest
+
+import monizhan
+import pachong
+from conftest import make_rows
+
+DATES = ['2020-01-04', '2020-01-11', '2020-01-18']
+
+
+@pytest.fixture
+def server():
+    server = monizhan.start_in_background({date: make_rows(date) for date in DATES})
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_chart_registry(monkeypatch):
+    monkeypatch.setattr(pachong, 'CHARTS', dict(pachong.CHARTS))
+    assert pachong.get_chart('billboard-200')['size'] == 200
+    assert pachong.get_chart('hot-100')['marker'] == 'Hot 100'
+    spec = pachong.register_chart('test-chart', 'Test Chart', 20)
+    assert spec['marker'] == 'Test Chart' and spec['parser'] is pachong.parse_chart_row
+    assert pachong.chart_url('test-chart', '2020-01-04', 'http://host/charts/') == 'http://host/charts/test-chart/2020-01-04'
+    pachong.register_chart('legacy', 'Legacy', 10, path='legacy/week/{date}/')
+    assert pachong.chart_url('legacy', '2020-01-04') == pachong.URL_ROOT + 'legacy/week/2020-01-04/'
+    with pytest.raises(ValueError):
+        pachong.get_chart('no-such-chart')
+
+
+@pytest.mark.parametrize('url, root', [
+    ('http://127.0.0.1:8765/charts/hot-100/', 'http://127.0.0.1:8765/charts/'),
+    ('http://127.0.0.1:8765/charts/hot-100', 'http://127.0.0.1:8765/charts/'),
+    ('https://www.billboard.com/charts/billboard-200/', 'https://www.billboard.com/charts/'),
+    ('http://127.0.0.1:8765/charts', 'http://127.0.0.1:8765/charts/'),
+    ('http://127.0.0.1:8765/charts/', 'http://127.0.0.1:8765/charts/'),
+])
+def test_url_root_from_accepts_legacy_chart_urls(url, root):
+    assert pachong.url_root_from(url) == root
+
+
+@pytest.mark.parametrize('variant', ['default', 'legacy-artist', 'badges'])
+def test_parse_chart_page_variants(variant):
+    rows = make_rows('2020-01-04', size=5)
+    rows[2]['last_week'] = 'N/A'
+    page = monizhan.render_page('2020-01-04', rows, variant, title='Hot Country Songs')
+    spec = dict(pachong.get_chart('country-songs'), size=5)
+    songs = pachong.parse_chart_page(spec, page, '2020-01-04')
+    assert [(song['rank'], song['name'], song['singer']) for song in songs] == \
+        [(rank, f'Song {rank}', f'Artist {rank}') for rank in range(1, 6)]
+    assert all(song['chart_id'] == 'country-songs' and not pachong.is_failed(song) for song in songs)
+
+
+def test_parse_chart_page_marks_missing_rows_and_wrong_pages():
+    spec = dict(pachong.get_chart('hot-100'), size=10)
+    page = monizhan.render_page('2020-01-04', make_rows('2020-01-04', size=10), 'truncated')
+    songs = pachong.parse_chart_page(spec, page, '2020-01-04')
+    assert [pachong.is_failed(song) for song in songs] == [False] * 9 + [True]
+    page = monizhan.render_page('2020-01-04', make_rows('2020-01-04', size=10), 'not-found')
+    assert all(pachong.is_failed(song) for song in pachong.parse_chart_page(spec, page, '2020-01-04'))
+
+
+def test_scrape_charts_shares_one_session_and_rate_limiter(server, monkeypatch):
+    sessions = []
+    get_ssl_session = pachong.get_ssl_session
+
+    def counting_session(pool_maxsize=1):
+        sessions.append(pool_maxsize)
+        return get_ssl_session(pool_maxsize)
+    monkeypatch.setattr(pachong, 'get_ssl_session', counting_session)
+    starts = []
+    wait = pachong.RateLimiter.wait
+
+    def timed_wait(limiter):
+        wait(limiter)
+        starts.append(time.monotonic())
+    monkeypatch.setattr(pachong.RateLimiter, 'wait', timed_wait)
+
+    charts = ['hot-100', 'country-songs']
+    results = list(pachong.scrape_charts(charts, DATES, server.root_url, workers=3, min_interval=0.05))
+
+    # 按 (日期, 榜单) 顺序返回，各榜单按自己的行数解析
+    assert [(chart_id, date) for chart_id, date, _ in results] == [(c, d) for d in DATES for c in charts]
+    for chart_id, date, songs in results:
+        assert len(songs) == pachong.get_chart(chart_id)['size']
+        assert not any(pachong.is_failed(song) for song in songs)
+        assert {song['chart_id'] for song in songs} == {chart_id} and songs[0]['chart_date'] == date
+    # 所有线程共用一个会话（连接池大小与线程数相同）和一个限速器：任意两次请求的开始时间间隔不小于 min_interval
+    assert sessions == [3]
+    gaps = [b - a for a, b in zip(sorted(starts), sorted(starts)[1:])]
+    assert len(starts) == 6 and min(gaps) >= 0.05 - 0.005
+    assert server.stats[200] == 6
+
+
+def test_scrape_charts_rejects_unknown_chart_before_fetching(server):
+    with pytest.raises(ValueError):
+        list(pachong.scrape_charts(['hot-100', 'no-such-chart'], DATES, server.root_url))
+    assert server.stats[200] == 0
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+
+import shengming
+import shuju
+
+
+def chart(songs):
+    """{song_idx: {week_idx: rank}} -> compute_lifecycles 所需的数据"""
+    rows = [(song, week, rank) for song, weeks in songs.items() for week, rank in weeks.items()]
+    return pd.DataFrame(rows, columns=['song_idx', 'week_idx', 'rank'])
+
+
+def test_compute_lifecycles_single_song():
+    df = chart({
+        0: {100: 5},                                           # 只为确定数据的第一周
+        1: {101: 50, 102: 20, 103: 10, 104: 10, 105: 30, 108: 40, 109: 60},
+        2: {110: 1},                                           # 只为确定数据的最后一周
+    })
+    row = shengming.compute_lifecycles(df).set_index('song_idx').loc[1]
+    assert row['debut_week'] == 101
+    assert row['peak_rank'] == 10 and row['peak_week'] == 103
+    assert row['time_to_peak'] == 2 and row['weeks_at_peak'] == 2
+    assert row['total_weeks'] == 7 and row['chart_runs'] == 2
+    assert row['max_gap'] == 2 and row['mean_gap'] == 2
+    slope = np.polyfit([1, 2, 5, 6], [10, 30, 40, 60], 1)[0]
+    assert abs(row['decay_slope'] - slope) < 1e-5
+    assert not row['left_censored'] and not row['active']
+    assert row['debut_date'] == shuju.EPOCH + pd.Timedelta(weeks=101)
+
+
+def test_censoring_flags():
+    df = chart({0: {0: 1, 1: 2}, 1: {1: 1, 2: 3}})
+    lifecycles = shengming.compute_lifecycles(df).set_index('song_idx')
+    assert lifecycles.loc[0, 'left_censored'] and not lifecycles.loc[0, 'active']
+    assert lifecycles.loc[1, 'active'] and not lifecycles.loc[1, 'left_censored']
+
+
+def kaplan_meier(durations, ended, max_weeks):
+    """逐个时间点计算的 Kaplan-Meier 估计 S(k) = P(在榜周数 > k)"""
+    survival, s = [], 1.0
+    for k in range(max_weeks + 1):
+        at_risk = sum(1 for d in durations if d >= k)
+        events = sum(1 for d, e in zip(durations, ended) if e and d == k)
+        if at_risk:
+            s *= 1 - events / at_risk
+        survival.append(s)
+    return survival
+
+
+def test_cohort_survival_matches_kaplan_meier():
+    rng = np.random.default_rng(1)
+    n = 400
+    lifecycles = pd.DataFrame({
+        'debut_year': rng.choice([2019, 2020], size=n).astype(np.int16),
+        'total_weeks': rng.integers(1, 40, size=n),
+        'active': rng.random(n) < 0.2,
+        'left_censored': rng.random(n) < 0.05,
+    })
+    survival = shengming.cohort_survival(lifecycles, max_weeks=30)
+    assert list(survival.columns) == [2019, 2020]
+    for year in (2019, 2020):
+        cohort = lifecycles[(lifecycles['debut_year'] == year) & ~lifecycles['left_censored']]
+        expected = kaplan_meier(np.minimum(cohort['total_weeks'], 31).tolist(), (~cohort['active']).tolist(), 30)
+        np.testing.assert_allclose(survival[year].to_numpy(), expected)
+
+
+def test_cohort_survival_without_censoring_is_the_empirical_tail():
+    lifecycles = pd.DataFrame({'debut_year': np.int16(2020), 'total_weeks': [1, 2, 2, 5],
+                               'active': False, 'left_censored': False})
+    survival = shengming.cohort_survival(lifecycles, max_weeks=5)[2020]
+    np.testing.assert_allclose(survival.to_numpy(), [1.0, 0.75, 0.25, 0.25, 0.25, 0.0])
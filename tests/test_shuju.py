@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+
+import cunchu
+import shuju
+from conftest import make_rows
+
+
+def test_split_artists():
+    assert shuju.split_artists('Lil Nas X Featuring Billy Ray Cyrus') == ['Lil Nas X', 'Billy Ray Cyrus']
+    assert shuju.split_artists('Daddy Yankee & Justin Bieber, Luis Fonsi') == ['Daddy Yankee', 'Justin Bieber', 'Luis Fonsi']
+    assert shuju.split_artists('N/A') == []
+
+
+def test_date_to_week_idx_rounding():
+    assert shuju.date_to_week_idx(shuju.EPOCH) == 0
+    assert shuju.date_to_week_idx('1958-08-05') == 0
+    assert shuju.date_to_week_idx('1958-08-05', round_up=True) == 1
+    assert shuju.date_to_week_idx('1958-08-09') == 1
+
+
+def test_compact_frame_types_and_song_idx():
+    rows = make_rows('2020-01-11', size=3) + make_rows('2020-01-04', size=3)
+    rows[3]['singer'] = 'Someone Else'   # 同名不同歌手视为不同歌曲
+    df = shuju.compact_frame(cunchu.rows_to_frame(rows))
+    assert str(df['rank'].dtype) == 'UInt8'
+    assert isinstance(df['name'].dtype, pd.CategoricalDtype)
+    assert df['week_idx'].is_monotonic_increasing
+    assert df['song_idx'].nunique() == 4
+    same = df[df['name'] == 'Song 2']
+    assert same['song_idx'].nunique() == 1
+
+
+def test_load_chart_data_and_slice_weeks(archive):
+    cunchu.append_rows(make_rows('2020-01-04') + make_rows('2020-01-11') + make_rows('2020-01-18'))
+    df = shuju.load_chart_data(['rank', 'week_idx', 'song_idx'])
+    assert list(df.columns) == ['rank', 'week_idx', 'song_idx']
+    assert len(shuju.slice_weeks(df, '2020-01-05', '2020-01-18')) == 200
+    assert len(shuju.slice_weeks(df, end_date='2020-01-10')) == 100
+
+
+def test_data_version_changes_on_append(archive):
+    cunchu.append_rows(make_rows('2020-01-04'))
+    before = shuju.data_version()
+    assert shuju.data_version() == before
+    cunchu.append_rows(make_rows('2020-01-11'))
+    assert shuju.data_version() != before